@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Suite de rendimiento de los kernels de cálculo con datos sintéticos (ver benchmarks.run)
+"""
@@ -0,0 +1,110 @@
+"""
+Benchmark Data Generator
+Series OHLCV, paneles de precios y tablas de fondos generados para los benchmarks
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import price_store
+from data_providers import synthetic_ohlcv
+
+
+def bar_index(n_bars: int) -> pd.DatetimeIndex:
+    """
+    Índice de n_bars barras.
+
+    Hasta ~50k barras son días hábiles; más allá se usan minutos, porque un
+    millón de días hábiles no cabe en el rango de pd.Timestamp.
+    """
+    if n_bars <= 50_000:
+        return pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n_bars)
+    return pd.date_range(end=pd.Timestamp.now().floor("min"), periods=n_bars, freq="min")
+
+
+def ohlcv_frame(n_bars: int, symbol: str = "BENCH") -> pd.DataFrame:
+    """Barras OHLCV con columnas en minúsculas, como las que entrega OpenBB."""
+    frame = synthetic_ohlcv(symbol, bar_index(n_bars))
+    frame.columns = [col.lower() for col in frame.columns]
+    return frame
+
+
+def symbols(n: int, prefix: str = "S") -> List[str]:
+    """Símbolos ficticios S0000, S0001, ..."""
+    width = max(4, len(str(n - 1)))
+    return [f"{prefix}{i:0{width}d}" for i in range(n)]
+
+
+def price_panel(
+    tickers: List[str],
+    n_bars: int = 504,
+    seed: int = 7,
+    market_beta: float = 0.6
+) -> pd.DataFrame:
+    """
+    Panel de cierres (fechas × símbolos) con un factor de mercado común.
+
+    Se genera de forma vectorizada: con 10k símbolos generar cada serie por
+    separado dominaría el tiempo de preparación.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    market = rng.standard_normal(n_bars) * 0.01
+    betas = rng.uniform(-market_beta, 1.5 * market_beta, n)
+    idio = rng.standard_normal((n_bars, n)) * rng.uniform(0.005, 0.03, n)
+    drift = rng.uniform(-0.0002, 0.0008, n)
+    returns = drift + market[:, None] * betas + idio
+    closes = rng.uniform(20, 500, n) * np.exp(np.cumsum(returns, axis=0))
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n_bars)
+    return pd.DataFrame(closes, index=index, columns=tickers)
+
+
+@contextmanager
+def patched_prices(panel: pd.DataFrame):
+    """
+    Sirve price_store.get_prices desde un panel en memoria.
+
+    Así calculate_correlations, optimize_portfolio y backtest_portfolio se
+    miden sin el costo de SQLite ni de la red (que tienen su propio backend
+    offline en data_providers).
+    """
+    original = price_store.get_prices
+
+    def get_prices(symbols, period="1y", start=None, end=None, interval="1d", field="Close"):
+        wanted = list(dict.fromkeys(s.upper() for s in symbols))
+        return panel.reindex(columns=wanted)
+
+    price_store.get_prices = get_prices
+    try:
+        yield
+    finally:
+        price_store.get_prices = original
+
+
+def fund_table(n: int, seed: int = 11, categories: Optional[List[str]] = None) -> pd.DataFrame:
+    """Tabla con las columnas de fetch_multiple_funds para n fondos."""
+    rng = np.random.default_rng(seed)
+    categories = categories or ["US Equity - Large Cap", "Fixed Income", "Sector - Technology", "Commodities"]
+    issuers = ["Vanguard", "BlackRock", "State Street", "Invesco", "Schwab"]
+    return pd.DataFrame({
+        "symbol": symbols(n, "F"),
+        "category": rng.choice(categories, n),
+        "issuer": rng.choice(issuers, n),
+        "aum": rng.lognormal(21, 2, n),
+        "expense_ratio": rng.uniform(0.0003, 0.0095, n),
+        "dividend_yield": rng.uniform(0, 0.05, n),
+        "sharpe_ratio": rng.normal(0.6, 0.5, n),
+        "volatility": rng.uniform(3, 45, n),
+        "annual_return": rng.normal(8, 12, n),
+        "max_drawdown": -rng.uniform(2, 50, n),
+    })
+
+
+def allocations(tickers: List[str], seed: int = 3) -> List[Dict]:
+    """Asignaciones {symbol, weight} que suman 100%."""
+    weights = np.random.default_rng(seed).random(len(tickers))
+    weights = weights / weights.sum() * 100
+    return [{"symbol": s, "weight": float(w)} for s, w in zip(tickers, weights)]
@@ -0,0 +1,329 @@
+"""
+Load Test Module
+Simula N sesiones concurrentes del dashboard con AppTest sobre el backend sintético
+
+Uso:
+    python -m benchmarks.loadtest --sessions 8 --iterations 3
+    python -m benchmarks.loadtest --sessions 20 --output /tmp/loadtest.json
+
+Cada sesión es un AppTest independiente (su propio session_state) que recorre
+un guion: cambiar de ticker, abrir pestañas, analizar hedges, cargar un
+template y correr el backtest. Todas las sesiones comparten el proceso, igual
+que en el servidor: st.cache_data, el registro single-flight de market_data,
+el almacén SQLite y el pool de prefetch son los mismos para todas, así que la
+contención que se mide es la real.
+
+Reporta latencia p50/p95 por rerun (y por acción), RSS pico del proceso y las
+tasas de acierto de los caches de datos.
+"""
+
+import os
+import sys
+import tempfile
+
+# El backend se elige al importar data_providers/price_store: fijarlo antes de cualquier import del repo
+os.environ.setdefault("MARKET_DATA_BACKEND", "synthetic")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import statistics  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+import unicodedata  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Dict, List, Optional, Tuple  # noqa: E402
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import market_data  # noqa: E402
+import price_store  # noqa: E402
+
+DASHBOARD_PATH = os.path.join(ROOT, "dashboard.py")
+
+# Tickers que rotan las sesiones; con el backend sintético cualquier símbolo tiene datos
+TICKER_POOL = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN", "META", "SPY", "QQQ"]
+
+# Guion de cada iteración, después de cambiar de ticker: (acción, argumento)
+SCENARIO: List[Tuple[str, object]] = [
+    ("tab", "perfil"),
+    ("tab", "precios"),
+    ("tab", "opciones"),
+    ("tab", "financieros"),
+    ("tab", "analisis"),
+    ("tab", "hedge"),
+    ("click", "analyze_hedge_btn"),
+    ("tab", "fondos"),
+    ("tab", "portfolio"),
+    ("select_index", ("portfolio_template_select", 1)),
+    ("click", "portfolio_use_template"),
+    ("click", "portfolio_run_backtest"),
+    ("tab", "scanner"),
+    ("click", "scanner_run_btn"),
+]
+
+# Timeout por rerun (el primer run de cada sesión incluye importar el dashboard)
+RUN_TIMEOUT = 120
+
+
+def _slug(label: str) -> str:
+    """'🎯 Análisis' → 'analisis', igual que TAB_SLUGS del dashboard."""
+    ascii_label = unicodedata.normalize("NFKD", label).encode("ascii", "ignore").decode()
+    return ascii_label.strip().lower()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """RSS pico del proceso (ru_maxrss viene en KB en Linux y en bytes en macOS)."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def _summary(values: List[float]) -> Dict:
+    """p50/p95/max/mean en milisegundos."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50_ms": _percentile(values, 0.50) * 1000,
+        "p95_ms": _percentile(values, 0.95) * 1000,
+        "max_ms": max(values) * 1000,
+        "mean_ms": statistics.fmean(values) * 1000,
+    }
+
+
+class Session:
+    """Una sesión de usuario: un AppTest con su propio session_state."""
+
+    def __init__(self, session_id: int, timeout: int = RUN_TIMEOUT):
+        self.session_id = session_id
+        self.at = AppTest.from_file(DASHBOARD_PATH, default_timeout=timeout)
+        self.timings: List[Tuple[str, float]] = []
+        self.errors: List[str] = []
+
+    def _run(self, action: str, widget=None) -> None:
+        """Ejecuta un rerun (de la app o disparado por un widget) y registra su latencia."""
+        started = time.perf_counter()
+        try:
+            (widget or self.at).run()
+        except Exception as e:
+            self.errors.append(f"{action}: {type(e).__name__}: {e}")
+            return
+        finally:
+            self.timings.append((action, time.perf_counter() - started))
+        for exc in self.at.exception:
+            self.errors.append(f"{action}: {exc.value}")
+
+    def _find(self, kind: str, key: str):
+        try:
+            return getattr(self.at, kind)(key=key)
+        except KeyError:
+            return None
+
+    def set_ticker(self, symbol: str) -> None:
+        box = next((w for w in self.at.sidebar.text_input if w.label == "TICKER"), None)
+        if box is None:
+            self.errors.append("ticker: no se encontró el input TICKER")
+            return
+        self._run("ticker", box.set_value(symbol))
+
+    def open_tab(self, slug: str) -> None:
+        radio = self._find("radio", "active_tab")
+        if radio is None:
+            self.errors.append(f"tab:{slug}: no se encontró la navegación")
+            return
+        label = next((opt for opt in radio.options if _slug(opt.split(" ", 1)[-1]) == slug), None)
+        if label is None:
+            self.errors.append(f"tab:{slug}: pestaña desconocida")
+            return
+        self._run(f"tab:{slug}", radio.set_value(label))
+
+    def click(self, key: str) -> None:
+        button = self._find("button", key)
+        if button is None:
+            self.errors.append(f"click:{key}: el botón no está en pantalla")
+            return
+        self._run(f"click:{key}", button.click())
+
+    def select_index(self, key: str, index: int) -> None:
+        box = self._find("selectbox", key)
+        if box is None:
+            self.errors.append(f"select:{key}: el selector no está en pantalla")
+            return
+        self._run(f"select:{key}", box.select_index(index))
+
+    def play(self, iterations: int) -> None:
+        """Primer carga y luego el guion completo por cada ticker."""
+        self._run("load")
+        for i in range(iterations):
+            self.set_ticker(TICKER_POOL[(self.session_id + i) % len(TICKER_POOL)])
+            for action, arg in SCENARIO:
+                if action == "tab":
+                    self.open_tab(arg)
+                elif action == "click":
+                    self.click(arg)
+                elif action == "select_index":
+                    self.select_index(*arg)
+
+
+def run_load_test(sessions: int, iterations: int, ramp_seconds: float = 0.0, timeout: int = RUN_TIMEOUT) -> Dict:
+    """
+    Corre sesiones concurrentes y agrega sus métricas.
+
+    Args:
+        sessions: Número de sesiones simultáneas
+        iterations: Veces que cada sesión recorre el guion (un ticker distinto cada vez)
+        ramp_seconds: Tiempo en el que se reparten los arranques de las sesiones
+        timeout: Timeout por rerun en segundos
+
+    Returns:
+        Dict con latencias, RSS, estadísticas de cache y errores
+    """
+    rss_start = _peak_rss_mb()
+    flights_start = market_data.get_flight_stats()
+    store_start = price_store.get_store_stats()
+
+    players = [Session(i, timeout=timeout) for i in range(sessions)]
+    start_barrier = threading.Event()
+
+    def play(player: Session) -> None:
+        start_barrier.wait()
+        if ramp_seconds and sessions > 1:
+            time.sleep(ramp_seconds * player.session_id / (sessions - 1))
+        player.play(iterations)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+        futures = [pool.submit(play, p) for p in players]
+        start_barrier.set()
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - started
+
+    loads = [t for p in players for action, t in p.timings if action == "load"]
+    reruns = [t for p in players for action, t in p.timings if action != "load"]
+    by_action: Dict[str, List[float]] = {}
+    for p in players:
+        for action, t in p.timings:
+            by_action.setdefault(action, []).append(t)
+
+    flights_end = market_data.get_flight_stats()
+    leaders = flights_end["leaders"] - flights_start["leaders"]
+    followers = flights_end["followers"] - flights_start["followers"]
+    store_end = price_store.get_store_stats()
+    local_reads = store_end["local_reads"] - store_start["local_reads"]
+    network_syncs = store_end["network_syncs"] - store_start["network_syncs"]
+
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "wall_s": wall,
+        "reruns_per_s": len(reruns) / wall if wall else None,
+        "first_load": _summary(loads),
+        "rerun": _summary(reruns),
+        "by_action": {action: _summary(values) for action, values in sorted(by_action.items())},
+        "memory": {"rss_peak_before_mb": rss_start, "rss_peak_mb": _peak_rss_mb()},
+        "cache": {
+            # Requests que sí llegaron al backend vs. los que esperaron a uno idéntico en vuelo
+            "upstream_fetches": leaders,
+            "coalesced_requests": followers,
+            "coalesced_rate": followers / (leaders + followers) if leaders + followers else None,
+            "upstream_fetches_per_rerun": leaders / len(reruns) if reruns else None,
+            # Lecturas de precios servidas por SQLite sin ir a la red
+            "store_local_reads": local_reads,
+            "store_network_syncs": network_syncs,
+            "store_hit_rate": 1 - network_syncs / local_reads if local_reads else None,
+        },
+        "errors": [f"session {p.session_id}: {e}" for p in players for e in p.errors],
+    }
+
+
+def _print_report(report: Dict) -> None:
+    def fmt(summary: Dict) -> str:
+        if not summary.get("count"):
+            return "sin datos"
+        return (f"p50 {summary['p50_ms']:8.1f} ms   p95 {summary['p95_ms']:8.1f} ms   "
+                f"max {summary['max_ms']:8.1f} ms   n={summary['count']}")
+
+    print(f"\n{report['sessions']} sesiones × {report['iterations']} iteraciones en {report['wall_s']:.1f} s "
+          f"({report['reruns_per_s']:.1f} reruns/s)")
+    print(f"{'primer carga':<36} {fmt(report['first_load'])}")
+    print(f"{'rerun (todos)':<36} {fmt(report['rerun'])}")
+    for action, summary in report["by_action"].items():
+        if action != "load":
+            print(f"  {action:<34} {fmt(summary)}")
+
+    memory = report["memory"]
+    if memory["rss_peak_mb"] is not None:
+        print(f"RSS pico: {memory['rss_peak_mb']:.0f} MB (antes de las sesiones: {memory['rss_peak_before_mb']:.0f} MB)")
+
+    cache = report["cache"]
+    if cache["coalesced_rate"] is not None:
+        print(f"Backend: {cache['upstream_fetches']} fetches, {cache['coalesced_requests']} coalescidos "
+              f"({cache['coalesced_rate']:.0%}), {cache['upstream_fetches_per_rerun']:.2f} fetches/rerun")
+    if cache["store_hit_rate"] is not None:
+        print(f"Price store: {cache['store_local_reads']} lecturas, {cache['store_network_syncs']} syncs "
+              f"(hit rate {cache['store_hit_rate']:.0%})")
+
+    if report["errors"]:
+        print(f"\n{len(report['errors'])} errores:")
+        for error in report["errors"][:20]:
+            print(f"  {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga del dashboard con sesiones concurrentes")
+    parser.add_argument("--sessions", type=int, default=4, help="Sesiones simultáneas")
+    parser.add_argument("--iterations", type=int, default=2, help="Recorridos del guion por sesión")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Segundos para repartir el arranque de las sesiones")
+    parser.add_argument("--timeout", type=int, default=RUN_TIMEOUT, help="Timeout por rerun en segundos")
+    parser.add_argument("--output", help="Escribe el reporte en este JSON")
+    parser.add_argument("--keep-store", action="store_true",
+                        help="Reusar el almacén SQLite existente en lugar de empezar en frío")
+    args = parser.parse_args(argv)
+
+    if market_data.backend_name() == "live":
+        print("La prueba de carga no debe correr contra la red: usa MARKET_DATA_BACKEND=synthetic o replay")
+        return 2
+
+    if not args.keep_store:
+        price_store.set_store_path(os.path.join(tempfile.mkdtemp(prefix="changos-loadtest-"), "prices.sqlite"))
+
+    report = run_load_test(args.sessions, args.iterations, ramp_seconds=args.ramp, timeout=args.timeout)
+    report["backend"] = market_data.backend_name()
+    report["environment"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
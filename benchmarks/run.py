@@ -0,0 +1,300 @@
+"""
+Benchmark Runner
+Mide los kernels de cálculo sobre datos sintéticos y compara contra un baseline JSON
+
+Uso:
+    python -m benchmarks.run                         # suite rápida
+    python -m benchmarks.run --suite full            # 1k-1M barras, 10-10k símbolos
+    python -m benchmarks.run --only poc,correlations
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.25
+
+Con --baseline, el proceso sale con código 1 si algún caso es más lento que
+baseline × (1 + tolerance), para poder usarlo como gate en CI.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fund_screener  # noqa: E402
+import hedge_analyzer  # noqa: E402
+import indicator_engine  # noqa: E402
+import portfolio_generator  # noqa: E402
+import signal_backtest  # noqa: E402
+from technical_signals import (  # noqa: E402
+    calculate_momentum_state,
+    find_bearish_divergences,
+    find_bullish_divergences,
+    wilder_rsi,
+)
+from volume_profile import calculate_poc_and_levels, compute_volume_profiles  # noqa: E402
+
+from benchmarks import datagen  # noqa: E402
+
+# Tamaños por suite: barras para kernels de una serie, símbolos para kernels de universo
+SUITES = {
+    "quick": {"bars": [1_000, 10_000], "universe": [10, 100]},
+    "full": {"bars": [1_000, 10_000, 100_000, 1_000_000], "universe": [10, 100, 1_000, 10_000]},
+}
+
+# El QP del optimizador es O(n³) por iteración: más allá de 1k activos no es un caso realista
+MAX_OPTIMIZER_UNIVERSE = 1_000
+
+# Tiempo máximo por caso y repeticiones máximas
+MAX_CASE_SECONDS = 5.0
+MAX_REPEATS = 7
+
+
+# === CASOS ===
+# Cada caso recibe el tamaño y devuelve (setup, run): setup prepara datos una
+# vez, fuera del tiempo medido, y regresa el contexto que usa run.
+
+def _poc_case(n_bars: int):
+    def setup():
+        df = datagen.ohlcv_frame(n_bars)
+        return df, float(df["close"].iloc[-1])
+    return setup, lambda ctx: calculate_poc_and_levels(*ctx)
+
+
+def _divergence_case(n_bars: int):
+    def setup():
+        df = datagen.ohlcv_frame(n_bars)
+        return df, wilder_rsi(df["close"])
+
+    def run(ctx):
+        df, rsi = ctx
+        find_bullish_divergences(df, rsi)
+        find_bearish_divergences(df, rsi)
+    return setup, run
+
+
+def _momentum_case(n_bars: int):
+    def setup():
+        df = datagen.ohlcv_frame(n_bars)
+        ema_data = {n: df["close"].ewm(span=n, adjust=False).mean() for n in (9, 21, 50)}
+        return df, ema_data
+    return setup, lambda ctx: calculate_momentum_state(*ctx)
+
+
+def _indicators_case(n_bars: int, incremental: bool):
+    def setup():
+        df = datagen.ohlcv_frame(n_bars)
+        stream = indicator_engine.IndicatorStream()
+        stream.update(df.iloc[:-1])
+        return stream, df
+
+    def run(ctx):
+        stream, df = ctx
+        if incremental:
+            # Refresco del stream ya cargado: solo la vela provisional (y barras nuevas) cuestan cómputo
+            stream.update(df)
+        else:
+            indicator_engine.compute_indicators(df)
+    return setup, run
+
+
+def _correlations_case(n_symbols: int):
+    def setup():
+        tickers = datagen.symbols(n_symbols + 1)
+        return tickers[0], tickers[1:], datagen.price_panel(tickers, n_bars=252)
+
+    def run(ctx):
+        ticker, hedges, panel = ctx
+        with datagen.patched_prices(panel):
+            result = hedge_analyzer.calculate_correlations(ticker, hedge_symbols=hedges)
+        assert not result.empty
+    return setup, run
+
+
+def _optimize_case(n_symbols: int, method: str):
+    def setup():
+        tickers = datagen.symbols(n_symbols)
+        return tickers, datagen.price_panel(tickers, n_bars=504)
+
+    def run(ctx):
+        tickers, panel = ctx
+        # Sin cache de μ/Σ: se mide la optimización completa
+        portfolio_generator._return_stats.cache_clear()
+        with datagen.patched_prices(panel):
+            result = portfolio_generator.optimize_portfolio(tickers, method=method, seed=0)
+        assert "error" not in result, result.get("error")
+    return setup, run
+
+
+def _backtest_case(n_symbols: int):
+    def setup():
+        tickers = datagen.symbols(n_symbols)
+        return datagen.allocations(tickers), datagen.price_panel(tickers, n_bars=504)
+
+    def run(ctx):
+        allocations, panel = ctx
+        with datagen.patched_prices(panel):
+            result = portfolio_generator.backtest_portfolio(allocations, years=2)
+        assert "error" not in result, result.get("error")
+    return setup, run
+
+
+def _momentum_backtest_case(n_symbols: int):
+    def setup():
+        return datagen.price_panel(datagen.symbols(n_symbols), n_bars=1260)
+    return setup, lambda panel: signal_backtest.backtest_momentum_states(panel)
+
+
+def _poc_batch_case(n_symbols: int):
+    def setup():
+        # ~3M de barras diarias por símbolo, con rango intradía de ±1-3%
+        close = datagen.price_panel(datagen.symbols(n_symbols), n_bars=63).to_numpy()
+        rng = np.random.default_rng(3)
+        spread = rng.uniform(0.01, 0.03, close.shape)
+        return close * (1 + spread), close * (1 - spread), rng.lognormal(13, 0.5, close.shape)
+    return setup, lambda ctx: compute_volume_profiles(*ctx, min_bars=20)
+
+
+def _filter_funds_case(n_funds: int):
+    def setup():
+        return datagen.fund_table(n_funds)
+
+    def run(df):
+        fund_screener.filter_funds(
+            df, category="Fixed Income", min_aum=1e8, max_expense_ratio=0.005,
+            min_sharpe=0.2, max_volatility=25, issuer="Vanguard",
+        )
+    return setup, run
+
+
+def build_cases(suite: str) -> List[Tuple[str, Callable, Callable]]:
+    """Lista de (nombre, setup, run) de una suite."""
+    sizes = SUITES[suite]
+    cases = []
+    for n in sizes["bars"]:
+        cases.append((f"poc[bars={n}]", *_poc_case(n)))
+        cases.append((f"divergences[bars={n}]", *_divergence_case(n)))
+        cases.append((f"momentum[bars={n}]", *_momentum_case(n)))
+        cases.append((f"indicators_full[bars={n}]", *_indicators_case(n, incremental=False)))
+        cases.append((f"indicators_incremental[bars={n}]", *_indicators_case(n, incremental=True)))
+    for n in sizes["universe"]:
+        cases.append((f"correlations[symbols={n}]", *_correlations_case(n)))
+        if n <= MAX_OPTIMIZER_UNIVERSE:
+            cases.append((f"optimize_solver[symbols={n}]", *_optimize_case(n, "solver")))
+        if n <= 100:
+            cases.append((f"optimize_monte_carlo[symbols={n}]", *_optimize_case(n, "monte_carlo")))
+        cases.append((f"backtest[symbols={n}]", *_backtest_case(n)))
+        cases.append((f"momentum_backtest[symbols={n}]", *_momentum_backtest_case(n)))
+        cases.append((f"poc_batch[symbols={n}]", *_poc_batch_case(n)))
+        cases.append((f"filter_funds[funds={n}]", *_filter_funds_case(n)))
+    return cases
+
+
+# === MEDICIÓN ===
+
+def time_case(setup: Callable, run: Callable) -> Dict:
+    """
+    Corre un caso hasta MAX_REPEATS veces o MAX_CASE_SECONDS.
+
+    Returns:
+        Dict con median_s, min_s, max_s y repeats
+    """
+    ctx = setup()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MAX_REPEATS:
+        t0 = time.perf_counter()
+        run(ctx)
+        timings.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > MAX_CASE_SECONDS:
+            break
+    # Con varias corridas se descarta la primera (imports, caches de pandas)
+    measured = timings[1:] if len(timings) > 2 else timings
+    return {
+        "median_s": statistics.median(measured),
+        "min_s": min(measured),
+        "max_s": max(measured),
+        "repeats": len(measured),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Casos más lentos que baseline × (1 + tolerance)."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = current["median_s"] / reference["median_s"] if reference["median_s"] > 0 else 1.0
+        current["baseline_median_s"] = reference["median_s"]
+        current["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append({"case": name, "ratio": ratio, **current})
+    return regressions
+
+
+def environment() -> Dict:
+    """Metadatos de la máquina, para no comparar baselines de hardware distinto a ciegas."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de kernels con datos sintéticos")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--only", help="Prefijos de casos separados por coma (ej. poc,correlations)")
+    parser.add_argument("--output", help="Escribe los resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de baseline contra el cual comparar")
+    parser.add_argument("--save-baseline", help="Guarda los resultados como baseline en este JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Holgura antes de marcar regresión (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.suite)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        cases = [c for c in cases if c[0].startswith(prefixes)]
+
+    results = {}
+    for name, setup, run in cases:
+        results[name] = time_case(setup, run)
+        print(f"{name:<40} {results[name]['median_s'] * 1000:>10.2f} ms  (n={results[name]['repeats']})", flush=True)
+
+    report = {"suite": args.suite, "environment": environment(), "results": results}
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        report["baseline"] = {"path": args.baseline, "environment": baseline.get("environment")}
+        report["regressions"] = regressions
+        for reg in regressions:
+            print(f"REGRESIÓN {reg['case']}: {reg['ratio']:.2f}x "
+                  f"({reg['baseline_median_s'] * 1000:.2f} ms → {reg['median_s'] * 1000:.2f} ms)")
+        if not regressions:
+            print(f"Sin regresiones contra {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,10 @@ Dashboard personalizado para análisis de acciones y opciones
 RAYGUN AESTHETIC EDITION
 """
 
+import logging
 import os
+import threading
+import time
 # Configure OpenBB to use /tmp for Streamlit Cloud compatibility
 os.environ['OPENBB_HOME'] = '/tmp/openbb'
 
@@ -20,6 +23,19 @@ st.set_page_config(
     layout="wide"
 )
 
+# === PERF ===
+import perf
+
+perf.start_rerun()
+perf.phase("setup")
+logger = logging.getLogger("dashboard")
+
+# === PROFILER (?profile=1 con cProfile, ?profile=sample con muestreo) ===
+import profiler
+
+_profile_mode = profiler.requested_mode(st.query_params.get("profile"))
+_profile_capture = profiler.start(_profile_mode) if _profile_mode else None
+
 # === THEME SYSTEM ===
 import raygun_theme as raygun
 
@@ -48,15 +64,32 @@ import fund_screener as funds
 # === PORTFOLIO GENERATOR ===
 import portfolio_generator as portfolio
 
+# === VOLUME PROFILE ===
+from volume_profile import calculate_poc_and_levels
+
+# === TECHNICAL SIGNALS ===
+from technical_signals import calculate_momentum_state
+
+# === INDICATOR GRAPH ===
+from indicator_graph import IndicatorGraph
+
+# === MARKET SCANNER ===
+import market_scanner
+
+# === TICKER PREFETCH ===
+import ticker_prefetch
+
 # === GLOBAL FOOTER (theme-aware) ===
 if st.session_state.app_theme != 'Corporate':
     st.markdown(raygun.get_global_footer("Creado por Drunkenberger"), unsafe_allow_html=True)
 
 # Importar OpenBB
+import market_data
+
+
 @st.cache_resource
 def load_openbb():
-    from openbb import obb
-    return obb
+    return market_data.get_obb()
 
 obb = load_openbb()
 
@@ -85,44 +118,90 @@ TICKER_SYMBOLS = [
     {"symbol": "AMD", "name": "AMD"},
 ]
 
-@st.cache_data(ttl=60)  # Cache for 60 seconds
-def fetch_ticker_data():
-    """Fetch real-time data for ticker symbols."""
-    import yfinance as yf
+TICKER_REFRESH_SECONDS = 60
+
+
+def _ticker_row(item, price=0, prev_close=0):
+    """Build one banner entry from last price and previous close."""
+    change = price - prev_close if prev_close else 0
+    change_pct = (change / prev_close * 100) if prev_close else 0
+    return {
+        'symbol': item.get('name', item['symbol']),
+        'price': price or 0,
+        'change': change,
+        'change_pct': change_pct,
+        'is_index': item.get('is_index', False),
+        'is_commodity': item.get('is_commodity', False)
+    }
+
+
+@perf.timed("dashboard.download_ticker_snapshot")
+def download_ticker_snapshot():
+    """Fetch the whole banner in one batched download (last 5 daily bars)."""
+    symbols = [item["symbol"] for item in TICKER_SYMBOLS]
+    data = market_data.download(symbols, period="5d", interval="1d", progress=False, auto_adjust=False, group_by="column")
+    closes = data['Close'] if data is not None and not data.empty else pd.DataFrame()
+
     stocks_data = []
+    for item in TICKER_SYMBOLS:
+        if item["symbol"] not in closes.columns:
+            continue
+        series = closes[item["symbol"]].dropna()
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        prev_close = float(series.iloc[-2]) if len(series) > 1 else price
+        stocks_data.append(_ticker_row(item, price, prev_close))
+    return stocks_data
+
 
+@st.cache_resource
+def _ticker_snapshot():
+    """Last banner snapshot, shared by every session in the process."""
+    return {"data": None, "fetched_at": 0.0, "refreshing": False, "lock": threading.Lock()}
+
+
+def _refresh_ticker_snapshot(snapshot):
+    """Download a fresh snapshot; on failure keep serving the previous one."""
     try:
-        for item in TICKER_SYMBOLS:
-            sym = item["symbol"]
-            try:
-                ticker_obj = yf.Ticker(sym)
-                info = ticker_obj.fast_info
-                price = info.get('lastPrice', 0) or info.get('regularMarketPrice', 0)
-                prev_close = info.get('previousClose', price)
-                change = price - prev_close if prev_close else 0
-                change_pct = (change / prev_close * 100) if prev_close else 0
-                stocks_data.append({
-                    'symbol': item.get('name', sym),
-                    'price': price or 0,
-                    'change': change,
-                    'change_pct': change_pct,
-                    'is_index': item.get('is_index', False),
-                    'is_commodity': item.get('is_commodity', False)
-                })
-            except Exception:
-                pass
-    except Exception:
-        # Fallback with sample data if API fails
-        for item in TICKER_SYMBOLS:
-            stocks_data.append({
-                'symbol': item.get('name', item['symbol']),
-                'price': 0,
-                'change': 0,
-                'change_pct': 0,
-                'is_index': item.get('is_index', False),
-                'is_commodity': item.get('is_commodity', False)
-            })
-    return stocks_data
+        data = download_ticker_snapshot()
+        if data:
+            snapshot["data"] = data
+    except Exception as e:
+        logger.warning("Error refreshing ticker banner: %s", e)
+    finally:
+        if snapshot["data"] is None:
+            # Fallback with zeros so the banner still renders if the API fails
+            snapshot["data"] = [_ticker_row(item) for item in TICKER_SYMBOLS]
+        snapshot["fetched_at"] = time.time()
+        snapshot["refreshing"] = False
+
+
+def fetch_ticker_data():
+    """
+    Return banner data with stale-while-revalidate semantics.
+
+    The page renders from the last snapshot immediately; if it is older than
+    TICKER_REFRESH_SECONDS a single background thread refreshes it for the
+    next rerun. Only the very first call in the process waits for the network.
+    """
+    snapshot = _ticker_snapshot()
+
+    if snapshot["data"] is None:
+        with snapshot["lock"]:
+            if snapshot["data"] is None:
+                _refresh_ticker_snapshot(snapshot)
+        return snapshot["data"]
+
+    if time.time() - snapshot["fetched_at"] > TICKER_REFRESH_SECONDS:
+        with snapshot["lock"]:
+            if not snapshot["refreshing"] and time.time() - snapshot["fetched_at"] > TICKER_REFRESH_SECONDS:
+                snapshot["refreshing"] = True
+                threading.Thread(target=_refresh_ticker_snapshot, args=(snapshot,), daemon=True).start()
+
+    return snapshot["data"]
+
+perf.phase("header")
 
 # Header - full width title
 # Dynamic title based on theme
@@ -137,10 +216,12 @@ if st.session_state.app_theme != 'Corporate':
     if ticker_data:
         st.markdown(raygun.generate_ticker_html(ticker_data), unsafe_allow_html=True)
 
+perf.phase("sidebar")
+
 # === SIDEBAR - Tools & Info ===
 
 # Market Status (at top of sidebar)
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 try:
     ny_tz = pytz.timezone('America/New_York')
@@ -181,6 +262,18 @@ ticker = st.sidebar.text_input("TICKER", value=st.session_state.ticker, placehol
 if ticker:
     st.session_state.ticker = ticker
 
+# Prefetch: al cambiar de ticker se lanzan en paralelo todos los endpoints de las pestañas
+if ticker and st.session_state.get('prefetch_ticker') != ticker:
+    ticker_prefetch.cancel_prefetch(st.session_state.get('prefetch_futures', {}))
+    st.session_state.prefetch_futures = ticker_prefetch.start_prefetch(ticker)
+    st.session_state.prefetch_ticker = ticker
+
+
+def prefetched(name, fallback):
+    """Resultado prefetcheado del ticker actual (se renueva al vencer su PREFETCH_MAX_AGE); fallback() si no aplica."""
+    with perf.span(f"prefetch:{name}"):
+        return ticker_prefetch.get_prefetched(st.session_state.get('prefetch_futures', {}), name, fallback)
+
 # Quick access - horizontal rectangle buttons in 2 columns
 st.sidebar.markdown(raygun.get_sidebar_section("Quick Access"), unsafe_allow_html=True)
 
@@ -246,99 +339,190 @@ with st.sidebar.popover("⚙️ Edit Tickers", use_container_width=True):
             st.session_state.quick_symbols = parsed[:8]
             st.rerun()
 
+# === DAILY BARS ===
+# Ventana más amplia que pide el dashboard: 2Y del tab Precios + 250 días de calentamiento de EMAs
+DAILY_HISTORY_DAYS = 730 + 250
+# Frescura de las barras diarias durante la sesión regular
+DAILY_BARS_REFRESH_MINUTES = 5
+
+
+def ny_trading_day():
+    """Fecha de la última sesión de mercado en Nueva York (fin de semana → viernes)."""
+    today = datetime.now(pytz.timezone('America/New_York')).date()
+    return today - timedelta(days=max(today.weekday() - 4, 0))
+
+
+def market_freshness_key():
+    """
+    Llave de frescura según el estado del mercado.
+
+    En sesión regular cambia cada DAILY_BARS_REFRESH_MINUTES minutos; fuera
+    de ella queda fija hasta la siguiente apertura (pre-market sigue usando
+    el cierre de la sesión anterior).
+    """
+    now = datetime.now(pytz.timezone('America/New_York'))
+    minutes = now.hour * 60 + now.minute
+    if now.weekday() < 5 and 9 * 60 + 30 <= minutes < 16 * 60:
+        return f"{now.date()} {minutes // DAILY_BARS_REFRESH_MINUTES}"
+    last_session = ny_trading_day()
+    if now.weekday() < 5 and minutes < 9 * 60 + 30:
+        last_session -= timedelta(days=3 if now.weekday() == 0 else 1)
+    return f"{last_session} closed"
+
+
+@perf.cache_probe("daily_bars")
+@st.cache_data(ttl=24 * 3600, max_entries=64, show_spinner=False)
+@perf.timed("dashboard._fetch_daily_bars")
+def _fetch_daily_bars(symbol, freshness):
+    """Una sola descarga de DAILY_HISTORY_DAYS de barras diarias por (ticker, frescura)."""
+    start = (datetime.now() - timedelta(days=DAILY_HISTORY_DAYS)).strftime('%Y-%m-%d')
+    data = market_data.obb_call("equity.price.historical", symbol, start_date=start, interval="1d", provider="yfinance")
+    df = data.to_dataframe()
+    return df[~df.index.duplicated(keep='first')]
+
+
+def get_daily_bars(symbol, days=None):
+    """
+    Barras diarias (open/high/low/close/volume) compartidas por todo el dashboard.
+
+    El header de Perfil, el POC, el ATR y el tab Precios (Daily/Weekly) leen
+    recortes de la misma descarga, así que cambiar de ticker cuesta una sola
+    llamada de red.
+
+    Args:
+        symbol: Ticker
+        days: Días calendario hacia atrás; None para toda la ventana
+
+    Returns:
+        DataFrame con índice de fechas (vacío si no hay datos)
+    """
+    df = _fetch_daily_bars(symbol.upper(), market_freshness_key())
+    if days is None or df.empty:
+        return df
+    cutoff = (datetime.now() - timedelta(days=days)).date()
+    return df[pd.to_datetime(df.index).date >= cutoff]
+
+
 # === CALCULATORS ===
-st.sidebar.markdown(raygun.get_sidebar_section("Calculators"), unsafe_allow_html=True)
-calc_type = st.sidebar.selectbox("Type", ["SL/TP Calculator", "Position Size", "Compound Interest", "Currency Exchange"], key="calc_type", label_visibility="collapsed")
-
-if calc_type == "SL/TP Calculator":
-    sltp_ticker = st.sidebar.text_input("Ticker", value=ticker, key="sltp_ticker").upper()
-    sltp_cols1 = st.sidebar.columns(2)
-    sltp_entry = sltp_cols1[0].number_input("Entry ($)", value=150.0, min_value=0.01, step=1.0, key="sltp_entry")
-    sltp_direction = sltp_cols1[1].selectbox("Direction", ["LONG", "SHORT"], key="sltp_direction")
-    sltp_rr = st.sidebar.selectbox("Risk/Reward", ["1:1", "1:2", "1:3", "1:4"], key="sltp_rr", index=1)
-
-    # Fetch ATR for the ticker
-    atr_value = None
-    atr_pct = 2.0  # Default fallback
-    try:
-        hist_data = obb.equity.price.historical(sltp_ticker, provider="yfinance", period="1mo", interval="1d")
-        df_hist = hist_data.to_dataframe()
-        if not df_hist.empty and len(df_hist) >= 14:
-            # Calculate ATR (14-period)
-            df_hist['hl'] = df_hist['high'] - df_hist['low']
-            df_hist['hc'] = abs(df_hist['high'] - df_hist['close'].shift(1))
-            df_hist['lc'] = abs(df_hist['low'] - df_hist['close'].shift(1))
-            df_hist['tr'] = df_hist[['hl', 'hc', 'lc']].max(axis=1)
-            atr_value = df_hist['tr'].rolling(14).mean().iloc[-1]
-            current_price = df_hist['close'].iloc[-1]
-            atr_pct = (atr_value / current_price) * 100
-    except Exception:
-        pass
-
-    # Calculate SL/TP based on ATR or percentage
-    rr_multiplier = {"1:1": 1, "1:2": 2, "1:3": 3, "1:4": 4}[sltp_rr]
-
-    if atr_value:
-        sl_distance = atr_value * 1.5  # 1.5x ATR for SL
-        tp_distance = sl_distance * rr_multiplier
-        atr_display = f"ATR(14): ${atr_value:.2f} ({atr_pct:.1f}%)"
-    else:
-        sl_distance = sltp_entry * 0.02  # 2% fallback
-        tp_distance = sl_distance * rr_multiplier
-        atr_display = "ATR: N/A (using 2%)"
 
-    if sltp_direction == "LONG":
-        sl_price = sltp_entry - sl_distance
-        tp_price = sltp_entry + tp_distance
-    else:
-        sl_price = sltp_entry + sl_distance
-        tp_price = sltp_entry - tp_distance
-
-    sl_pct = abs(sltp_entry - sl_price) / sltp_entry * 100
-    tp_pct = abs(tp_price - sltp_entry) / sltp_entry * 100
-
-    st.sidebar.markdown(f'<div style="font-size:0.75rem;color:#888;margin:4px 0;">{atr_display}</div>', unsafe_allow_html=True)
-    st.sidebar.markdown(f'<div style="background:rgba(255,51,102,0.15);border:1px solid #FF3366;padding:8px;margin-top:4px;"><div style="color:#888;font-size:0.7rem;">STOP LOSS</div><div style="color:#FF3366;font-size:1.2rem;font-family:Bebas Neue,sans-serif;">${sl_price:.2f}</div><div style="color:#FF3366;font-size:0.75rem;">-{sl_pct:.1f}% from entry</div></div>', unsafe_allow_html=True)
-    st.sidebar.markdown(f'<div style="background:rgba(57,255,20,0.15);border:1px solid #39FF14;padding:8px;margin-top:4px;"><div style="color:#888;font-size:0.7rem;">TAKE PROFIT</div><div style="color:#39FF14;font-size:1.2rem;font-family:Bebas Neue,sans-serif;">${tp_price:.2f}</div><div style="color:#39FF14;font-size:0.75rem;">+{tp_pct:.1f}% from entry</div></div>', unsafe_allow_html=True)
-
-elif calc_type == "Compound Interest":
-    ci_principal = st.sidebar.number_input("Principal ($)", value=10000.0, min_value=0.0, step=100.0, key="ci_principal")
-    ci_cols = st.sidebar.columns(2)
-    ci_rate = ci_cols[0].number_input("Rate (%)", value=7.0, min_value=0.0, max_value=100.0, step=0.5, key="ci_rate")
-    ci_years = ci_cols[1].number_input("Years", value=10, min_value=1, max_value=50, step=1, key="ci_years")
-    ci_compound = st.sidebar.selectbox("Frequency", ["Monthly", "Quarterly", "Annually"], key="ci_compound")
-    n_periods = {"Monthly": 12, "Quarterly": 4, "Annually": 1}[ci_compound]
-    ci_result = ci_principal * (1 + (ci_rate/100)/n_periods) ** (n_periods * ci_years)
-    ci_gain = ci_result - ci_principal
-    st.sidebar.markdown(f'<div style="background:rgba(57,255,20,0.1);border:1px solid #39FF14;padding:8px;margin-top:6px;"><div style="color:#39FF14;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">${ci_result:,.2f}</div><div style="color:#00FFFF;font-size:0.8rem;">+${ci_gain:,.2f} ({(ci_gain/ci_principal)*100:.1f}%)</div></div>', unsafe_allow_html=True)
-
-elif calc_type == "Currency Exchange":
-    cx_amount = st.sidebar.number_input("Amount", value=1000.0, min_value=0.0, step=10.0, key="cx_amount")
-    cx_cols = st.sidebar.columns(2)
-    cx_from = cx_cols[0].selectbox("From", ["USD", "EUR", "GBP", "JPY", "MXN", "CAD", "CHF"], key="cx_from")
-    cx_to = cx_cols[1].selectbox("To", ["MXN", "EUR", "GBP", "JPY", "USD", "CAD", "CHF"], key="cx_to")
-    rates_to_usd = {"USD": 1, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0067, "MXN": 0.058, "CAD": 0.74, "CHF": 1.13}
-    usd_to_rates = {"USD": 1, "EUR": 0.93, "GBP": 0.79, "JPY": 149.5, "MXN": 17.2, "CAD": 1.35, "CHF": 0.88}
-    if cx_from == cx_to:
-        cx_result = cx_amount
-    else:
-        usd_value = cx_amount * rates_to_usd[cx_from]
-        cx_result = usd_value * usd_to_rates[cx_to]
-    rate_display = cx_result / cx_amount if cx_amount > 0 else 0
-    st.sidebar.markdown(f'<div style="background:rgba(0,255,255,0.1);border:1px solid #00FFFF;padding:8px;margin-top:6px;"><div style="color:#00FFFF;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">{cx_result:,.2f} {cx_to}</div><div style="color:#FF00FF;font-size:0.8rem;">1 {cx_from} = {rate_display:.4f} {cx_to}</div></div>', unsafe_allow_html=True)
-
-elif calc_type == "Position Size":
-    ps_cols1 = st.sidebar.columns(2)
-    ps_capital = ps_cols1[0].number_input("Capital ($)", value=25000.0, min_value=0.0, step=1000.0, key="ps_capital")
-    ps_risk_pct = ps_cols1[1].number_input("Risk (%)", value=2.0, min_value=0.1, max_value=10.0, step=0.5, key="ps_risk")
-    ps_cols2 = st.sidebar.columns(2)
-    ps_entry = ps_cols2[0].number_input("Entry ($)", value=150.0, min_value=0.01, step=1.0, key="ps_entry")
-    ps_stop = ps_cols2[1].number_input("Stop ($)", value=145.0, min_value=0.01, step=1.0, key="ps_stop")
-    ps_risk_amount = ps_capital * (ps_risk_pct / 100)
-    ps_risk_per_share = abs(ps_entry - ps_stop)
-    ps_shares = int(ps_risk_amount / ps_risk_per_share) if ps_risk_per_share > 0 else 0
-    ps_position_value = ps_shares * ps_entry
-    st.sidebar.markdown(f'<div style="background:rgba(255,0,255,0.1);border:1px solid #FF00FF;padding:8px;margin-top:6px;"><div style="color:#FF00FF;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">{ps_shares} shares</div><div style="color:#E0E0E0;font-size:0.8rem;">${ps_position_value:,.2f} | Risk: ${ps_risk_amount:,.2f}</div></div>', unsafe_allow_html=True)
+
+@perf.cache_probe("atr")
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+@perf.timed("dashboard.fetch_atr")
+def fetch_atr(symbol, trading_day):
+    """
+    ATR(14) diario de un ticker, cacheado por (ticker, día de mercado).
+
+    trading_day solo forma parte de la llave de cache. Los errores de red se
+    propagan para no cachear el fallo.
+
+    Returns:
+        Tupla (atr_value, atr_pct); (None, 2.0) si no hay historia suficiente
+    """
+    df_hist = get_daily_bars(symbol, days=31).copy()
+    if df_hist.empty or len(df_hist) < 14:
+        return None, 2.0
+
+    # Calculate ATR (14-period)
+    df_hist['hl'] = df_hist['high'] - df_hist['low']
+    df_hist['hc'] = abs(df_hist['high'] - df_hist['close'].shift(1))
+    df_hist['lc'] = abs(df_hist['low'] - df_hist['close'].shift(1))
+    df_hist['tr'] = df_hist[['hl', 'hc', 'lc']].max(axis=1)
+    atr_value = df_hist['tr'].rolling(14).mean().iloc[-1]
+    current_price = df_hist['close'].iloc[-1]
+    return float(atr_value), float((atr_value / current_price) * 100)
+
+
+@st.fragment
+def render_calculators(default_ticker):
+    """
+    Calculadoras del sidebar como fragmento: cambiar sus inputs solo
+    vuelve a ejecutar esta función, no el dashboard completo.
+    """
+    st.markdown(raygun.get_sidebar_section("Calculators"), unsafe_allow_html=True)
+    calc_type = st.selectbox("Type", ["SL/TP Calculator", "Position Size", "Compound Interest", "Currency Exchange"], key="calc_type", label_visibility="collapsed")
+
+    if calc_type == "SL/TP Calculator":
+        sltp_ticker = st.text_input("Ticker", value=default_ticker, key="sltp_ticker").upper()
+        sltp_cols1 = st.columns(2)
+        sltp_entry = sltp_cols1[0].number_input("Entry ($)", value=150.0, min_value=0.01, step=1.0, key="sltp_entry")
+        sltp_direction = sltp_cols1[1].selectbox("Direction", ["LONG", "SHORT"], key="sltp_direction")
+        sltp_rr = st.selectbox("Risk/Reward", ["1:1", "1:2", "1:3", "1:4"], key="sltp_rr", index=1)
+
+        # ATR cacheado por (ticker, día de mercado): mover entry o R/R no toca la red
+        try:
+            atr_value, atr_pct = fetch_atr(sltp_ticker, ny_trading_day())
+        except Exception:
+            atr_value, atr_pct = None, 2.0
+
+        # Calculate SL/TP based on ATR or percentage
+        rr_multiplier = {"1:1": 1, "1:2": 2, "1:3": 3, "1:4": 4}[sltp_rr]
+
+        if atr_value:
+            sl_distance = atr_value * 1.5  # 1.5x ATR for SL
+            tp_distance = sl_distance * rr_multiplier
+            atr_display = f"ATR(14): ${atr_value:.2f} ({atr_pct:.1f}%)"
+        else:
+            sl_distance = sltp_entry * 0.02  # 2% fallback
+            tp_distance = sl_distance * rr_multiplier
+            atr_display = "ATR: N/A (using 2%)"
+
+        if sltp_direction == "LONG":
+            sl_price = sltp_entry - sl_distance
+            tp_price = sltp_entry + tp_distance
+        else:
+            sl_price = sltp_entry + sl_distance
+            tp_price = sltp_entry - tp_distance
+
+        sl_pct = abs(sltp_entry - sl_price) / sltp_entry * 100
+        tp_pct = abs(tp_price - sltp_entry) / sltp_entry * 100
+
+        st.markdown(f'<div style="font-size:0.75rem;color:#888;margin:4px 0;">{atr_display}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div style="background:rgba(255,51,102,0.15);border:1px solid #FF3366;padding:8px;margin-top:4px;"><div style="color:#888;font-size:0.7rem;">STOP LOSS</div><div style="color:#FF3366;font-size:1.2rem;font-family:Bebas Neue,sans-serif;">${sl_price:.2f}</div><div style="color:#FF3366;font-size:0.75rem;">-{sl_pct:.1f}% from entry</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div style="background:rgba(57,255,20,0.15);border:1px solid #39FF14;padding:8px;margin-top:4px;"><div style="color:#888;font-size:0.7rem;">TAKE PROFIT</div><div style="color:#39FF14;font-size:1.2rem;font-family:Bebas Neue,sans-serif;">${tp_price:.2f}</div><div style="color:#39FF14;font-size:0.75rem;">+{tp_pct:.1f}% from entry</div></div>', unsafe_allow_html=True)
+
+    elif calc_type == "Compound Interest":
+        ci_principal = st.number_input("Principal ($)", value=10000.0, min_value=0.0, step=100.0, key="ci_principal")
+        ci_cols = st.columns(2)
+        ci_rate = ci_cols[0].number_input("Rate (%)", value=7.0, min_value=0.0, max_value=100.0, step=0.5, key="ci_rate")
+        ci_years = ci_cols[1].number_input("Years", value=10, min_value=1, max_value=50, step=1, key="ci_years")
+        ci_compound = st.selectbox("Frequency", ["Monthly", "Quarterly", "Annually"], key="ci_compound")
+        n_periods = {"Monthly": 12, "Quarterly": 4, "Annually": 1}[ci_compound]
+        ci_result = ci_principal * (1 + (ci_rate/100)/n_periods) ** (n_periods * ci_years)
+        ci_gain = ci_result - ci_principal
+        st.markdown(f'<div style="background:rgba(57,255,20,0.1);border:1px solid #39FF14;padding:8px;margin-top:6px;"><div style="color:#39FF14;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">${ci_result:,.2f}</div><div style="color:#00FFFF;font-size:0.8rem;">+${ci_gain:,.2f} ({(ci_gain/ci_principal)*100:.1f}%)</div></div>', unsafe_allow_html=True)
+
+    elif calc_type == "Currency Exchange":
+        cx_amount = st.number_input("Amount", value=1000.0, min_value=0.0, step=10.0, key="cx_amount")
+        cx_cols = st.columns(2)
+        cx_from = cx_cols[0].selectbox("From", ["USD", "EUR", "GBP", "JPY", "MXN", "CAD", "CHF"], key="cx_from")
+        cx_to = cx_cols[1].selectbox("To", ["MXN", "EUR", "GBP", "JPY", "USD", "CAD", "CHF"], key="cx_to")
+        rates_to_usd = {"USD": 1, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0067, "MXN": 0.058, "CAD": 0.74, "CHF": 1.13}
+        usd_to_rates = {"USD": 1, "EUR": 0.93, "GBP": 0.79, "JPY": 149.5, "MXN": 17.2, "CAD": 1.35, "CHF": 0.88}
+        if cx_from == cx_to:
+            cx_result = cx_amount
+        else:
+            usd_value = cx_amount * rates_to_usd[cx_from]
+            cx_result = usd_value * usd_to_rates[cx_to]
+        rate_display = cx_result / cx_amount if cx_amount > 0 else 0
+        st.markdown(f'<div style="background:rgba(0,255,255,0.1);border:1px solid #00FFFF;padding:8px;margin-top:6px;"><div style="color:#00FFFF;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">{cx_result:,.2f} {cx_to}</div><div style="color:#FF00FF;font-size:0.8rem;">1 {cx_from} = {rate_display:.4f} {cx_to}</div></div>', unsafe_allow_html=True)
+
+    elif calc_type == "Position Size":
+        ps_cols1 = st.columns(2)
+        ps_capital = ps_cols1[0].number_input("Capital ($)", value=25000.0, min_value=0.0, step=1000.0, key="ps_capital")
+        ps_risk_pct = ps_cols1[1].number_input("Risk (%)", value=2.0, min_value=0.1, max_value=10.0, step=0.5, key="ps_risk")
+        ps_cols2 = st.columns(2)
+        ps_entry = ps_cols2[0].number_input("Entry ($)", value=150.0, min_value=0.01, step=1.0, key="ps_entry")
+        ps_stop = ps_cols2[1].number_input("Stop ($)", value=145.0, min_value=0.01, step=1.0, key="ps_stop")
+        ps_risk_amount = ps_capital * (ps_risk_pct / 100)
+        ps_risk_per_share = abs(ps_entry - ps_stop)
+        ps_shares = int(ps_risk_amount / ps_risk_per_share) if ps_risk_per_share > 0 else 0
+        ps_position_value = ps_shares * ps_entry
+        st.markdown(f'<div style="background:rgba(255,0,255,0.1);border:1px solid #FF00FF;padding:8px;margin-top:6px;"><div style="color:#FF00FF;font-size:1.3rem;font-family:Bebas Neue,sans-serif;">{ps_shares} shares</div><div style="color:#E0E0E0;font-size:0.8rem;">${ps_position_value:,.2f} | Risk: ${ps_risk_amount:,.2f}</div></div>', unsafe_allow_html=True)
+
+
+with st.sidebar:
+    render_calculators(ticker)
 
 # Settings
 st.sidebar.markdown(raygun.get_sidebar_section("Settings"), unsafe_allow_html=True)
@@ -402,146 +586,49 @@ def format_market_cap(value):
     else:
         return f"${num_value:,.2f}"
 
-# Función para calcular POC y niveles de liquidación
-def calculate_poc_and_levels(df, current_price):
-    """Calculate Point of Control (POC) and key liquidity levels."""
-    if df is None or len(df) < 20:
-        return None
-    try:
-        price_range = df['high'].max() - df['low'].min()
-        num_bins = 50
-        bin_size = price_range / num_bins
-        bins = {}
-        for _, row in df.iterrows():
-            low = row['low']
-            high = row['high']
-            vol = row['volume']
-            price_levels = int((high - low) / bin_size) + 1
-            vol_per_level = vol / max(price_levels, 1)
-            for i in range(price_levels):
-                price_level = round((low + i * bin_size) / bin_size) * bin_size
-                bins[price_level] = bins.get(price_level, 0) + vol_per_level
-        if not bins:
-            return None
-        poc = max(bins, key=bins.get)
-        total_volume = sum(bins.values())
-        sorted_bins = sorted(bins.items(), key=lambda x: x[1], reverse=True)
-        cumulative_vol = 0
-        value_area_prices = []
-        for price, vol in sorted_bins:
-            cumulative_vol += vol
-            value_area_prices.append(price)
-            if cumulative_vol >= total_volume * 0.7:
-                break
-        value_area_high = max(value_area_prices) if value_area_prices else poc
-        value_area_low = min(value_area_prices) if value_area_prices else poc
-        liquidation_levels = []
-        base = 10 ** (len(str(int(current_price))) - 2)
-        for i in range(-5, 6):
-            level = round(current_price / base) * base + i * base
-            if level > 0:
-                liquidation_levels.append({'price': level, 'type': 'ROUND', 'delta': ((level - current_price) / current_price) * 100})
-        liquidation_levels.append({'price': poc, 'type': 'POC', 'delta': ((poc - current_price) / current_price) * 100})
-        liquidation_levels.append({'price': value_area_high, 'type': 'VAH', 'delta': ((value_area_high - current_price) / current_price) * 100})
-        liquidation_levels.append({'price': value_area_low, 'type': 'VAL', 'delta': ((value_area_low - current_price) / current_price) * 100})
-        liquidation_levels.sort(key=lambda x: abs(x['delta']))
-        return {'poc': poc, 'value_area_high': value_area_high, 'value_area_low': value_area_low, 'levels': liquidation_levels[:8], 'volume_profile': bins}
-    except:
-        return None
-
-# === TAB PERSISTENCE ===
-# JavaScript robusto con MutationObserver para persistir tabs
-tab_persistence_js = """
-<script>
-(function() {
-    const TAB_STORAGE_KEY = 'dashboard_active_tab';
-
-    function getStoredTab() {
-        // Primero verificar URL
-        const urlParams = new URLSearchParams(window.location.search);
-        const urlTab = urlParams.get('tab');
-        if (urlTab !== null) return parseInt(urlTab);
-
-        // Luego localStorage
-        const stored = localStorage.getItem(TAB_STORAGE_KEY);
-        if (stored !== null) return parseInt(stored);
-
-        return 0;
-    }
-
-    function saveTab(index) {
-        localStorage.setItem(TAB_STORAGE_KEY, index);
-        const url = new URL(window.location);
-        url.searchParams.set('tab', index);
-        window.history.replaceState({}, '', url);
-    }
-
-    function setupTabs() {
-        const tabs = document.querySelectorAll('[data-baseweb="tab"]');
-        if (tabs.length < 8) return false;
-
-        const savedTab = getStoredTab();
-
-        // Click en el tab guardado si no es el primero
-        if (savedTab > 0 && savedTab < tabs.length) {
-            const targetTab = tabs[savedTab];
-            const isSelected = targetTab.getAttribute('aria-selected') === 'true';
-            if (!isSelected) {
-                targetTab.click();
-            }
-        }
-
-        // Configurar listeners
-        tabs.forEach(function(tab, index) {
-            if (!tab.dataset.persistListener) {
-                tab.dataset.persistListener = 'true';
-                tab.addEventListener('click', function() {
-                    saveTab(index);
-                });
-            }
-        });
-
-        return true;
-    }
-
-    // MutationObserver para detectar cuando los tabs están listos
-    const observer = new MutationObserver(function(mutations) {
-        if (setupTabs()) {
-            observer.disconnect();
-        }
-    });
-
-    // Observar el body para cambios
-    observer.observe(document.body, {
-        childList: true,
-        subtree: true
-    });
-
-    // También intentar inmediatamente y con delays
-    setupTabs();
-    setTimeout(setupTabs, 100);
-    setTimeout(setupTabs, 300);
-    setTimeout(setupTabs, 500);
-
-    // Desconectar observer después de 5 segundos para no afectar performance
-    setTimeout(function() { observer.disconnect(); }, 5000);
-})();
-</script>
-"""
-st.markdown(tab_persistence_js, unsafe_allow_html=True)
-
-# Tabs principales
-tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["🏢 Perfil", "📈 Precios", "📊 Opciones", "📋 Financieros", "🎯 Análisis", "🛡️ Hedge", "📦 Fondos", "💼 Portfolio"])
+# === NAVEGACIÓN ENTRE TABS ===
+# st.tabs ejecuta el cuerpo de las 9 pestañas en cada rerun (opciones,
+# financieros, insiders, hedge...). Con un selector + if solo corre la
+# sección visible; la selección se refleja en ?tab= para poder compartir
+# o recargar la URL sin perder la pestaña.
+TABS = ["🏢 Perfil", "📈 Precios", "📊 Opciones", "📋 Financieros", "🎯 Análisis", "🛡️ Hedge", "📦 Fondos", "💼 Portfolio", "🔭 Scanner"]
+TAB_SLUGS = ["perfil", "precios", "opciones", "financieros", "analisis", "hedge", "fondos", "portfolio", "scanner"]
+
+
+def _tab_from_query_params():
+    """Pestaña indicada en la URL (?tab=precios o el índice numérico anterior)."""
+    requested = str(st.query_params.get("tab", "")).lower()
+    if requested in TAB_SLUGS:
+        return TABS[TAB_SLUGS.index(requested)]
+    if requested.isdigit() and int(requested) < len(TABS):
+        return TABS[int(requested)]
+    return TABS[0]
+
+
+def _sync_tab_query_param():
+    """Guarda la pestaña activa en la URL."""
+    st.query_params["tab"] = TAB_SLUGS[TABS.index(st.session_state.active_tab)]
+
+
+if "active_tab" not in st.session_state:
+    st.session_state.active_tab = _tab_from_query_params()
+    _sync_tab_query_param()
+
+active_tab = st.radio(
+    "Sección",
+    TABS,
+    key="active_tab",
+    horizontal=True,
+    label_visibility="collapsed",
+    on_change=_sync_tab_query_param
+)
+perf.phase(f"tab:{TAB_SLUGS[TABS.index(active_tab)]}")
 
 # TAB 1: Perfil de la Empresa
-with tab1:
+if active_tab == TABS[0]:
     # Fetch current price for header
     try:
-        from datetime import datetime, timedelta
-        price_end = datetime.now().strftime('%Y-%m-%d')
-        price_start = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d')
-        price_info = obb.equity.price.historical(symbol=ticker, start_date=price_start, end_date=price_end, provider="yfinance")
-        price_df = price_info.to_dataframe()
+        price_df = get_daily_bars(ticker, days=5)
         if not price_df.empty:
             current_px = price_df['close'].iloc[-1]
             prev_px = price_df['close'].iloc[-2] if len(price_df) > 1 else current_px
@@ -556,7 +643,7 @@ with tab1:
 
     try:
         with st.spinner("Cargando perfil..."):
-            profile = obb.equity.profile(ticker)
+            profile = prefetched("profile", lambda: market_data.obb_call("equity.profile", ticker))
             df_profile = profile.to_dataframe()
 
             if not df_profile.empty:
@@ -596,11 +683,8 @@ with tab1:
                 selling_count = 0
 
                 try:
-                    import yfinance as yf
-                    yf_ticker = yf.Ticker(ticker)
-
                     # Get institutional holders
-                    inst_holders = yf_ticker.institutional_holders
+                    inst_holders = prefetched("institutional_holders", lambda: market_data.ticker_attr(ticker, "institutional_holders"))
                     if inst_holders is not None and not inst_holders.empty:
                         num_institutions = len(inst_holders)
                         if 'Shares' in inst_holders.columns:
@@ -626,7 +710,7 @@ with tab1:
                                     pass
 
                     # Get info for more data
-                    info = yf_ticker.info
+                    info = prefetched("info", lambda: market_data.ticker_attr(ticker, "info"))
                     if info:
                         held_pct_inst = info.get('heldPercentInstitutions')
                         held_pct_insider = info.get('heldPercentInsiders')
@@ -751,11 +835,7 @@ with tab1:
                     st.markdown("---")
                     st.subheader("📊 POC & Niveles Clave (3M)")
                     try:
-                        from datetime import datetime, timedelta
-                        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-                        end_date = datetime.now().strftime('%Y-%m-%d')
-                        price_data = obb.equity.price.historical(symbol=ticker, start_date=start_date, end_date=end_date, provider="yfinance")
-                        price_df = price_data.to_dataframe()
+                        price_df = get_daily_bars(ticker, days=90)
                         if not price_df.empty:
                             current_price = price_df['close'].iloc[-1]
                             poc_data = calculate_poc_and_levels(price_df, current_price)
@@ -806,9 +886,7 @@ with tab1:
 
                     # Institutional Holdings Details (restored to original)
                     try:
-                        import yfinance as yf
-                        yf_ticker = yf.Ticker(ticker)
-                        inst_holders = yf_ticker.institutional_holders
+                        inst_holders = prefetched("institutional_holders", lambda: market_data.ticker_attr(ticker, "institutional_holders"))
                         if inst_holders is not None and not inst_holders.empty:
                             st.markdown("---")
                             st.subheader("🏦 Top Instituciones")
@@ -846,6 +924,7 @@ with tab1:
         st.error(f"Error al cargar perfil: {str(e)}")
 
 # Función para limpiar duplicados de los resultados de OpenBB
+@perf.timed("dashboard.clean_openbb_results")
 def clean_openbb_results(results):
     seen_dates = set()
     clean = []
@@ -856,214 +935,9 @@ def clean_openbb_results(results):
             clean.append(item)
     return clean
 
-# Función para detectar divergencias bullish
-def find_bullish_divergences(df, rsi_series, lookback=5, min_distance=3):
-    """
-    Detecta divergencias bullish: precio hace lower low, RSI hace higher low
-    """
-    divergences = []
-
-    if rsi_series is None or len(rsi_series) < lookback * 2:
-        return divergences
-
-    # Alinear índices
-    common_idx = df.index.intersection(rsi_series.index)
-    if len(common_idx) < lookback * 2:
-        return divergences
-
-    price = df.loc[common_idx, 'low']
-    rsi = rsi_series.loc[common_idx]
-
-    # Encontrar mínimos locales en precio
-    def find_local_mins(series, window=lookback):
-        mins = []
-        for i in range(window, len(series) - window):
-            if series.iloc[i] == series.iloc[i-window:i+window+1].min():
-                mins.append(i)
-        return mins
-
-    price_mins = find_local_mins(price)
-
-    # Buscar divergencias bullish
-    for i in range(1, len(price_mins)):
-        idx1 = price_mins[i-1]
-        idx2 = price_mins[i]
-
-        # Verificar distancia mínima
-        if idx2 - idx1 < min_distance:
-            continue
-
-        # Precio hace lower low
-        price_lower_low = price.iloc[idx2] < price.iloc[idx1]
-
-        # RSI hace higher low
-        rsi_higher_low = rsi.iloc[idx2] > rsi.iloc[idx1]
-
-        if price_lower_low and rsi_higher_low:
-            divergences.append({
-                'date': price.index[idx2],
-                'price': price.iloc[idx2],
-                'rsi': rsi.iloc[idx2],
-                'prev_date': price.index[idx1],
-                'prev_price': price.iloc[idx1],
-                'prev_rsi': rsi.iloc[idx1]
-            })
-
-    return divergences
-
-# Función para detectar divergencias bearish
-def find_bearish_divergences(df, rsi_series, lookback=5, min_distance=3):
-    """
-    Detecta divergencias bearish: precio hace higher high, RSI hace lower high
-    """
-    divergences = []
-
-    if rsi_series is None or len(rsi_series) < lookback * 2:
-        return divergences
-
-    # Alinear índices
-    common_idx = df.index.intersection(rsi_series.index)
-    if len(common_idx) < lookback * 2:
-        return divergences
-
-    price = df.loc[common_idx, 'high']
-    rsi = rsi_series.loc[common_idx]
-
-    # Encontrar máximos locales en precio
-    def find_local_maxs(series, window=lookback):
-        maxs = []
-        for i in range(window, len(series) - window):
-            if series.iloc[i] == series.iloc[i-window:i+window+1].max():
-                maxs.append(i)
-        return maxs
-
-    price_maxs = find_local_maxs(price)
-
-    # Buscar divergencias bearish
-    for i in range(1, len(price_maxs)):
-        idx1 = price_maxs[i-1]
-        idx2 = price_maxs[i]
-
-        # Verificar distancia mínima
-        if idx2 - idx1 < min_distance:
-            continue
-
-        # Precio hace higher high
-        price_higher_high = price.iloc[idx2] > price.iloc[idx1]
-
-        # RSI hace lower high
-        rsi_lower_high = rsi.iloc[idx2] < rsi.iloc[idx1]
-
-        if price_higher_high and rsi_lower_high:
-            divergences.append({
-                'date': price.index[idx2],
-                'price': price.iloc[idx2],
-                'rsi': rsi.iloc[idx2],
-                'prev_date': price.index[idx1],
-                'prev_price': price.iloc[idx1],
-                'prev_rsi': rsi.iloc[idx1]
-            })
-
-    return divergences
-
-
-def calculate_momentum_state(df, ema_data=None):
-    """
-    Calculate momentum state based on multiple indicators.
-    Returns: state, color, description
-    """
-    if df is None or len(df) < 50:
-        return "INSUFFICIENT DATA", "#888888", "Not enough data to calculate momentum"
-
-    close = df['close']
-
-    # Calculate MACD
-    ema12 = close.ewm(span=12, adjust=False).mean()
-    ema26 = close.ewm(span=26, adjust=False).mean()
-    macd = ema12 - ema26
-    signal = macd.ewm(span=9, adjust=False).mean()
-    histogram = macd - signal
-
-    # Calculate RSI
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-
-    # Get current values
-    current_rsi = rsi.iloc[-1]
-    current_macd = macd.iloc[-1]
-    current_signal = signal.iloc[-1]
-    current_histogram = histogram.iloc[-1]
-    prev_histogram = histogram.iloc[-2] if len(histogram) > 1 else 0
-
-    # Check histogram trend (last 3 bars)
-    hist_trend = histogram.iloc[-3:].tolist() if len(histogram) >= 3 else [0, 0, 0]
-    hist_increasing = hist_trend[-1] > hist_trend[-2] > hist_trend[-3]
-    hist_decreasing = hist_trend[-1] < hist_trend[-2] < hist_trend[-3]
-
-    # Check for recent MACD crossovers (last 5 bars)
-    recent_bull_cross = False
-    recent_bear_cross = False
-    for i in range(-5, -1):
-        if len(macd) > abs(i) and len(signal) > abs(i):
-            if macd.iloc[i-1] < signal.iloc[i-1] and macd.iloc[i] > signal.iloc[i]:
-                recent_bull_cross = True
-            if macd.iloc[i-1] > signal.iloc[i-1] and macd.iloc[i] < signal.iloc[i]:
-                recent_bear_cross = True
-
-    # EMA alignment check
-    ema_bullish = False
-    ema_bearish = False
-    if ema_data and len(ema_data) >= 2:
-        emas = sorted(ema_data.items(), key=lambda x: x[0])
-        current_price = close.iloc[-1]
-        short_ema = list(ema_data.values())[0].iloc[-1] if len(list(ema_data.values())[0]) > 0 else current_price
-        if current_price > short_ema:
-            ema_bullish = True
-        else:
-            ema_bearish = True
-
-    # Determine momentum state
-    # FULLY BULLISH: RSI > 60, MACD > Signal, histogram positive & increasing, price > EMAs
-    if current_rsi > 60 and current_macd > current_signal and current_histogram > 0 and hist_increasing and ema_bullish:
-        return "FULLY BULLISH", "#39FF14", "Strong upward momentum across all indicators"
-
-    # FULLY BEARISH: RSI < 40, MACD < Signal, histogram negative & decreasing, price < EMAs
-    if current_rsi < 40 and current_macd < current_signal and current_histogram < 0 and hist_decreasing and ema_bearish:
-        return "FULLY BEARISH", "#FF3366", "Strong downward momentum across all indicators"
-
-    # RECENTLY TURNED BULLISH: Recent MACD bull cross, RSI > 50
-    if recent_bull_cross and current_rsi > 50:
-        return "RECENTLY TURNED BULLISH", "#00FF88", "MACD just crossed bullish, momentum shifting up"
-
-    # RECENTLY TURNED BEARISH: Recent MACD bear cross, RSI < 50
-    if recent_bear_cross and current_rsi < 50:
-        return "RECENTLY TURNED BEARISH", "#FF6B35", "MACD just crossed bearish, momentum shifting down"
-
-    # STARTING TO FLIP BULLISH: MACD approaching signal from below, histogram improving
-    if current_macd < current_signal and current_histogram > prev_histogram and current_rsi > 45:
-        return "STARTING TO FLIP BULLISH", "#FFE600", "Early signs of bullish reversal forming"
-
-    # STARTING TO FLIP BEARISH: MACD approaching signal from above, histogram weakening
-    if current_macd > current_signal and current_histogram < prev_histogram and current_rsi < 55:
-        return "STARTING TO FLIP BEARISH", "#FF9500", "Early signs of bearish reversal forming"
-
-    # BULLISH: RSI > 50, MACD > Signal
-    if current_rsi > 50 and current_macd > current_signal:
-        return "BULLISH", "#00FFFF", "Positive momentum, trend favors upside"
-
-    # BEARISH: RSI < 50, MACD < Signal
-    if current_rsi < 50 and current_macd < current_signal:
-        return "BEARISH", "#FF00FF", "Negative momentum, trend favors downside"
-
-    # NEUTRAL
-    return "NEUTRAL", "#888888", "Mixed signals, no clear momentum direction"
-
 
 # TAB 2: Precios Históricos
-with tab2:
+if active_tab == TABS[1]:
     st.header(f"Precios Históricos - {ticker}")
 
     col1, col2, col3, col4 = st.columns(4)
@@ -1115,8 +989,12 @@ with tab2:
             start = (datetime.now() - timedelta(days=period_map[period] + extra_days)).strftime("%Y-%m-%d")
 
             interval = timeframe_map[timeframe]
-            data = obb.equity.price.historical(ticker, start_date=start, interval=interval, provider='yfinance')
-            df = data.to_dataframe()
+            if interval == "1d":
+                # Daily/Weekly: recorte de las barras diarias compartidas
+                df = get_daily_bars(ticker, days=period_map[period] + extra_days)
+            else:
+                data = market_data.obb_call("equity.price.historical", ticker, start_date=start, interval=interval, provider='yfinance')
+                df = data.to_dataframe()
 
             if not df.empty:
                 # Eliminar duplicados en el índice
@@ -1137,77 +1015,31 @@ with tab2:
                 ema_colors = raygun.EMA_COLORS
                 ema_data = {}
                 rsi_series = None
-
-                if timeframe == "Weekly":
-                    # Para weekly, calcular EMAs directamente del df resampleado
-                    for ema_length in show_emas:
-                        df[f'ema_{ema_length}'] = df['close'].ewm(span=ema_length, adjust=False).mean()
-                        ema_data[ema_length] = df[f'ema_{ema_length}']
-                    # RSI para weekly
-                    delta = df['close'].diff()
-                    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi_series = 100 - (100 / (1 + rs))
-                else:
-                    # Calcular indicadores con pandas/ta (sin depender de obb.technical)
-                    from ta.trend import EMAIndicator
-                    from ta.momentum import RSIIndicator
-
-                    for ema_length in show_emas:
-                        try:
-                            ema_indicator = EMAIndicator(close=df['close'], window=ema_length)
-                            ema_data[ema_length] = ema_indicator.ema_indicator()
-                        except Exception as e:
-                            st.warning(f"No se pudo calcular EMA {ema_length}: {e}")
-
-                    # RSI con ta library
-                    try:
-                        rsi_indicator = RSIIndicator(close=df['close'], window=14)
-                        rsi_series = rsi_indicator.rsi()
-                    except Exception as e:
-                        st.warning(f"No se pudo calcular RSI: {e}")
-
-                # Calcular VWAP (manual - no depende de obb.technical)
                 vwap_series = None
-                if show_vwap:
-                    try:
-                        typical_price = (df['high'] + df['low'] + df['close']) / 3
-                        vwap_series = (typical_price * df['volume']).cumsum() / df['volume'].cumsum()
-                    except Exception as e:
-                        st.warning(f"No se pudo calcular VWAP: {e}")
+                indicators = None
 
-                # Recortar datos al período seleccionado
+                # Grafo de indicadores: se calculan sobre todas las barras (calentamiento)
+                # con el motor incremental y se comparten entre el gráfico, el momentum
+                # y las divergencias; luego se recortan al período seleccionado
                 cutoff_date = (datetime.now() - timedelta(days=period_map[period])).date()
-                df = df[pd.to_datetime(df.index).date >= cutoff_date]
-
-                # Para Weekly, recalcular ema_data y rsi del df filtrado
-                if timeframe == "Weekly":
-                    ema_data = {}
+                graph = IndicatorGraph(ticker, "1wk" if timeframe == "Weekly" else interval, df, window_start=cutoff_date)
+                df = graph.get("window")
+                try:
+                    indicators = graph.get("window_indicators")
                     for ema_length in show_emas:
-                        if f'ema_{ema_length}' in df.columns:
-                            ema_data[ema_length] = df[f'ema_{ema_length}']
-                    # RSI ya está recortado porque es calculado sobre df
-                    delta = df['close'].diff()
-                    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                    rs = gain / loss
-                    rsi_series = 100 - (100 / (1 + rs))
-                else:
-                    for ema_length in list(ema_data.keys()):
-                        ema_data[ema_length] = ema_data[ema_length][pd.to_datetime(ema_data[ema_length].index).date >= cutoff_date]
-                    if rsi_series is not None:
-                        rsi_series = rsi_series[pd.to_datetime(rsi_series.index).date >= cutoff_date]
-                    if vwap_series is not None:
-                        vwap_series = vwap_series[pd.to_datetime(vwap_series.index).date >= cutoff_date]
-
-                # Para Weekly, recalcular VWAP del df filtrado
-                if timeframe == "Weekly" and show_vwap:
-                    typical_price = (df['high'] + df['low'] + df['close']) / 3
-                    vwap_series = (typical_price * df['volume']).cumsum() / df['volume'].cumsum()
+                        ema_data[ema_length] = indicators[f'ema_{ema_length}']
+                    rsi_series = indicators['rsi']
+                    if show_vwap:
+                        vwap_series = indicators['vwap']
+                except Exception as e:
+                    indicators = None
+                    st.warning(f"No se pudieron calcular los indicadores: {e}")
 
                 # === MOMENTUM INDICATOR ===
-                momentum_state, momentum_color, momentum_desc = calculate_momentum_state(df, ema_data)
+                if indicators is not None:
+                    momentum_state, momentum_color, momentum_desc = graph.get("momentum", emas=tuple(show_emas))
+                else:
+                    momentum_state, momentum_color, momentum_desc = calculate_momentum_state(df, ema_data)
 
                 st.markdown(f"""
                 <div style="
@@ -1343,12 +1175,9 @@ with tab2:
                                  annotation_text="OVERSOLD (30)", row=3, col=1)
                     fig.add_hline(y=50, line_dash="dot", line_color=raygun.COLORS['text_muted'], row=3, col=1)
 
-                    # Detectar y marcar Bullish Divergences
-                    # Necesitamos crear un df temporal con índice de fecha para las funciones de divergencia
-                    df_for_div = df.set_index(date_col)
-
+                    # Detectar y marcar Bullish Divergences (sobre el RSI compartido del grafo)
                     if show_bull_div:
-                        bull_divs = find_bullish_divergences(df_for_div, rsi_series)
+                        bull_divs = graph.get("bullish_divergences")
 
                         if bull_divs:
                             for div in bull_divs:
@@ -1399,7 +1228,7 @@ with tab2:
 
                     # Detectar y marcar Bearish Divergences
                     if show_bear_div:
-                        bear_divs = find_bearish_divergences(df_for_div, rsi_series)
+                        bear_divs = graph.get("bearish_divergences")
 
                         if bear_divs:
                             for div in bear_divs:
@@ -1648,13 +1477,13 @@ with tab2:
         st.code(traceback.format_exc())
 
 # TAB 3: Opciones
-with tab3:
+if active_tab == TABS[2]:
     st.header(f"Opciones - {ticker}")
 
     try:
         with st.spinner("Cargando cadena de opciones..."):
             # Obtener cadena de opciones
-            options = obb.derivatives.options.chains(ticker)
+            options = prefetched("options", lambda: market_data.obb_call("derivatives.options.chains", ticker))
             df_options = options.to_dataframe()
 
             if not df_options.empty:
@@ -1746,7 +1575,7 @@ with tab3:
         st.info("Algunos proveedores requieren API keys adicionales para datos de opciones")
 
 # TAB 4: Financieros
-with tab4:
+if active_tab == TABS[3]:
     st.header(f"Estados Financieros - {ticker}")
 
     col1, col2 = st.columns(2)
@@ -1759,11 +1588,17 @@ with tab4:
     try:
         with st.spinner("Cargando datos financieros..."):
             if financial_type == "Income Statement":
-                data = obb.equity.fundamental.income(ticker, period=period_type, limit=5)
+                statement = "income"
             elif financial_type == "Balance Sheet":
-                data = obb.equity.fundamental.balance(ticker, period=period_type, limit=5)
+                statement = "balance"
             else:
-                data = obb.equity.fundamental.cash(ticker, period=period_type, limit=5)
+                statement = "cash"
+            fetch_statement = lambda: market_data.obb_call(f"equity.fundamental.{statement}", ticker, period=period_type, limit=5)
+            if period_type == "annual":
+                # Los estados anuales ya vienen del prefetch
+                data = prefetched(statement, fetch_statement)
+            else:
+                data = fetch_statement()
 
             df = data.to_dataframe()
 
@@ -1852,7 +1687,7 @@ with tab4:
         st.code(traceback.format_exc())
 
 # TAB 5: Análisis (Analyst Targets, Key Metrics, Insider Trading)
-with tab5:
+if active_tab == TABS[4]:
     st.header(f"Análisis - {ticker}")
 
     analysis_tabs = st.tabs(["🎯 Price Targets", "📊 Key Metrics", "👔 Insider Trading"])
@@ -1862,10 +1697,8 @@ with tab5:
         st.subheader("Price Targets de Analistas")
         try:
             with st.spinner("Cargando price targets..."):
-                import yfinance as yf
-                yf_ticker = yf.Ticker(ticker)
-                pt_data = yf_ticker.analyst_price_targets
-                recommendations = yf_ticker.recommendations
+                pt_data = prefetched("analyst_price_targets", lambda: market_data.ticker_attr(ticker, "analyst_price_targets"))
+                recommendations = prefetched("recommendations", lambda: market_data.ticker_attr(ticker, "recommendations"))
 
                 if pt_data:
                     col1, col2, col3, col4 = st.columns(4)
@@ -1913,7 +1746,7 @@ with tab5:
                         st.metric("Upside/Downside al Target Promedio", f"{upside:+.1f}%")
 
                 # Recomendaciones detalladas de analistas e instituciones
-                upgrades_downgrades = yf_ticker.upgrades_downgrades
+                upgrades_downgrades = prefetched("upgrades_downgrades", lambda: market_data.ticker_attr(ticker, "upgrades_downgrades"))
                 if upgrades_downgrades is not None and not upgrades_downgrades.empty:
                     st.markdown("---")
                     st.subheader("Recomendaciones de Analistas e Instituciones")
@@ -1987,7 +1820,7 @@ with tab5:
         st.subheader("Métricas Clave de Valoración")
         try:
             with st.spinner("Cargando métricas..."):
-                metrics_data = obb.equity.fundamental.metrics(ticker)
+                metrics_data = prefetched("metrics", lambda: market_data.obb_call("equity.fundamental.metrics", ticker))
                 df_metrics = metrics_data.to_dataframe()
 
                 if not df_metrics.empty:
@@ -2089,7 +1922,7 @@ with tab5:
         st.subheader("Transacciones de Insiders")
         try:
             with st.spinner("Cargando insider trading..."):
-                insider_data = obb.equity.ownership.insider_trading(ticker)
+                insider_data = prefetched("insider_trading", lambda: market_data.obb_call("equity.ownership.insider_trading", ticker))
                 df_insider = insider_data.to_dataframe()
 
                 if not df_insider.empty:
@@ -2187,7 +2020,7 @@ with tab5:
             st.error(f"Error al cargar insider trading: {str(e)}")
 
 # TAB 6: Hedge & Correlaciones
-with tab6:
+if active_tab == TABS[5]:
     st.markdown(f'<h2 style="color:#E0E0E0;margin-bottom:5px;">Análisis de Hedge para {ticker}</h2>', unsafe_allow_html=True)
     st.markdown('<p style="color:#888;font-size:0.9rem;margin-bottom:20px;">Encuentra activos no correlacionados para proteger tu posición</p>', unsafe_allow_html=True)
 
@@ -2326,9 +2159,7 @@ with tab6:
 
                 # Obtener info del ticker para el análisis
                 try:
-                    import yfinance as yf
-                    ticker_yf = yf.Ticker(ticker)
-                    ticker_info = ticker_yf.info
+                    ticker_info = prefetched("info", lambda: market_data.ticker_attr(ticker, "info"))
                 except:
                     ticker_info = {}
 
@@ -2453,7 +2284,7 @@ with tab6:
         '''.format(ticker=ticker), unsafe_allow_html=True)
 
 # TAB 7: Fondos y ETFs
-with tab7:
+if active_tab == TABS[6]:
     st.markdown(raygun.get_section_header("BUSCADOR DE FONDOS Y ETFs", "07"), unsafe_allow_html=True)
 
     # Filtros en columnas
@@ -2500,6 +2331,9 @@ with tab7:
             # Obtener datos
             if symbols_to_fetch:
                 fund_data = funds.fetch_multiple_funds(symbols_to_fetch)
+                failed_funds = fund_data.attrs.get("failed", [])
+                if failed_funds:
+                    st.caption(f"⚠️ Sin respuesta a tiempo: {', '.join(failed_funds)}")
 
                 if not fund_data.empty:
                     # Aplicar filtros
@@ -2625,7 +2459,7 @@ with tab7:
         ''', unsafe_allow_html=True)
 
 # === TAB 8: PORTFOLIO BUILDER ===
-with tab8:
+if active_tab == TABS[7]:
     t = raygun.get_theme()
     st.markdown(raygun.get_section_header("💼 Portfolio Builder", "Generador de portafolios personalizados con IA"), unsafe_allow_html=True)
 
@@ -2741,6 +2575,8 @@ with tab8:
             )
             st.session_state.generated_portfolio = recommendation
             st.session_state.portfolio_source = "IA"
+            st.session_state.pop('portfolio_frontier', None)
+            st.session_state.pop('portfolio_frontier_selected', None)
 
     # Use Template
     if use_template and selected_template != "-- Generar Personalizado --":
@@ -2751,6 +2587,8 @@ with tab8:
             "rationale": template_data["description"]
         }
         st.session_state.portfolio_source = "Template"
+        st.session_state.pop('portfolio_frontier', None)
+        st.session_state.pop('portfolio_frontier_selected', None)
 
     # --- Display Generated Portfolio ---
     if 'generated_portfolio' in st.session_state and st.session_state.generated_portfolio:
@@ -2949,6 +2787,245 @@ with tab8:
                 else:
                     st.error(f"Error en backtest: {bt['error']}")
 
+            # Efficient Frontier Section
+            st.markdown(raygun.get_chaos_divider(), unsafe_allow_html=True)
+            st.markdown(raygun.get_subsection_header("🧭 Frontera Eficiente"), unsafe_allow_html=True)
+
+            ef_col1, ef_col2 = st.columns([1, 3])
+            with ef_col1:
+                frontier_period = st.selectbox(
+                    "Histórico",
+                    options=["1y", "2y", "3y", "5y"],
+                    index=1,
+                    key="portfolio_frontier_period"
+                )
+                frontier_points = st.slider("Puntos", min_value=5, max_value=40, value=20, key="portfolio_frontier_points")
+                run_frontier = st.button("🧭 Calcular Frontera", key="portfolio_run_frontier")
+
+            if run_frontier:
+                with st.spinner("Calculando frontera eficiente..."):
+                    frontier_symbols = [a.get('symbol') for a in portfolio_data.get('allocations', []) if a.get('symbol')]
+                    st.session_state.portfolio_frontier = portfolio.efficient_frontier(
+                        frontier_symbols, n_points=frontier_points, period=frontier_period
+                    )
+                    # El índice elegido era de la frontera anterior (otros puntos u otro universo)
+                    st.session_state.pop('portfolio_frontier_selected', None)
+
+            if 'portfolio_frontier' in st.session_state and st.session_state.portfolio_frontier:
+                frontier = st.session_state.portfolio_frontier
+                if "error" not in frontier:
+                    points = frontier['points']
+                    best_idx = frontier['max_sharpe_index']
+                    with ef_col1:
+                        # Explorar la frontera sin recalcular: los puntos ya están en sesión
+                        selected_idx = st.select_slider(
+                            "Retorno objetivo",
+                            options=list(range(len(points))),
+                            value=best_idx,
+                            format_func=lambda i: f"{points[i]['expected_return']:.1f}%",
+                            key="portfolio_frontier_selected"
+                        )
+                    selected_point = points[selected_idx]
+
+                    with ef_col2:
+                        fig = go.Figure()
+                        fig.add_trace(go.Scatter(
+                            x=[p['expected_volatility'] for p in points],
+                            y=[p['expected_return'] for p in points],
+                            mode='lines+markers',
+                            name='Frontera',
+                            line=dict(color=t['accent_primary'], width=2),
+                            marker=dict(size=5)
+                        ))
+                        fig.add_trace(go.Scatter(
+                            x=[a['expected_volatility'] for a in frontier['assets']],
+                            y=[a['expected_return'] for a in frontier['assets']],
+                            mode='markers+text',
+                            name='Activos',
+                            text=[a['symbol'] for a in frontier['assets']],
+                            textposition='top center',
+                            marker=dict(color=t['text_muted'], size=7)
+                        ))
+                        fig.add_trace(go.Scatter(
+                            x=[points[best_idx]['expected_volatility']],
+                            y=[points[best_idx]['expected_return']],
+                            mode='markers',
+                            name='Máx. Sharpe',
+                            marker=dict(color=t['positive'], size=14, symbol='star')
+                        ))
+                        fig.add_trace(go.Scatter(
+                            x=[selected_point['expected_volatility']],
+                            y=[selected_point['expected_return']],
+                            mode='markers',
+                            name='Seleccionado',
+                            marker=dict(color=t['accent_secondary'], size=12, symbol='diamond')
+                        ))
+                        fig.update_layout(
+                            xaxis_title="Volatilidad (%)",
+                            yaxis_title="Retorno Esperado (%)",
+                            template="plotly_dark" if t['bg_primary'] == '#000000' else "plotly_white",
+                            height=350,
+                            margin=dict(l=40, r=40, t=20, b=40),
+                            paper_bgcolor=t['bg_primary'],
+                            plot_bgcolor=t['bg_secondary'],
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+
+                        st.caption(
+                            f"Retorno {selected_point['expected_return']:.2f}% · "
+                            f"Volatilidad {selected_point['expected_volatility']:.2f}% · "
+                            f"Sharpe {selected_point['sharpe_ratio']:.2f}"
+                        )
+                        weights_df = pd.DataFrame(selected_point['weights'])
+                        weights_df = weights_df[weights_df['weight'] > 0].sort_values('weight', ascending=False)
+                        st.dataframe(
+                            weights_df.rename(columns={'symbol': 'Símbolo', 'weight': 'Peso (%)'}),
+                            hide_index=True,
+                            use_container_width=True
+                        )
+                else:
+                    st.error(f"Error en frontera: {frontier['error']}")
+
+# === TAB 9: SCANNER ===
+if active_tab == TABS[8]:
+    t = raygun.get_theme()
+    st.markdown(raygun.get_section_header("ESCÁNER DE UNIVERSO", "09"), unsafe_allow_html=True)
+
+    scanner_watchlists = {
+        "Acciones del banner": [item["symbol"] for item in TICKER_SYMBOLS if not item.get("is_index") and not item.get("is_commodity")],
+        "Fondos y ETFs": funds.get_all_fund_symbols(),
+        "Hedge": hedge.get_all_hedge_symbols(),
+        "Personalizada": [],
+    }
+
+    level_targets = {"POC": "poc", "VAH": "vah", "VAL": "val", "Borde de la VA más cercano": "edge"}
+
+    scan_col1, scan_col2, scan_col3, scan_col4 = st.columns([2, 2, 2, 1])
+    with scan_col1:
+        scanner_watchlist = st.selectbox("Universo", list(scanner_watchlists), key="scanner_watchlist")
+    with scan_col2:
+        scanner_mode = st.selectbox("Escaneo", ["Momentum y divergencias", "Niveles de volumen (POC/VA)"], key="scanner_mode")
+    with scan_col3:
+        if scanner_mode == "Momentum y divergencias":
+            scanner_filter = st.selectbox(
+                "Mostrar",
+                ["Todos", "Alcistas", "Bajistas", "Divergencia bullish reciente", "Divergencia bearish reciente"],
+                key="scanner_filter"
+            )
+        else:
+            scanner_target = st.selectbox("Ordenar por distancia a", list(level_targets), key="scanner_level_target")
+    with scan_col4:
+        st.write("")  # Spacer
+        run_scan_btn = st.button("🔭 Escanear", key="scanner_run_btn", use_container_width=True)
+
+    if scanner_watchlist == "Personalizada":
+        scanner_custom = st.text_area(
+            "Símbolos",
+            key="scanner_custom",
+            placeholder="Pega la lista separada por comas, espacios o líneas (ej. los 500 del S&P)"
+        )
+        scan_symbols = [s for s in scanner_custom.replace(",", " ").replace(";", " ").split() if s]
+    else:
+        scan_symbols = scanner_watchlists[scanner_watchlist]
+
+    if scanner_mode == "Momentum y divergencias":
+        scan_age = market_scanner.cached_scan_age(scan_symbols)
+        scan_scope = f"momentum al último cierre diario · divergencias en las últimas {market_scanner.DIVERGENCE_BARS} barras"
+    else:
+        scan_age = market_scanner.cached_scan_age(scan_symbols, "levels", market_scanner.LEVELS_DAYS)
+        scan_scope = f"perfil de volumen de los últimos {market_scanner.LEVELS_DAYS} días ({market_scanner.LEVELS_BINS} bins, VA 70%)"
+    st.caption(
+        f"{len(scan_symbols)} símbolos · {scan_scope}"
+        + (f" · escaneo de hace {scan_age / 60:.0f} min" if scan_age is not None else "")
+    )
+
+    st.markdown(raygun.get_divider(), unsafe_allow_html=True)
+
+    # El resultado queda en cache del módulo: tras el primer escaneo, cambiar filtros no vuelve a escanear
+    if run_scan_btn:
+        st.session_state.scanner_symbols = scan_symbols
+    scan_requested = bool(scan_symbols) and st.session_state.get("scanner_symbols") == scan_symbols
+    if scan_requested and scanner_mode == "Momentum y divergencias":
+        with st.spinner(f"Escaneando {len(scan_symbols)} símbolos..."):
+            scan = market_scanner.scan_universe(scan_symbols)
+
+        if scan.empty:
+            st.warning("No se obtuvieron precios para el universo seleccionado")
+        else:
+            missing = sorted(set(s.upper() for s in scan_symbols) - set(scan["symbol"]))
+            if missing:
+                st.caption(f"⚠️ Sin datos: {', '.join(missing[:20])}{'...' if len(missing) > 20 else ''}")
+
+            # Resumen por estado (sobre todo el universo, antes del filtro)
+            state_counts = scan["state"].value_counts()
+            state_colors = dict(zip(scan["state"], scan["color"]))
+            summary_cols = st.columns(4)
+            summary_cols[0].metric("Alcistas", int((scan["score"] > 0).sum()))
+            summary_cols[1].metric("Bajistas", int((scan["score"] < 0).sum()))
+            summary_cols[2].metric("Div. bullish recientes", int(scan["recent_bull"].sum()))
+            summary_cols[3].metric("Div. bearish recientes", int(scan["recent_bear"].sum()))
+            state_summary = " · ".join(
+                f'<span style="color:{state_colors[state]};">{state} {count}</span>'
+                for state, count in state_counts.items()
+            )
+            st.markdown(f'<div style="font-size:0.85rem;margin:10px 0;">{state_summary}</div>', unsafe_allow_html=True)
+
+            if scanner_filter == "Alcistas":
+                scan = scan[scan["score"] > 0]
+            elif scanner_filter == "Bajistas":
+                scan = scan[scan["score"] < 0].iloc[::-1]
+            elif scanner_filter == "Divergencia bullish reciente":
+                scan = scan[scan["recent_bull"]]
+            elif scanner_filter == "Divergencia bearish reciente":
+                scan = scan[scan["recent_bear"]]
+
+            st.markdown(f'<div style="color:{t["accent_secondary"]};font-size:0.9rem;margin-bottom:10px;">'
+                        f'<strong>{len(scan)}</strong> símbolos</div>', unsafe_allow_html=True)
+
+            scan_display = pd.DataFrame({
+                "Símbolo": scan["symbol"],
+                "Estado": scan["state"],
+                "Score": scan["score"],
+                "Precio": scan["close"].round(2),
+                "Cambio %": scan["change_pct"].round(2),
+                "RSI": scan["rsi"].round(1),
+                "MACD hist": scan["macd_hist"].round(3),
+                "Última div. bullish": scan["last_bull_divergence"].dt.strftime("%Y-%m-%d"),
+                "Última div. bearish": scan["last_bear_divergence"].dt.strftime("%Y-%m-%d"),
+                "Fecha": scan["date"].dt.strftime("%Y-%m-%d"),
+            })
+            st.dataframe(scan_display, use_container_width=True, hide_index=True, height=min(700, 38 + 35 * len(scan_display)))
+    elif scan_requested:
+        with st.spinner(f"Calculando niveles de {len(scan_symbols)} símbolos..."):
+            levels = market_scanner.scan_levels(scan_symbols)
+
+        if levels.empty:
+            st.warning("No se obtuvieron precios para el universo seleccionado")
+        else:
+            levels = market_scanner.rank_levels(levels, level_targets[scanner_target])
+
+            position_counts = levels["position"].value_counts()
+            summary_cols = st.columns(3)
+            summary_cols[0].metric("Sobre la Value Area", int(position_counts.get("Sobre VA", 0)))
+            summary_cols[1].metric("Dentro de la Value Area", int(position_counts.get("Dentro VA", 0)))
+            summary_cols[2].metric("Bajo la Value Area", int(position_counts.get("Bajo VA", 0)))
+
+            levels_display = pd.DataFrame({
+                "Símbolo": levels["symbol"],
+                "Precio": levels["close"].round(2),
+                "POC": levels["poc"].round(2),
+                "VAH": levels["value_area_high"].round(2),
+                "VAL": levels["value_area_low"].round(2),
+                "Δ POC %": levels["dist_poc_pct"].round(2),
+                "Δ VAH %": levels["dist_vah_pct"].round(2),
+                "Δ VAL %": levels["dist_val_pct"].round(2),
+                "Posición": levels["position"],
+            })
+            st.dataframe(levels_display, use_container_width=True, hide_index=True, height=min(700, 38 + 35 * len(levels_display)))
+            st.caption("Niveles sobre precios ajustados por dividendos y splits: pueden diferir ligeramente de los del Perfil.")
+    elif not scan_symbols:
+        st.info("Agrega símbolos para escanear")
+
 # === GLOSSARY DIALOG ===
 @st.dialog("📖 GLOSARIO FINANCIERO", width="large")
 def show_glossary_dialog():
@@ -2994,6 +3071,8 @@ def show_glossary_dialog():
                     </div>
                     ''', unsafe_allow_html=True)
 
+perf.phase("sidebar:footer")
+
 # Glossary button in sidebar
 st.sidebar.markdown(raygun.get_sidebar_section("Reference"), unsafe_allow_html=True)
 if st.sidebar.button("📖 GLOSARIO FINANCIERO", key="open_glossary_btn", use_container_width=True):
@@ -3002,3 +3081,103 @@ if st.sidebar.button("📖 GLOSARIO FINANCIERO", key="open_glossary_btn", use_co
 # Footer - RAYGUN STYLE
 st.sidebar.markdown(raygun.get_chaos_divider(), unsafe_allow_html=True)
 st.sidebar.markdown("""<div style="text-align:center;position:relative;"><p style="font-family:Space Mono,monospace;font-size:0.6rem;letter-spacing:0.25em;color:#666;text-transform:uppercase;margin-bottom:5px;">/// POWERED BY ///</p><p style="font-family:Bebas Neue,Impact,sans-serif;font-size:1.6rem;letter-spacing:0.08em;color:#FF00FF;text-shadow:2px 2px 0 #00FFFF,0 0 15px rgba(255,0,255,0.3);margin:0;transform:rotate(-1deg);display:inline-block;">OPENBB</p><p style="font-family:Space Mono,monospace;font-size:0.5rem;color:#555;margin-top:8px;letter-spacing:0.15em;">[<a href="https://docs.openbb.co" style="color:#00FFFF;text-decoration:none;">DOCS</a>] [<a href="https://openbb.co" style="color:#39FF14;text-decoration:none;">WEB</a>]</p></div>""", unsafe_allow_html=True)
+
+
+# === PERF PANEL (oculto: ?perf=1) ===
+def render_perf_panel(trace):
+    """
+    Panel de rendimiento del sidebar: waterfall del rerun que acaba de terminar,
+    percentiles por función (ventana móvil), histograma y aciertos de cache.
+
+    Args:
+        trace: Resultado de perf.finish_rerun() (None si perf está deshabilitado)
+    """
+    with st.sidebar.expander("⏱️ Perf", expanded=True):
+        if trace is None:
+            st.caption("Instrumentación deshabilitada (PERF_ENABLED=0)")
+            return
+
+        st.markdown(f"**Rerun:** {trace['total'] * 1000:.0f} ms")
+        spans = [s for s in trace["spans"] if s["depth"] <= 1]
+        if spans:
+            labels = [("  " * max(s["depth"], 0)) + s["name"] for s in spans]
+            fig = go.Figure(go.Bar(
+                base=[s["start"] * 1000 for s in spans],
+                x=[s["duration"] * 1000 for s in spans],
+                y=labels,
+                orientation="h",
+                marker_color=[
+                    raygun.COLORS['hot_pink'] if s["error"]
+                    else raygun.COLORS['neon_cyan'] if s["depth"] < 0
+                    else raygun.COLORS['neon_green']
+                    for s in spans
+                ],
+                hovertemplate="%{y}: %{x:.1f} ms<extra></extra>",
+            ))
+            fig.update_layout(
+                height=max(200, 22 * len(spans)),
+                margin=dict(l=0, r=0, t=10, b=0),
+                xaxis_title="ms",
+                yaxis=dict(autorange="reversed"),
+                showlegend=False,
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        stats = perf.function_stats()
+        if stats:
+            st.markdown("**Funciones (ventana móvil)**")
+            st.dataframe(
+                pd.DataFrame(stats)[["name", "calls", "p50_ms", "p95_ms", "max_ms", "errors"]].round(1),
+                use_container_width=True, hide_index=True, height=240,
+            )
+            selected = st.selectbox("Histograma", [s["name"] for s in stats], key="perf_histogram_fn")
+            hist = perf.histogram(selected)
+            if hist:
+                st.bar_chart(pd.Series(hist["counts"], index=hist["labels"]), height=160)
+
+        caches = perf.cache_stats()
+        if caches:
+            st.markdown("**Caches**")
+            st.dataframe(pd.DataFrame(caches), use_container_width=True, hide_index=True)
+        flights = market_data.get_flight_stats()
+        st.caption(f"Upstream: {flights['leaders']} requests, {flights['followers']} coalescidos, "
+                   f"{flights['in_flight']} en vuelo · backend {market_data.backend_name()}")
+        if perf.PROMETHEUS_FILE:
+            st.caption(f"Prometheus: {perf.PROMETHEUS_FILE}")
+
+
+# === PROFILE REPORT (?profile=1 | ?profile=sample) ===
+def render_profile_report(report):
+    """
+    Resumen de la captura del rerun: funciones más costosas y descarga del archivo
+    (.pstats para snakeviz / python -m pstats, .speedscope.json para speedscope.app).
+
+    Args:
+        report: Resultado de profiler.stop()
+    """
+    title = f"🔬 Profile ({report['mode']}) · {report['duration_s'] * 1000:.0f} ms"
+    with st.expander(title, expanded=True):
+        if report.get("top"):
+            st.dataframe(pd.DataFrame(report["top"]).round(2), use_container_width=True, hide_index=True)
+        if report.get("path"):
+            st.caption(report["path"])
+            with open(report["path"], "rb") as f:
+                st.download_button(
+                    "⬇️ Descargar captura",
+                    data=f.read(),
+                    file_name=os.path.basename(report["path"]),
+                    key="profile_download",
+                )
+        else:
+            st.warning("No se pudo guardar la captura en disco")
+
+
+_profile_report = profiler.stop(_profile_capture, label=TAB_SLUGS[TABS.index(active_tab)])
+if _profile_report:
+    render_profile_report(_profile_report)
+elif _profile_mode:
+    st.warning("No se pudo iniciar el perfilador (¿otra captura en curso?)")
+
+_perf_trace = perf.finish_rerun()
+if st.query_params.get("perf") == "1":
+    render_perf_panel(_perf_trace)
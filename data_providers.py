@@ -0,0 +1,422 @@
+"""
+Data Providers Module
+Backends intercambiables de datos de mercado: live, grabación, replay y sintético
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Backend por defecto: live | record | replay | synthetic
+BACKEND = os.getenv("MARKET_DATA_BACKEND", "live").lower()
+
+# Carpeta de fixtures para record/replay
+FIXTURES_DIR = os.getenv("MARKET_DATA_FIXTURES", os.path.join("fixtures", "market_data"))
+
+# Argumentos que solo acotan fechas: no forman parte de la identidad de un fixture
+_DATE_ARGS = {"start", "end", "start_date", "end_date", "period"}
+
+# Claves de kwargs que no cambian los datos
+_IGNORED_ARGS = {"progress", "threads", "timeout"}
+
+
+class FixtureNotFoundError(LookupError):
+    """El backend replay no tiene un fixture grabado para la llamada."""
+
+
+class RecordedResult:
+    """Sustituto de un OBBject grabado: solo expone to_dataframe()."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self._frame.copy()
+
+
+# === LIVE ===
+
+class LiveProvider:
+    """Llamadas reales a OpenBB y yfinance."""
+
+    name = "live"
+
+    def __init__(self):
+        self._obb = None
+
+    def get_obb(self):
+        """Cliente de OpenBB, importado al primer uso (la importación es lenta)."""
+        if self._obb is None:
+            from openbb import obb
+            self._obb = obb
+        return self._obb
+
+    def fetch(self, endpoint: str, args: Tuple, kwargs: Dict) -> Any:
+        """Ejecuta un endpoint ("obb.<ruta>", "yf.Ticker.<attr>", "yf.Ticker.history", "yf.download")."""
+        import yfinance as yf
+
+        if endpoint.startswith("obb."):
+            target = self.get_obb()
+            for part in endpoint[len("obb."):].split("."):
+                target = getattr(target, part)
+            return target(*args, **kwargs)
+        if endpoint == "yf.download":
+            return yf.download(*args, **kwargs)
+        if endpoint == "yf.Ticker.history":
+            return yf.Ticker(args[0]).history(**kwargs)
+        if endpoint.startswith("yf.Ticker."):
+            return getattr(yf.Ticker(args[0]), endpoint[len("yf.Ticker."):])
+        raise ValueError(f"Endpoint no soportado: {endpoint}")
+
+
+# === RECORD / REPLAY ===
+
+def _slug(value: Any) -> str:
+    text = value if isinstance(value, str) else "-".join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+    return re.sub(r"[^A-Za-z0-9=^.-]+", "_", text)[:60] or "_"
+
+
+def fixture_stem(endpoint: str, args: Tuple, kwargs: Dict) -> str:
+    """
+    Ruta (sin extensión) del fixture de una llamada.
+
+    Las fechas (start, end, period...) no forman parte de la llave: se graba
+    y reproduce la misma serie sin importar el día en que se corra. Por eso
+    record combina las series nuevas con las ya grabadas (_merge_with_fixture).
+    """
+    identity = {k: v for k, v in kwargs.items() if k not in _DATE_ARGS | _IGNORED_ARGS}
+    digest = hashlib.sha1(
+        json.dumps([list(args), identity], sort_keys=True, default=str).encode()
+    ).hexdigest()[:12]
+    label = _slug(args[0]) if args else "noargs"
+    return os.path.join(FIXTURES_DIR, endpoint, f"{label}-{digest}")
+
+
+def _write_fixture(stem: str, result: Any) -> None:
+    """Guarda un resultado: tablas en Parquet (o pickle sin pyarrow), el resto en JSON."""
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+
+    kind = "frame"
+    if hasattr(result, "to_dataframe"):
+        kind, result = "obb", result.to_dataframe()
+    elif isinstance(result, pd.Series):
+        kind, result = "series", result.to_frame()
+
+    if isinstance(result, pd.DataFrame):
+        frame = result.copy()
+        if isinstance(frame.columns, pd.MultiIndex):
+            kind += ":multi"
+            frame.columns = ["|".join(map(str, col)) for col in frame.columns]
+        else:
+            frame.columns = [str(col) for col in frame.columns]
+        if PARQUET_AVAILABLE:
+            frame.to_parquet(stem + ".parquet")
+        else:
+            frame.to_pickle(stem + ".pkl")
+        meta = {"kind": kind}
+    else:
+        meta = {"kind": "json", "value": result}
+
+    with open(stem + ".json", "w") as f:
+        json.dump(meta, f, default=str)
+
+
+def _as_frame(result: Any) -> Optional[pd.DataFrame]:
+    """Tabla de un resultado grabable (OBBject, Series o DataFrame), None si no es tabular."""
+    if hasattr(result, "to_dataframe"):
+        return result.to_dataframe()
+    if isinstance(result, pd.Series):
+        return result.to_frame()
+    if isinstance(result, pd.DataFrame):
+        return result
+    return None
+
+
+def _is_time_series(frame: Optional[pd.DataFrame]) -> bool:
+    return frame is not None and frame.index.inferred_type in ("datetime64", "datetime", "date")
+
+
+def _merge_with_fixture(stem: str, result: Any) -> Any:
+    """
+    Combina una serie temporal recién descargada con la ya grabada en `stem`.
+
+    Como las fechas no entran en la llave, una sincronización incremental
+    (start=última barra) reemplazaría el historial completo por las barras
+    nuevas; en su lugar se concatenan y, ante fechas repetidas, gana la nueva.
+    Una respuesta vacía no borra lo grabado. Lo que no sea una serie con índice de fechas se reemplaza tal cual.
+    """
+    new = _as_frame(result)
+    if new is None or not (new.empty or _is_time_series(new)):
+        return result
+    try:
+        old = _as_frame(_read_fixture(stem))
+    except FixtureNotFoundError:
+        return result
+    if not _is_time_series(old):
+        return result
+
+    if new.empty:
+        # Descarga fallida o sin barras nuevas: se conserva lo grabado
+        merged = old
+    elif getattr(old.index, "tz", None) != getattr(new.index, "tz", None):
+        return result
+    else:
+        merged = pd.concat([old, new])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    if hasattr(result, "to_dataframe"):
+        return RecordedResult(merged)
+    if isinstance(result, pd.Series):
+        return merged.iloc[:, 0].rename(result.name)
+    return merged
+
+
+def _read_fixture(stem: str) -> Any:
+    """Inverso de _write_fixture."""
+    try:
+        with open(stem + ".json") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise FixtureNotFoundError(f"Sin fixture grabado: {stem}")
+
+    kind = meta["kind"]
+    if kind == "json":
+        return meta["value"]
+
+    if os.path.exists(stem + ".parquet"):
+        frame = pd.read_parquet(stem + ".parquet")
+    else:
+        frame = pd.read_pickle(stem + ".pkl")
+
+    if kind.endswith(":multi"):
+        frame.columns = pd.MultiIndex.from_tuples([tuple(col.split("|")) for col in frame.columns])
+        kind = kind[:-len(":multi")]
+    if kind == "obb":
+        return RecordedResult(frame)
+    if kind == "series":
+        return frame.iloc[:, 0]
+    return frame
+
+
+class RecordingProvider:
+    """Backend live que además graba cada respuesta como fixture."""
+
+    name = "record"
+
+    def __init__(self, inner: Optional[LiveProvider] = None):
+        self.inner = inner or LiveProvider()
+
+    def get_obb(self):
+        return self.inner.get_obb()
+
+    def fetch(self, endpoint: str, args: Tuple, kwargs: Dict) -> Any:
+        result = self.inner.fetch(endpoint, args, kwargs)
+        try:
+            stem = fixture_stem(endpoint, args, kwargs)
+            _write_fixture(stem, _merge_with_fixture(stem, result))
+        except Exception as e:
+            logger.warning("No se pudo grabar fixture de %s: %s", endpoint, e)
+        return result
+
+
+class ReplayProvider:
+    """
+    Sirve fixtures grabados, sin red.
+
+    Las series se devuelven tal como se grabaron; un consumidor que recorte
+    por fecha relativa a hoy verá menos barras si el fixture es antiguo.
+    Para benchmarks independientes del reloj usar SyntheticProvider.
+    """
+
+    name = "replay"
+
+    def fetch(self, endpoint: str, args: Tuple, kwargs: Dict) -> Any:
+        return _read_fixture(fixture_stem(endpoint, args, kwargs))
+
+
+# === SINTÉTICO ===
+
+# Toda serie sintética arranca aquí, así distintas ventanas de un mismo
+# símbolo son recortes de la misma trayectoria
+SYNTHETIC_EPOCH = pd.Timestamp("2000-01-03")
+
+_INTRADAY_FREQ = {"1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min", "60m": "60min", "90m": "90min", "1h": "60min"}
+
+
+def _seed(*parts: Any) -> int:
+    return zlib.crc32(":".join(map(str, parts)).encode())
+
+
+def synthetic_ohlcv(
+    symbol: str,
+    index: pd.DatetimeIndex,
+    drift: float = 0.07,
+    volatility: Optional[float] = None,
+    seed: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Barras OHLCV por movimiento browniano geométrico, deterministas por símbolo.
+
+    Args:
+        symbol: Símbolo (define semilla, precio inicial y volatilidad por defecto)
+        index: Fechas de las barras
+        drift: Retorno anual esperado
+        volatility: Volatilidad anual; por defecto entre 10% y 45% según el símbolo
+        seed: Semilla explícita (por defecto derivada del símbolo)
+
+    Returns:
+        DataFrame con columnas Open, High, Low, Close, Volume
+    """
+    rng = np.random.default_rng(_seed(symbol) if seed is None else seed)
+    n = len(index)
+    if volatility is None:
+        volatility = 0.10 + 0.35 * rng.random()
+    start_price = 20 + 480 * rng.random()
+
+    # Una fila de ruido por barra: ventanas más largas extienden la misma trayectoria
+    dt = 1 / 252
+    noise = rng.standard_normal((n, 5))
+    log_returns = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * noise[:, 0]
+    close = start_price * np.exp(np.cumsum(log_returns))
+    gap = np.exp(0.25 * volatility * np.sqrt(dt) * noise[:, 1])
+    open_ = np.concatenate([[start_price], close[:-1]]) * gap
+    high = np.maximum(open_, close) * (1 + np.abs(noise[:, 2]) * 0.5 * volatility * np.sqrt(dt))
+    low = np.minimum(open_, close) * (1 - np.abs(noise[:, 3]) * 0.5 * volatility * np.sqrt(dt))
+    volume = np.round(np.exp(14 + 0.5 * noise[:, 4]))
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+class SyntheticProvider:
+    """
+    Datos generados, sin red ni fixtures: OHLCV por GBM y metadatos mínimos.
+
+    Los endpoints sin equivalente sintético (opciones, estados financieros,
+    insiders...) devuelven tablas vacías, que el dashboard ya maneja.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, now: Optional[pd.Timestamp] = None):
+        # Reloj fijo opcional para resultados reproducibles entre días
+        self.now = pd.Timestamp(now) if now is not None else None
+
+    def _today(self) -> pd.Timestamp:
+        return (self.now or pd.Timestamp.now()).normalize()
+
+    def _window(self, kwargs: Dict) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        from price_store import period_to_start
+
+        end = kwargs.get("end") or kwargs.get("end_date")
+        end = pd.Timestamp(end) if end else self._today() + pd.Timedelta(days=1)
+        start = kwargs.get("start") or kwargs.get("start_date")
+        if start:
+            start = pd.Timestamp(start)
+        else:
+            start = period_to_start(kwargs.get("period") or "1y", now=self._today())
+        return max(start, SYNTHETIC_EPOCH), end
+
+    def bars(self, symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """Barras de un símbolo en [start, end)."""
+        if interval in _INTRADAY_FREQ:
+            index = pd.date_range(start, end, freq=_INTRADAY_FREQ[interval], inclusive="left")
+            index = index[(index.dayofweek < 5) & (index.time >= pd.Timestamp("09:30").time()) & (index.time < pd.Timestamp("16:00").time())]
+            return synthetic_ohlcv(symbol, index, seed=_seed(symbol, interval, start.date()))
+
+        daily = synthetic_ohlcv(symbol, pd.bdate_range(SYNTHETIC_EPOCH, max(end, SYNTHETIC_EPOCH)))
+        daily = daily[(daily.index >= start) & (daily.index < end)]
+        if interval in ("1wk", "1w"):
+            daily = daily.resample("W-FRI").agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna()
+        elif interval in ("1mo",):
+            daily = daily.resample("ME").agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna()
+        return daily
+
+    def info(self, symbol: str) -> Dict:
+        """Metadatos sintéticos con los campos que consumen screener y dashboard."""
+        rng = np.random.default_rng(_seed(symbol, "info"))
+        closes = self.bars(symbol, "1d", self._today() - pd.DateOffset(years=1), self._today() + pd.Timedelta(days=1))["Close"]
+        price = float(closes.iloc[-1]) if len(closes) else 100.0
+        return {
+            "symbol": symbol,
+            "shortName": f"{symbol} (synthetic)",
+            "longName": f"{symbol} Synthetic Instrument",
+            "regularMarketPrice": price,
+            "previousClose": float(closes.iloc[-2]) if len(closes) > 1 else price,
+            "marketCap": float(price * rng.integers(10**7, 10**10)),
+            "totalAssets": float(rng.integers(10**8, 10**11)),
+            "annualReportExpenseRatio": float(np.round(rng.uniform(0.0003, 0.0095), 4)),
+            "yield": float(np.round(rng.uniform(0, 0.05), 4)),
+            "beta": float(np.round(rng.uniform(0.3, 1.8), 2)),
+            "beta3Year": float(np.round(rng.uniform(0.3, 1.8), 2)),
+            "fiftyTwoWeekHigh": float(closes.max()) if len(closes) else price,
+            "fiftyTwoWeekLow": float(closes.min()) if len(closes) else price,
+            "averageVolume": int(rng.integers(10**5, 10**8)),
+            "heldPercentInstitutions": float(rng.uniform(0.2, 0.9)),
+            "heldPercentInsiders": float(rng.uniform(0, 0.1)),
+            "longBusinessSummary": "Synthetic data generated offline for benchmarks and load tests.",
+        }
+
+    def fetch(self, endpoint: str, args: Tuple, kwargs: Dict) -> Any:
+        if endpoint == "yf.download":
+            tickers = args[0] if args else kwargs.get("tickers")
+            symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+            start, end = self._window(kwargs)
+            interval = kwargs.get("interval", "1d")
+            frames = {symbol: self.bars(symbol, interval, start, end) for symbol in symbols}
+            panel = pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+            panel.columns.names = ["Price", "Ticker"]
+            return panel
+
+        if endpoint == "yf.Ticker.history":
+            start, end = self._window(kwargs)
+            return self.bars(args[0], kwargs.get("interval", "1d"), start, end)
+
+        if endpoint == "yf.Ticker.info":
+            return self.info(args[0])
+
+        if endpoint == "obb.equity.price.historical":
+            symbol = args[0] if args else kwargs.get("symbol")
+            start, end = self._window(kwargs)
+            frame = self.bars(symbol, kwargs.get("interval", "1d"), start, end)
+            frame.columns = [col.lower() for col in frame.columns]
+            frame.index.name = "date"
+            return RecordedResult(frame)
+
+        if endpoint.startswith("obb."):
+            return RecordedResult(pd.DataFrame())
+        if endpoint == "yf.Ticker.analyst_price_targets":
+            return {}
+        return None
+
+
+_PROVIDERS = {
+    "live": LiveProvider,
+    "record": RecordingProvider,
+    "replay": ReplayProvider,
+    "synthetic": SyntheticProvider,
+}
+
+
+def create_provider(name: str = BACKEND):
+    """Instancia un backend por nombre (live, record, replay, synthetic)."""
+    try:
+        return _PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"MARKET_DATA_BACKEND desconocido: {name} (opciones: {', '.join(_PROVIDERS)})")
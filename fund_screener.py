@@ -3,12 +3,22 @@ Fund Screener Module
 Buscador de Fondos y ETFs con filtros avanzados
 """
 
+import logging
+import math
+import time
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import List, Dict, Optional, Tuple
-import yfinance as yf
 from datetime import datetime, timedelta
 
+import market_data
+import perf
+import price_store
+from universe_index import UniverseIndex
+
+logger = logging.getLogger(__name__)
+
 # === UNIVERSO DE FONDOS Y ETFs ===
 FUND_UNIVERSE = {
     "US Equity - Large Cap": [
@@ -124,13 +134,13 @@ FUND_UNIVERSE = {
 }
 
 
+# Índice símbolo → metadatos (y reversos por categoría y emisor), armado una vez al importar
+FUND_INDEX = UniverseIndex(FUND_UNIVERSE)
+
+
 def get_all_fund_symbols() -> List[str]:
     """Retorna lista de todos los símbolos del universo."""
-    symbols = []
-    for category in FUND_UNIVERSE.values():
-        for fund in category:
-            symbols.append(fund["symbol"])
-    return symbols
+    return list(FUND_INDEX.symbols)
 
 
 def get_categories() -> List[str]:
@@ -140,52 +150,107 @@ def get_categories() -> List[str]:
 
 def get_funds_by_category(category: str) -> List[Dict]:
     """Retorna fondos de una categoría específica."""
-    return FUND_UNIVERSE.get(category, [])
+    return [dict(fund) for fund in FUND_INDEX.by_category.get(category, ())]
+
 
+def get_funds_by_issuer(issuer: str) -> List[Dict]:
+    """Retorna fondos de un emisor específico (ej. "Vanguard")."""
+    return [dict(fund) for fund in FUND_INDEX.by_issuer.get(issuer, ())]
 
-def fetch_fund_data(symbol: str) -> Dict:
+
+_EMPTY_METRICS = {"annual_return": 0, "volatility": 0, "sharpe_ratio": 0, "max_drawdown": 0}
+
+
+@perf.timed()
+def calculate_return_metrics(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula métricas de riesgo/retorno para todas las columnas de un panel a la vez.
+
+    Cada columna se trata como la serie de cierres de un símbolo: los huecos
+    (fechas sin precio) se saltan igual que un pct_change().dropna() por símbolo.
+
+    Args:
+        prices: DataFrame ancho (fechas × símbolos) con precios de cierre
+
+    Returns:
+        DataFrame indexado por símbolo con annual_return, volatility,
+        sharpe_ratio y max_drawdown (en decimales)
+    """
+    values = prices.to_numpy(dtype=float)
+    columns = list(prices.columns)
+    if values.shape[0] < 2:
+        return pd.DataFrame([_EMPTY_METRICS] * len(columns), index=columns, dtype=float)
+
+    # Retorno contra el último precio válido anterior
+    previous = prices.ffill().to_numpy(dtype=float)[:-1]
+    current = values[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = current / previous - 1
+    valid = ~np.isnan(returns)
+
+    n = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / n
+        centered = np.where(valid, returns - mean, 0.0)
+        std = np.sqrt((centered ** 2).sum(axis=0) / (n - 1))
+
+        annual_return = (1 + mean) ** 252 - 1
+        volatility = std * np.sqrt(252)
+        sharpe = np.where(volatility > 0, annual_return / volatility, 0.0)
+
+        # Drawdown máximo: el máximo acumulado arranca en el primer retorno válido
+        cumulative = np.cumprod(np.where(valid, 1 + returns, 1.0), axis=0)
+        started = np.cumsum(valid, axis=0) > 0
+        cumulative = np.where(started, cumulative, np.nan)
+        rolling_max = np.fmax.accumulate(cumulative, axis=0)
+        drawdown = (cumulative - rolling_max) / rolling_max
+        max_drawdown = np.where(n > 0, np.nanmin(np.where(started, drawdown, np.inf), axis=0), 0.0)
+
+    metrics = pd.DataFrame({
+        "annual_return": annual_return,
+        "volatility": volatility,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": max_drawdown,
+    }, index=columns)
+
+    # Símbolos sin historia: métricas en cero
+    metrics.loc[n == 0] = 0.0
+    return metrics
+
+
+@perf.timed()
+def fetch_fund_data(symbol: str, metrics: Optional[Dict] = None) -> Dict:
     """
     Obtiene datos completos de un fondo/ETF.
 
+    Args:
+        symbol: Símbolo del fondo
+        metrics: Métricas de retorno ya calculadas (ver calculate_return_metrics).
+            Si no se dan, se calculan con el historial de 1 año del símbolo.
+
     Returns:
         Dict con métricas del fondo
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-
-        # Obtener historial para cálculos
-        hist = ticker.history(period="1y")
-
-        # Calcular métricas
-        if not hist.empty:
-            returns = hist['Close'].pct_change().dropna()
-            annual_return = (1 + returns.mean()) ** 252 - 1
-            volatility = returns.std() * np.sqrt(252)
-            sharpe = annual_return / volatility if volatility > 0 else 0
-
-            # Calcular drawdown máximo
-            cumulative = (1 + returns).cumprod()
-            rolling_max = cumulative.expanding().max()
-            drawdown = (cumulative - rolling_max) / rolling_max
-            max_drawdown = drawdown.min()
-        else:
-            annual_return = 0
-            volatility = 0
-            sharpe = 0
-            max_drawdown = 0
+        info = market_data.ticker_attr(symbol, "info")
+
+        if metrics is None:
+            # Obtener historial para cálculos (almacén local, solo baja barras nuevas)
+            hist = price_store.get_history(symbol, period="1y")
+            if not hist.empty:
+                metrics = calculate_return_metrics(hist[['Close']]).iloc[0].to_dict()
+            else:
+                metrics = _EMPTY_METRICS
+
+        annual_return = metrics["annual_return"]
+        volatility = metrics["volatility"]
+        sharpe = metrics["sharpe_ratio"]
+        max_drawdown = metrics["max_drawdown"]
 
         # Buscar info de categoría
-        category = None
-        issuer = None
-        for cat_name, funds in FUND_UNIVERSE.items():
-            for fund in funds:
-                if fund["symbol"] == symbol:
-                    category = cat_name
-                    issuer = fund.get("issuer", "Unknown")
-                    break
-            if category:
-                break
+        fund = FUND_INDEX.get(symbol)
+        category = fund["category"] if fund else None
+        issuer = fund.get("issuer", "Unknown") if fund else None
 
         return {
             "symbol": symbol,
@@ -209,26 +274,131 @@ def fetch_fund_data(symbol: str) -> Dict:
             "description": info.get("longBusinessSummary", ""),
         }
     except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
+        logger.warning("Error fetching data for %s: %s", symbol, e)
         return {"symbol": symbol, "error": str(e)}
 
 
-def fetch_multiple_funds(symbols: List[str]) -> pd.DataFrame:
+@perf.timed()
+def fetch_multiple_funds(
+    symbols: List[str],
+    max_workers: int = 8,
+    timeout: Optional[float] = 20.0,
+) -> pd.DataFrame:
     """
-    Obtiene datos de múltiples fondos.
+    Obtiene datos de múltiples fondos en paralelo.
+
+    El historial de todos los símbolos se descarga en un solo lote y las
+    métricas de retorno se calculan de forma vectorizada sobre el panel;
+    solo la info de cada fondo se pide por separado.
+
+    Args:
+        symbols: Lista de símbolos
+        max_workers: Número máximo de descargas simultáneas (1 = secuencial)
+        timeout: Segundos máximos por símbolo desde que inicia su descarga;
+            el total queda acotado a timeout · ⌈símbolos / max_workers⌉
 
     Returns:
-        DataFrame con datos de todos los fondos
+        DataFrame con datos de los fondos que respondieron a tiempo, en el
+        orden solicitado. Los símbolos con error o timeout quedan en
+        df.attrs["failed"].
     """
-    results = []
-    for symbol in symbols:
-        data = fetch_fund_data(symbol)
-        if "error" not in data:
-            results.append(data)
+    results = {}
+    failed = []
+
+    prices = price_store.get_prices(symbols, period="1y")
+    metrics = calculate_return_metrics(prices).to_dict("index") if not prices.empty else {}
+    metrics_by_symbol = {symbol: metrics.get(symbol, _EMPTY_METRICS) for symbol in symbols}
+
+    if max_workers <= 1 or len(symbols) <= 1:
+        for symbol in symbols:
+            data = fetch_fund_data(symbol, metrics_by_symbol[symbol])
+            if "error" not in data:
+                results[symbol] = data
+            else:
+                failed.append(symbol)
+    else:
+        results, failed = _fetch_funds_concurrently(symbols, metrics_by_symbol, max_workers, timeout)
 
-    return pd.DataFrame(results)
+    df = pd.DataFrame([results[s] for s in symbols if s in results])
+    df.attrs["failed"] = failed
+    return df
 
 
+def _fetch_funds_concurrently(
+    symbols: List[str],
+    metrics_by_symbol: Dict[str, Dict],
+    max_workers: int,
+    timeout: Optional[float],
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Ejecuta fetch_fund_data en un pool de hilos acotado.
+
+    El timeout se mide desde que cada símbolo empieza a descargarse (no desde
+    que entra a la cola), así un pool pequeño no penaliza a los últimos.
+    Los símbolos que exceden su tiempo se abandonan y se retorna lo que haya.
+
+    Un hilo abandonado sigue ocupando su lugar en el pool, así que además hay
+    un plazo total de timeout · ⌈n / max_workers⌉: al vencer, todo lo que
+    siga pendiente (iniciado o en cola) se da por fallido.
+    """
+    started = {}
+
+    def task(symbol: str) -> Dict:
+        started[symbol] = time.monotonic()
+        return fetch_fund_data(symbol, metrics_by_symbol[symbol])
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fund-fetch")
+    futures = {executor.submit(task, symbol): symbol for symbol in symbols}
+    pending = set(futures)
+    results = {}
+    failed = []
+    overall_deadline = None
+    if timeout is not None:
+        overall_deadline = time.monotonic() + timeout * math.ceil(len(symbols) / max_workers)
+
+    try:
+        while pending:
+            wait_for = 0.5
+            if timeout is not None:
+                now = time.monotonic()
+                deadlines = [started[futures[f]] + timeout - now for f in pending if futures[f] in started]
+                deadlines.append(overall_deadline - now)
+                if deadlines:
+                    wait_for = min(wait_for, max(0.05, min(deadlines)))
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                symbol = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    data = {"symbol": symbol, "error": str(e)}
+                if "error" not in data:
+                    results[symbol] = data
+                else:
+                    failed.append(symbol)
+
+            if timeout is not None:
+                now = time.monotonic()
+                expired = {
+                    f for f in pending
+                    if futures[f] in started and now - started[futures[f]] > timeout
+                }
+                if now >= overall_deadline:
+                    expired = set(pending)
+                for future in sorted(expired, key=lambda f: symbols.index(futures[f])):
+                    logger.warning("Timeout fetching data for %s", futures[future])
+                    failed.append(futures[future])
+                pending -= expired
+    finally:
+        # No esperar a los hilos abandonados; cancelar los que no iniciaron
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, failed
+
+
+@perf.timed()
 def filter_funds(
     df: pd.DataFrame,
     category: Optional[str] = None,
@@ -281,6 +451,7 @@ def filter_funds(
     return filtered
 
 
+@perf.timed()
 def get_fund_comparison(symbols: List[str], period: str = "1y") -> pd.DataFrame:
     """
     Compara rendimiento de múltiples fondos.
@@ -289,7 +460,7 @@ def get_fund_comparison(symbols: List[str], period: str = "1y") -> pd.DataFrame:
         DataFrame con precios normalizados para comparación
     """
     try:
-        data = yf.download(symbols, period=period, progress=False)['Close']
+        data = price_store.get_prices(symbols, period=period)
 
         if data.empty:
             return pd.DataFrame()
@@ -299,10 +470,11 @@ def get_fund_comparison(symbols: List[str], period: str = "1y") -> pd.DataFrame:
 
         return normalized
     except Exception as e:
-        print(f"Error comparing funds: {e}")
+        logger.exception("Error comparing funds: %s", e)
         return pd.DataFrame()
 
 
+@perf.timed()
 def get_fund_metrics_summary(symbol: str) -> Dict:
     """
     Obtiene resumen de métricas clave para un fondo.
@@ -353,6 +525,7 @@ def format_aum(value: float) -> str:
         return f"${value:,.0f}"
 
 
+@perf.timed()
 def get_ai_fund_analysis(
     fund_data: Dict,
     api_key: Optional[str] = None
@@ -417,7 +590,7 @@ Mantén la respuesta concisa y accionable (máximo 250 palabras)."""
     except ImportError:
         return get_fallback_fund_analysis(fund_data)
     except Exception as e:
-        print(f"Error en análisis de IA: {e}")
+        logger.exception("Error en análisis de IA: %s", e)
         return get_fallback_fund_analysis(fund_data)
 
 
@@ -458,6 +631,7 @@ def get_fallback_fund_analysis(fund_data: Dict) -> str:
 
 
 # === QUICK SEARCH ===
+@perf.timed()
 def search_funds(query: str) -> List[Dict]:
     """
     Búsqueda rápida de fondos por nombre o símbolo.
@@ -465,12 +639,8 @@ def search_funds(query: str) -> List[Dict]:
     query = query.upper()
     results = []
 
-    for category, funds in FUND_UNIVERSE.items():
-        for fund in funds:
-            if query in fund["symbol"] or query in fund["name"].upper():
-                results.append({
-                    **fund,
-                    "category": category
-                })
+    for symbol, fund in FUND_INDEX.by_symbol.items():
+        if query in symbol or query in fund["name"].upper():
+            results.append(dict(fund))
 
     return results
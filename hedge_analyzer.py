@@ -3,12 +3,18 @@ Hedge Analyzer Module
 Analiza correlaciones y sugiere activos para hedge
 """
 
+import logging
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Tuple, Optional
-import yfinance as yf
 from datetime import datetime, timedelta
 
+import perf
+import price_store
+from universe_index import UniverseIndex
+
+logger = logging.getLogger(__name__)
+
 # Universo de activos para análisis de correlación
 HEDGE_UNIVERSE = {
     "Índices Inversos": [
@@ -61,19 +67,89 @@ HEDGE_UNIVERSE = {
 }
 
 
+# Índice símbolo → metadatos, armado una vez al importar
+HEDGE_INDEX = UniverseIndex(HEDGE_UNIVERSE)
+
+
 def get_all_hedge_symbols() -> List[str]:
     """Retorna lista de todos los símbolos del universo de hedge."""
-    symbols = []
-    for category in HEDGE_UNIVERSE.values():
-        for asset in category:
-            symbols.append(asset["symbol"])
-    return symbols
+    return list(HEDGE_INDEX.symbols)
+
+
+@perf.timed()
+def correlate_with(
+    target,
+    panel,
+    min_periods: int = 20
+) -> np.ndarray:
+    """
+    Correlación de Pearson de una serie contra cada columna de un panel.
+
+    Equivale a la columna del target en panel.corr(), pero en O(T·N): sin
+    faltantes estandariza el panel una sola vez y resuelve todo con un
+    producto matriz-vector; con faltantes usa, para cada columna, solo las
+    fechas donde ambas series tienen dato (pairwise-complete), con sumas
+    enmascaradas y centradas.
 
+    Args:
+        target: Arreglo (T,) con los retornos del activo principal
+        panel: Arreglo (T, N) con los retornos de los candidatos
+        min_periods: Observaciones comunes mínimas; si no se alcanzan el resultado es NaN
 
+    Returns:
+        Arreglo (N,) de correlaciones
+    """
+    y = np.asarray(target, dtype=float)
+    x = np.asarray(panel, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+
+    y_valid = ~np.isnan(y)
+    x_valid = ~np.isnan(x)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if y_valid.all() and x_valid.all():
+            # Ruta rápida: estandarizar una vez y un solo producto matriz-vector
+            if len(y) < max(min_periods, 2):
+                return np.full(x.shape[1], np.nan)
+            x_centered = x - x.mean(axis=0)
+            y_centered = y - y.mean()
+            x_norm = np.sqrt(np.einsum("ij,ij->j", x_centered, x_centered))
+            y_norm = np.sqrt(y_centered @ y_centered)
+            corr = (x_centered.T @ y_centered) / (x_norm * y_norm)
+        else:
+            # Pairwise-complete: cada columna usa las fechas en que ambas tienen dato
+            mask = x_valid & y_valid[:, None]
+            weights = mask.astype(float)
+            count = weights.sum(axis=0)
+
+            # Centrar antes de acumular reduce la cancelación numérica
+            y_mean = np.where(y_valid, y, 0.0).sum() / max(y_valid.sum(), 1)
+            x_mean = np.where(x_valid, x, 0.0).sum(axis=0) / np.maximum(x_valid.sum(axis=0), 1)
+            y0 = np.where(y_valid, y - y_mean, 0.0)
+            x0 = np.where(mask, x - x_mean, 0.0)
+
+            sum_x = x0.sum(axis=0)
+            sum_y = weights.T @ y0
+            sum_xx = np.einsum("ij,ij->j", x0, x0)
+            sum_yy = weights.T @ (y0 * y0)
+            sum_xy = x0.T @ y0
+
+            cov = sum_xy - sum_x * sum_y / count
+            var_x = sum_xx - sum_x ** 2 / count
+            var_y = sum_yy - sum_y ** 2 / count
+            corr = cov / np.sqrt(var_x * var_y)
+            corr[count < max(min_periods, 2)] = np.nan
+
+    return np.clip(corr, -1.0, 1.0)
+
+
+@perf.timed()
 def calculate_correlations(
     ticker: str,
     period: str = "1y",
-    hedge_symbols: Optional[List[str]] = None
+    hedge_symbols: Optional[List[str]] = None,
+    min_periods: int = 20
 ) -> pd.DataFrame:
     """
     Calcula correlaciones entre el ticker y el universo de hedge.
@@ -82,6 +158,7 @@ def calculate_correlations(
         ticker: Símbolo del activo principal
         period: Período de análisis (1y, 2y, 6mo)
         hedge_symbols: Lista opcional de símbolos, si no se da usa el universo completo
+        min_periods: Días comunes mínimos para reportar una correlación
 
     Returns:
         DataFrame con correlaciones ordenadas de menor a mayor
@@ -94,47 +171,36 @@ def calculate_correlations(
 
     try:
         # Descargar datos históricos
-        data = yf.download(all_symbols, period=period, progress=False)['Close']
+        data = price_store.get_prices(all_symbols, period=period)
 
         if data.empty:
             return pd.DataFrame()
 
-        # Calcular retornos diarios
-        returns = data.pct_change().dropna()
+        # Calcular retornos diarios (sin descartar fechas: los faltantes se manejan por par)
+        returns = data.pct_change(fill_method=None).iloc[1:]
 
         if returns.empty or ticker not in returns.columns:
             return pd.DataFrame()
 
-        # Calcular matriz de correlación
-        corr_matrix = returns.corr()
-
-        # Extraer correlaciones con el ticker principal
-        if ticker in corr_matrix.columns:
-            correlations = corr_matrix[ticker].drop(ticker)
-        else:
-            return pd.DataFrame()
+        # Correlación del ticker principal contra cada candidato (sin matriz N×N)
+        candidates = returns.drop(columns=ticker)
+        correlations = pd.Series(
+            correlate_with(returns[ticker].to_numpy(), candidates.to_numpy(), min_periods=min_periods),
+            index=candidates.columns
+        )
 
         # Crear DataFrame con información adicional
         results = []
         for symbol, corr in correlations.items():
             if pd.notna(corr):
                 # Buscar información del símbolo
-                asset_info = None
-                category_name = None
-                for cat_name, assets in HEDGE_UNIVERSE.items():
-                    for asset in assets:
-                        if asset["symbol"] == symbol:
-                            asset_info = asset
-                            category_name = cat_name
-                            break
-                    if asset_info:
-                        break
+                asset_info = HEDGE_INDEX.get(symbol)
 
                 results.append({
                     "symbol": symbol,
                     "name": asset_info["name"] if asset_info else symbol,
                     "description": asset_info["description"] if asset_info else "",
-                    "category": category_name or "Otro",
+                    "category": asset_info["category"] if asset_info else "Otro",
                     "correlation": corr,
                     "hedge_score": calculate_hedge_score(corr)
                 })
@@ -146,7 +212,7 @@ def calculate_correlations(
         return df
 
     except Exception as e:
-        print(f"Error calculando correlaciones: {e}")
+        logger.exception("Error calculando correlaciones: %s", e)
         return pd.DataFrame()
 
 
@@ -182,6 +248,7 @@ def get_hedge_score_color(score: str) -> str:
     return colors.get(score, "#888888")
 
 
+@perf.timed()
 def get_top_hedges(
     ticker: str,
     top_n: int = 10,
@@ -209,6 +276,7 @@ def get_top_hedges(
     return df_hedges.head(top_n).to_dict("records")
 
 
+@perf.timed()
 def analyze_portfolio_hedge(
     ticker: str,
     hedge_symbol: str,
@@ -228,7 +296,7 @@ def analyze_portfolio_hedge(
         Diccionario con métricas del portafolio
     """
     try:
-        data = yf.download([ticker, hedge_symbol], period=period, progress=False)['Close']
+        data = price_store.get_prices([ticker, hedge_symbol], period=period)
 
         if data.empty:
             return {}
@@ -266,12 +334,13 @@ def analyze_portfolio_hedge(
         }
 
     except Exception as e:
-        print(f"Error analizando hedge: {e}")
+        logger.exception("Error analizando hedge: %s", e)
         return {}
 
 
 # === AI AGENT FOR HEDGE RECOMMENDATIONS ===
 
+@perf.timed()
 def get_ai_hedge_analysis(
     ticker: str,
     correlations_df: pd.DataFrame,
@@ -343,7 +412,7 @@ Mantén la respuesta concisa y accionable (máximo 300 palabras)."""
     except ImportError:
         return get_fallback_analysis(ticker, correlations_df, ticker_info)
     except Exception as e:
-        print(f"Error en análisis de IA: {e}")
+        logger.exception("Error en análisis de IA: %s", e)
         return get_fallback_analysis(ticker, correlations_df, ticker_info)
 
 
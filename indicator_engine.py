@@ -0,0 +1,403 @@
+"""
+Indicator Engine Module
+Motor incremental de indicadores (EMA, RSI de Wilder, MACD, VWAP, ATR) con estado por símbolo/intervalo
+"""
+
+import bisect
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+import perf
+from technical_signals import wilder_rsi
+
+# EMAs del gráfico de precios y parámetros de los demás indicadores
+EMA_SPANS = (20, 50, 100, 200)
+RSI_LENGTH = 14
+ATR_LENGTH = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+# Streams (símbolo, intervalo, primera barra) que se conservan en memoria, y barras de
+# salida por stream (un df más largo se recalcula completo, ver IndicatorStream.update)
+MAX_STREAMS = 256
+MAX_HISTORY_BARS = 50_000
+
+# Barras cerradas que se comparan contra el proveedor en cada actualización,
+# y tolerancia relativa para considerar que alguna fue revisada
+REVISION_CHECK_BARS = 5
+REVISION_TOLERANCE = 1e-9
+
+
+# === ESTADOS O(1) ===
+# Cada estado avanza una barra con step(); para evaluar la barra provisional
+# sin comprometerla se avanza un clone().
+
+class _EMA:
+    """EMA con adjust=False: ema = α·x + (1-α)·ema_prev, NaN antes de min_periods barras."""
+
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.count = 0
+
+    def step(self, x: float) -> float:
+        if math.isnan(x):
+            return self.output()
+        self.value = x if self.count == 0 else self.alpha * x + (1 - self.alpha) * self.value
+        self.count += 1
+        return self.output()
+
+    def output(self) -> float:
+        return self.value if self.count >= max(self.min_periods, 1) else math.nan
+
+    def clone(self) -> "_EMA":
+        other = _EMA(self.alpha, self.min_periods)
+        other.value, other.count = self.value, self.count
+        return other
+
+
+class _RSI:
+    """RSI de Wilder, idéntico a ta.momentum.RSIIndicator (la primera barra aporta ganancia y pérdida 0)."""
+
+    __slots__ = ("up", "down", "prev_close")
+
+    def __init__(self, length: int):
+        self.up = _EMA(1 / length, length)
+        self.down = _EMA(1 / length, length)
+        self.prev_close = math.nan
+
+    def step(self, close: float) -> float:
+        delta = close - self.prev_close if not math.isnan(self.prev_close) else math.nan
+        self.prev_close = close
+        up = self.up.step(delta if delta > 0 else 0.0)
+        down = self.down.step(-delta if delta < 0 else 0.0)
+        if math.isnan(up) or math.isnan(down):
+            return math.nan
+        return 100.0 if down == 0 else 100 - 100 / (1 + up / down)
+
+    def clone(self) -> "_RSI":
+        other = object.__new__(_RSI)
+        other.up, other.down, other.prev_close = self.up.clone(), self.down.clone(), self.prev_close
+        return other
+
+
+class _MACD:
+    """MACD(12, 26, 9) con EMAs sin min_periods, como en calculate_momentum_state."""
+
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int, slow: int, signal: int):
+        self.fast = _EMA(2 / (fast + 1))
+        self.slow = _EMA(2 / (slow + 1))
+        self.signal = _EMA(2 / (signal + 1))
+
+    def step(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.step(close) - self.slow.step(close)
+        signal = self.signal.step(macd)
+        return macd, signal, macd - signal
+
+    def clone(self) -> "_MACD":
+        other = object.__new__(_MACD)
+        other.fast, other.slow, other.signal = self.fast.clone(), self.slow.clone(), self.signal.clone()
+        return other
+
+
+class _VWAP:
+    """VWAP acumulado desde la primera barra del stream (la primera de df, ver get_stream)."""
+
+    __slots__ = ("pv", "volume")
+
+    def __init__(self):
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def step(self, high: float, low: float, close: float, volume: float) -> float:
+        self.pv += (high + low + close) / 3 * volume
+        self.volume += volume
+        return self.pv / self.volume if self.volume else math.nan
+
+    def clone(self) -> "_VWAP":
+        other = _VWAP()
+        other.pv, other.volume = self.pv, self.volume
+        return other
+
+
+class _ATR:
+    """ATR como media simple de los últimos `length` true ranges (mismo cálculo que fetch_atr)."""
+
+    __slots__ = ("length", "window", "total", "prev_close")
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.prev_close = math.nan
+
+    def step(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if not math.isnan(self.prev_close):
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        if len(self.window) == self.length:
+            self.total -= self.window[0]
+        self.window.append(tr)
+        self.total += tr
+        return self.total / self.length if len(self.window) == self.length else math.nan
+
+    def clone(self) -> "_ATR":
+        other = _ATR(self.length)
+        other.window.extend(self.window)
+        other.total, other.prev_close = self.total, self.prev_close
+        return other
+
+
+def _columns(ema_spans: Iterable[int]):
+    return [f"ema_{n}" for n in ema_spans] + ["rsi", "macd", "macd_signal", "macd_hist", "vwap", "atr"]
+
+
+def compute_indicators(df: pd.DataFrame, ema_spans: Iterable[int] = EMA_SPANS) -> pd.DataFrame:
+    """
+    Indicadores de un DataFrame OHLCV completo, vectorizado (referencia del motor incremental).
+
+    Args:
+        df: DataFrame con columnas open/high/low/close/volume
+        ema_spans: Longitudes de EMA
+
+    Returns:
+        DataFrame con ema_<n>, rsi, macd, macd_signal, macd_hist, vwap y atr
+    """
+    close = df["close"]
+    out = {}
+    for n in ema_spans:
+        out[f"ema_{n}"] = close.ewm(span=n, min_periods=n, adjust=False).mean()
+
+    out["rsi"] = wilder_rsi(close, RSI_LENGTH)
+
+    macd = close.ewm(span=MACD_FAST, adjust=False).mean() - close.ewm(span=MACD_SLOW, adjust=False).mean()
+    signal = macd.ewm(span=MACD_SIGNAL, adjust=False).mean()
+    out["macd"], out["macd_signal"], out["macd_hist"] = macd, signal, macd - signal
+
+    typical = (df["high"] + df["low"] + close) / 3
+    out["vwap"] = (typical * df["volume"]).cumsum() / df["volume"].cumsum()
+
+    prev_close = close.shift(1)
+    tr = pd.concat([df["high"] - df["low"], (df["high"] - prev_close).abs(), (df["low"] - prev_close).abs()], axis=1).max(axis=1)
+    out["atr"] = tr.rolling(ATR_LENGTH).mean()
+    return pd.DataFrame(out, index=df.index)
+
+
+class IndicatorStream:
+    """
+    Estado incremental de los indicadores de un (símbolo, intervalo).
+
+    Las barras cerradas se comprometen al estado una sola vez; la última
+    barra recibida se trata siempre como provisional (una vela intradía que
+    sigue formándose): se evalúa sobre una copia del estado y se vuelve a
+    evaluar en la siguiente actualización con sus valores definitivos.
+
+    El stream está anclado a la primera barra que recibe: el VWAP acumula desde
+    ahí y las EMAs/RSI se calientan desde ahí, así que solo se reutiliza con un
+    df que empiece en esa misma barra; si no, se reconstruye.
+    """
+
+    def __init__(self, ema_spans: Iterable[int] = EMA_SPANS):
+        self.ema_spans = tuple(ema_spans)
+        self.columns = _columns(self.ema_spans)
+        self.lock = threading.Lock()
+        self.rebuilds = 0
+        self.bars_stepped = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.emas = [_EMA(2 / (n + 1), n) for n in self.ema_spans]
+        self.rsi = _RSI(RSI_LENGTH)
+        self.macd = _MACD(MACD_FAST, MACD_SLOW, MACD_SIGNAL)
+        self.vwap = _VWAP()
+        self.atr = _ATR(ATR_LENGTH)
+        # Historial de salida: timestamps en lista (bisect) y valores en un arreglo que crece al doble
+        self._ts = []
+        self._values = np.empty((1024, len(self.columns)))
+        self._closes = np.empty(1024)
+        self._n = 0
+        self._start = None
+
+    @property
+    def last_ts(self):
+        return self._ts[-1] if self._ts else None
+
+    def _states(self):
+        return self.emas, self.rsi, self.macd, self.vwap, self.atr
+
+    def _step(self, bar: Tuple[float, float, float, float, float], states=None) -> list:
+        """Avanza los estados una barra (o los de `states`, una copia) y devuelve la fila de salida."""
+        emas, rsi, macd, vwap, atr = states or self._states()
+        _, high, low, close, volume = bar
+        return (
+            [ema.step(close) for ema in emas]
+            + [rsi.step(close), *macd.step(close), vwap.step(high, low, close, volume), atr.step(high, low, close)]
+        )
+
+    def _commit(self, ts, bar) -> None:
+        row = self._step(bar)
+        if self._n == len(self._values):
+            self._values = np.concatenate([self._values, np.empty_like(self._values)])
+            self._closes = np.concatenate([self._closes, np.empty_like(self._closes)])
+        self._values[self._n] = row
+        self._closes[self._n] = bar[3]
+        if self._start is None:
+            self._start = ts
+        self._ts.append(ts)
+        self._n += 1
+        self.bars_stepped += 1
+        if self._n > MAX_HISTORY_BARS:
+            # Se descarta la salida más antigua de una vez (amortizado); el estado no depende de ella
+            drop = self._n - MAX_HISTORY_BARS * 3 // 4
+            self._values[:self._n - drop] = self._values[drop:self._n]
+            self._closes[:self._n - drop] = self._closes[drop:self._n]
+            del self._ts[:drop]
+            self._n -= drop
+
+    def _commit_bars(self, index, bars: np.ndarray) -> None:
+        for ts, bar in zip(index, bars.tolist()):
+            self._commit(ts, bar)
+
+    def _resume_position(self, df: pd.DataFrame, closes: np.ndarray) -> int:
+        """
+        Posición en `df` de la primera barra aún no comprometida, o -1 si hay que reconstruir:
+        sin historial, `df` no empieza en la barra de anclaje, o el proveedor revisó alguna de las últimas barras cerradas.
+        """
+        if not self._ts or df.index[0] != self._start:
+            return -1
+        if df.index[-1] <= self.last_ts:
+            # df cae completo dentro del historial (ej. una ventana más corta)
+            end = len(df)
+            history_end = bisect.bisect_right(self._ts, df.index[-1])
+        else:
+            end = int(df.index.searchsorted(self.last_ts, side="right"))
+            history_end = self._n
+        if end == 0 or history_end == 0 or df.index[end - 1] != self._ts[history_end - 1]:
+            return -1
+        k = min(REVISION_CHECK_BARS, end, history_end)
+        if list(df.index[end - k:end]) != self._ts[history_end - k:history_end]:
+            return -1
+        if not np.allclose(closes[end - k:end], self._closes[history_end - k:history_end], rtol=REVISION_TOLERANCE, atol=0):
+            return -1
+        return end
+
+    def _committed_block(self, index: pd.Index) -> np.ndarray:
+        """Filas del historial para `index` (barras ya comprometidas), sin reindexar si son contiguas."""
+        if len(index) == 0:
+            return np.empty((0, len(self.columns)))
+        start = bisect.bisect_left(self._ts, index[0])
+        end = start + len(index)
+        if end <= self._n and self._ts[start] == index[0] and self._ts[end - 1] == index[-1]:
+            return self._values[start:end]
+        history = pd.DataFrame(self._values[:self._n], index=pd.Index(self._ts), columns=self.columns)
+        return history.reindex(index).to_numpy()
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Incorpora las barras nuevas de `df` y devuelve los indicadores alineados a su índice.
+
+        Solo las barras posteriores a la última comprometida cuestan cómputo
+        (O(1) por barra). Si `df` no empieza en la primera barra del stream o el
+        proveedor cambió una barra ya cerrada, se reconstruye desde cero: el
+        resultado es siempre el de compute_indicators(df). El historial de
+        salida guarda a lo más MAX_HISTORY_BARS barras; si df es más largo, la
+        salida se recalcula completa con compute_indicators (O(n) vectorizado).
+
+        Args:
+            df: DataFrame OHLCV ordenado por fecha (columnas open/high/low/close/volume)
+
+        Returns:
+            DataFrame con las columnas de compute_indicators e índice de df
+        """
+        if df.empty:
+            return pd.DataFrame(columns=self.columns, index=df.index, dtype=float)
+
+        columns = [df[c].to_numpy(dtype=float) for c in ("open", "high", "low", "close", "volume")]
+        n_closed = len(df) - 1
+
+        with self.lock:
+            position = self._resume_position(df, columns[3])
+            if position < 0:
+                self._reset()
+                self.rebuilds += 1
+                position = 0
+            if position < n_closed:
+                self._commit_bars(df.index[position:n_closed], np.column_stack([c[position:n_closed] for c in columns]))
+
+            if self._ts and df.index[0] < self._ts[0]:
+                # El historial ya descartó el inicio de df (más de MAX_HISTORY_BARS barras):
+                # el estado sigue al día, pero la salida completa se recalcula vectorizada
+                values = compute_indicators(df, self.ema_spans).to_numpy()
+            elif position > n_closed:
+                # df termina en una barra ya comprometida: no hay barra provisional
+                values = self._committed_block(df.index).copy()
+            else:
+                states = ([ema.clone() for ema in self.emas], self.rsi.clone(), self.macd.clone(),
+                          self.vwap.clone(), self.atr.clone())
+                provisional = self._step([c[-1] for c in columns], states)
+                values = np.vstack([self._committed_block(df.index[:n_closed]), provisional])
+
+        return pd.DataFrame(values, index=df.index, columns=self.columns)
+
+
+_streams: "OrderedDict[tuple, IndicatorStream]" = OrderedDict()
+_streams_lock = threading.Lock()
+
+
+def get_stream(symbol: str, interval: str, start=None) -> IndicatorStream:
+    """
+    Stream persistente de (símbolo, intervalo, primera barra), compartido por sesiones; LRU de MAX_STREAMS.
+
+    La primera barra forma parte de la llave: dos ventanas de descarga distintas
+    (ej. 1Y y 6M) tienen cada una su stream y no se reconstruyen mutuamente.
+    """
+    key = (symbol.upper(), interval, start)
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = IndicatorStream()
+            if len(_streams) > MAX_STREAMS:
+                _streams.popitem(last=False)
+        else:
+            _streams.move_to_end(key)
+        return stream
+
+
+@perf.timed()
+def update_indicators(symbol: str, interval: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indicadores de `df` usando el estado persistente de (symbol, interval).
+
+    Args:
+        symbol: Ticker
+        interval: Intervalo de las barras (15m, 1h, 1d, 1wk...)
+        df: Barras OHLCV ordenadas
+
+    Returns:
+        DataFrame ema_<n>, rsi, macd, macd_signal, macd_hist, vwap, atr alineado a df
+    """
+    return get_stream(symbol, interval, df.index[0] if len(df) else None).update(df)
+
+
+def get_engine_stats() -> Dict[str, int]:
+    """Streams activos, reconstrucciones completas y barras procesadas incrementalmente."""
+    with _streams_lock:
+        streams = list(_streams.values())
+    return {
+        "streams": len(streams),
+        "rebuilds": sum(s.rebuilds for s in streams),
+        "bars_stepped": sum(s.bars_stepped for s in streams),
+    }
+
+
+perf.register_collector("indicator_engine", get_engine_stats)
@@ -0,0 +1,194 @@
+"""
+Indicator Graph Module
+Registro de indicadores con dependencias declaradas, memoizado por (símbolo, intervalo, última barra)
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+import perf
+from indicator_engine import EMA_SPANS, update_indicators
+from technical_signals import (
+    calculate_momentum_state,
+    find_bearish_divergences,
+    find_bullish_divergences,
+)
+
+# Snapshots (símbolo, intervalo, ventana, última barra) que se conservan en memoria
+MAX_SNAPSHOTS = 128
+
+
+@dataclass(frozen=True)
+class Node:
+    """Un indicador: nombre, nodos de los que depende y función que lo calcula."""
+    name: str
+    inputs: Tuple[str, ...]
+    fn: Callable
+
+
+# Nodos registrados por nombre. "bars" es la fuente: las barras completas (con calentamiento)
+REGISTRY: Dict[str, Node] = {}
+SOURCE = "bars"
+
+_snapshots: "OrderedDict[tuple, Dict]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def indicator(name: str, inputs: Tuple[str, ...] = (SOURCE,)) -> Callable:
+    """
+    Registra un indicador en el grafo.
+
+    La función recibe el IndicatorGraph, los valores de `inputs` en orden y los
+    parámetros de get() como keywords. Los resultados se comparten entre sesiones:
+    quien los use no debe modificarlos en sitio.
+
+    Args:
+        name: Nombre del nodo
+        inputs: Nodos de los que depende
+    """
+    def decorator(fn: Callable) -> Callable:
+        REGISTRY[name] = Node(name, tuple(inputs), fn)
+        return fn
+    return decorator
+
+
+def _snapshot_key(symbol: str, interval: str, bars: pd.DataFrame, window_start) -> tuple:
+    """
+    Llave del snapshot: la última barra identifica los datos.
+
+    Además del timestamp entran sus valores (la vela provisional cambia sin que
+    cambie su timestamp), la primera barra y el largo (otra ventana de descarga).
+    """
+    if bars.empty:
+        return (symbol.upper(), interval, window_start, 0)
+    last = bars.iloc[-1]
+    return (
+        symbol.upper(), interval, window_start, len(bars), bars.index[0], bars.index[-1],
+        float(last["close"]), float(last["high"]), float(last["low"]), float(last["volume"]),
+    )
+
+
+class IndicatorGraph:
+    """
+    Vista de un (símbolo, intervalo, barras) sobre el registro de indicadores.
+
+    Cada nodo se calcula a lo más una vez por snapshot: el gráfico, el banner de
+    momentum y las divergencias piden el mismo RSI/MACD y lo comparten, también
+    entre sesiones y reruns mientras la última barra no cambie.
+    """
+
+    def __init__(self, symbol: str, interval: str, bars: pd.DataFrame, window_start: Optional[date] = None):
+        """
+        Args:
+            symbol: Ticker
+            interval: Intervalo de las barras (15m, 1h, 1d, 1wk...)
+            bars: Barras OHLCV ordenadas, incluyendo las de calentamiento
+            window_start: Fecha desde la que se muestran las barras (nodo "window")
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.window_start = window_start
+        self.key = _snapshot_key(symbol, interval, bars, window_start)
+        with _snapshots_lock:
+            values = _snapshots.get(self.key)
+            if values is None:
+                values = _snapshots[self.key] = {}
+                if len(_snapshots) > MAX_SNAPSHOTS:
+                    _snapshots.popitem(last=False)
+            else:
+                _snapshots.move_to_end(self.key)
+        values[(SOURCE, ())] = bars
+        self._values = values
+
+    def get(self, name: str, **params):
+        """
+        Valor del nodo `name`, resolviendo (y memoizando) sus dependencias.
+
+        Args:
+            name: Nombre del nodo registrado
+            **params: Parámetros del nodo (ej. emas=(20, 50) para "momentum")
+
+        Returns:
+            Resultado del nodo
+        """
+        return self._resolve(name, tuple(sorted(params.items())), ())
+
+    def _resolve(self, name: str, params: tuple, path: Tuple[str, ...]):
+        memo_key = (name, params)
+        if memo_key in self._values:
+            if name != SOURCE:
+                perf.count_cache("indicator_graph", True)
+            return self._values[memo_key]
+        if name in path:
+            raise ValueError(f"Ciclo en el grafo de indicadores: {' -> '.join(path + (name,))}")
+        node = REGISTRY.get(name)
+        if node is None:
+            raise KeyError(f"Indicador no registrado: {name}")
+
+        perf.count_cache("indicator_graph", False)
+        args = [self._resolve(dep, (), path + (name,)) for dep in node.inputs]
+        value = node.fn(self, *args, **dict(params))
+        self._values[memo_key] = value
+        return value
+
+
+def get_graph_stats() -> Dict[str, int]:
+    """Snapshots en memoria y nodos calculados que contienen."""
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+    return {"snapshots": len(snapshots), "nodes": sum(len(v) for v in snapshots)}
+
+
+perf.register_collector("indicator_graph", get_graph_stats)
+
+
+# === INDICADORES ===
+
+@indicator("indicators")
+def _indicators(graph: IndicatorGraph, bars: pd.DataFrame) -> pd.DataFrame:
+    """EMAs, RSI de Wilder, MACD, VWAP y ATR del motor incremental."""
+    return update_indicators(graph.symbol, graph.interval, bars)
+
+
+def _column_node(column: str) -> None:
+    indicator(column, ("indicators",))(lambda graph, indicators: indicators[column])
+
+
+for _column in [f"ema_{n}" for n in EMA_SPANS] + ["rsi", "macd", "macd_signal", "macd_hist", "vwap", "atr"]:
+    _column_node(_column)
+
+
+@indicator("window")
+def _window(graph: IndicatorGraph, bars: pd.DataFrame) -> pd.DataFrame:
+    """Barras del período visible (desde window_start)."""
+    if graph.window_start is None or bars.empty:
+        return bars
+    return bars[pd.to_datetime(bars.index).date >= graph.window_start]
+
+
+@indicator("window_indicators", ("indicators", "window"))
+def _window_indicators(graph: IndicatorGraph, indicators: pd.DataFrame, window: pd.DataFrame) -> pd.DataFrame:
+    """Indicadores (calculados con calentamiento) recortados al período visible."""
+    return indicators.iloc[len(indicators) - len(window):]
+
+
+@indicator("bullish_divergences", ("window", "window_indicators"))
+def _bullish_divergences(graph: IndicatorGraph, window: pd.DataFrame, indicators: pd.DataFrame):
+    return find_bullish_divergences(window, indicators["rsi"])
+
+
+@indicator("bearish_divergences", ("window", "window_indicators"))
+def _bearish_divergences(graph: IndicatorGraph, window: pd.DataFrame, indicators: pd.DataFrame):
+    return find_bearish_divergences(window, indicators["rsi"])
+
+
+@indicator("momentum", ("window", "window_indicators"))
+def _momentum(graph: IndicatorGraph, window: pd.DataFrame, indicators: pd.DataFrame, emas: Tuple[int, ...] = ()):
+    """Estado de momentum con el RSI/MACD compartidos; `emas` en el orden del selector."""
+    ema_data = {n: indicators[f"ema_{n}"] for n in emas}
+    return calculate_momentum_state(window, ema_data, indicators)
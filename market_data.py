@@ -0,0 +1,173 @@
+"""
+Market Data Module
+Capa única de acceso a OpenBB y yfinance con coalescencia de requests en vuelo.
+El origen de los datos (live, record, replay, synthetic) se elige con
+MARKET_DATA_BACKEND; ver data_providers.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+import data_providers
+import perf
+
+
+class SingleFlight:
+    """
+    Registro de requests en vuelo, compartido por todo el proceso.
+
+    Si llega una llamada con una llave que ya se está descargando (otra
+    sesión de Streamlit, otro hilo del prefetch) espera ese mismo resultado
+    en lugar de lanzar su propio request. La llave se libera al terminar:
+    esto no es un cache, solo evita duplicados simultáneos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Ejecuta fn() una sola vez por llave entre llamadas concurrentes."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self._stats["leaders"] += 1
+            else:
+                self._stats["followers"] += 1
+
+        if not leader:
+            return _share(future.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Conteo de llamadas que descargaron (leaders) y que se coalescieron (followers)."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._inflight)}
+
+
+def _share(result: Any) -> Any:
+    """Copia para quien espera: un DataFrame compartido no debe mutarse entre sesiones."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convierte argumentos (listas, dicts) en algo hasheable para la llave."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+def _key(endpoint: str, args: Tuple, kwargs: Dict) -> Hashable:
+    return (endpoint, _freeze(args), _freeze(kwargs))
+
+
+_flight = SingleFlight()
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Backend activo, creado al primer uso según MARKET_DATA_BACKEND."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = data_providers.create_provider()
+        return _provider
+
+
+def set_provider(provider) -> None:
+    """Reemplaza el backend (benchmarks, pruebas de carga, scripts offline)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def backend_name() -> str:
+    """Nombre del backend activo (live, record, replay, synthetic)."""
+    return get_provider().name
+
+
+def get_obb():
+    """Cliente de OpenBB del backend live; None en backends offline."""
+    provider = get_provider()
+    return provider.get_obb() if hasattr(provider, "get_obb") else None
+
+
+def _fetch(endpoint: str, args: Tuple, kwargs: Dict) -> Any:
+    with perf.span(f"fetch:{endpoint}"):
+        return _flight.do(
+            _key(endpoint, args, kwargs),
+            lambda: get_provider().fetch(endpoint, args, kwargs),
+        )
+
+
+def obb_call(path: str, *args, **kwargs) -> Any:
+    """
+    Llama un endpoint de OpenBB por ruta, ej. obb_call("equity.profile", "AAPL").
+
+    Args:
+        path: Ruta del endpoint bajo obb (equity.price.historical, derivatives.options.chains...)
+        *args, **kwargs: Argumentos del endpoint
+
+    Returns:
+        OBBject del endpoint
+    """
+    return _fetch(f"obb.{path}", args, kwargs)
+
+
+def ticker_attr(symbol: str, attr: str) -> Any:
+    """
+    Atributo de yf.Ticker, ej. ticker_attr("AAPL", "info").
+
+    Args:
+        symbol: Ticker
+        attr: Atributo (info, institutional_holders, analyst_price_targets...)
+
+    Returns:
+        Valor del atributo
+    """
+    return _fetch(f"yf.Ticker.{attr}", (symbol,), {})
+
+
+def ticker_history(symbol: str, **kwargs) -> pd.DataFrame:
+    """yf.Ticker(symbol).history(**kwargs) con coalescencia."""
+    return _fetch("yf.Ticker.history", (symbol,), kwargs)
+
+
+def download(tickers, **kwargs) -> pd.DataFrame:
+    """yf.download(tickers, **kwargs) con coalescencia."""
+    return _fetch("yf.download", (tickers,), kwargs)
+
+
+def get_flight_stats() -> Dict[str, int]:
+    """Estadísticas del registro de requests en vuelo."""
+    return _flight.stats()
+
+
+perf.register_collector("upstream", get_flight_stats)
@@ -0,0 +1,412 @@
+"""
+Market Scanner Module
+Momentum, divergencias de RSI y niveles de volumen (POC/VA) sobre un universo completo
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import perf
+import price_store
+from indicator_engine import MACD_FAST, MACD_SIGNAL, MACD_SLOW, RSI_LENGTH
+from market_data import SingleFlight
+from technical_signals import (
+    MOMENTUM_STATES,
+    find_pivots,
+    match_divergences,
+    momentum_states,
+    wilder_rsi,
+)
+from volume_profile import compute_volume_profiles
+
+logger = logging.getLogger(__name__)
+
+# Historial descargado: alcanza para calentar la EMA 200 antes de la ventana de divergencias
+SCAN_PERIOD = "2y"
+
+# Barras en las que se buscan divergencias (~6M, el período por defecto del gráfico de precios)
+DIVERGENCE_BARS = 126
+DIVERGENCE_LOOKBACK = 5
+DIVERGENCE_MIN_DISTANCE = 3
+
+# Una divergencia es reciente si ocurrió hace menos de estos días (como la alerta del gráfico)
+RECENT_DAYS = 10
+
+# EMAs del banner de momentum (selección por defecto del gráfico de precios)
+SCAN_EMAS = (20, 50, 200)
+
+# Pool de procesos para las divergencias; con pocos símbolos se calcula en el hilo actual
+SCANNER_WORKERS = int(os.environ.get("SCANNER_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_MIN_SYMBOLS = 200
+CHUNK_SYMBOLS = 100
+
+# Perfil de volumen del escáner de niveles: mismos parámetros que el Perfil (3M, 50 bins),
+# pero sobre las barras ajustadas del almacén de precios (ver scan_levels)
+LEVELS_DAYS = 90
+LEVELS_BINS = 50
+LEVELS_MIN_BARS = 20
+
+# Resultados por (universo, período): tiempo de vida y escaneos que se conservan
+SCAN_CACHE_TTL = int(os.environ.get("SCAN_CACHE_TTL", "900"))
+MAX_CACHED_SCANS = 16
+
+# Puntaje de cada estado para ordenar de más alcista a más bajista
+MOMENTUM_SCORES = {
+    "FULLY BULLISH": 4,
+    "RECENTLY TURNED BULLISH": 3,
+    "BULLISH": 2,
+    "STARTING TO FLIP BULLISH": 1,
+    "NEUTRAL": 0,
+    "STARTING TO FLIP BEARISH": -1,
+    "BEARISH": -2,
+    "RECENTLY TURNED BEARISH": -3,
+    "FULLY BEARISH": -4,
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+_cache: "OrderedDict[tuple, Tuple[float, pd.DataFrame]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_flight = SingleFlight()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Pool compartido, creado al primer escaneo grande.
+
+    Usa spawn: hacer fork de un servidor de Streamlit con hilos vivos puede
+    dejar locks tomados en el hijo.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=SCANNER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# === DIVERGENCIAS (se ejecuta en los procesos del pool) ===
+
+def _last_divergence(price: np.ndarray, rsi: np.ndarray, kind: str) -> Tuple[int, int]:
+    """Cantidad de divergencias y posición de la última (-1 si no hay)."""
+    if len(price) < DIVERGENCE_LOOKBACK * 2:
+        return 0, -1
+    pivots = find_pivots(price, window=DIVERGENCE_LOOKBACK, kind="low" if kind == "bullish" else "high")
+    _, curr = match_divergences(pivots, price, rsi, DIVERGENCE_MIN_DISTANCE, kind)
+    return len(curr), int(curr[-1]) if len(curr) else -1
+
+
+def _match_chunk(chunk: List[Tuple[str, np.ndarray, np.ndarray, np.ndarray]]) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Divergencias de un bloque de símbolos.
+
+    Args:
+        chunk: Lista de (símbolo, low, high, rsi) ya recortados a la ventana
+
+    Returns:
+        Lista de (símbolo, n_bull, pos última bull, n_bear, pos última bear)
+    """
+    out = []
+    for symbol, low, high, rsi in chunk:
+        n_bull, last_bull = _last_divergence(low, rsi, "bullish")
+        n_bear, last_bear = _last_divergence(high, rsi, "bearish")
+        out.append((symbol, n_bull, last_bull, n_bear, last_bear))
+    return out
+
+
+def _divergence_inputs(panels: Dict[str, pd.DataFrame], rsi: pd.DataFrame) -> Tuple[List, Dict[str, pd.DatetimeIndex]]:
+    """Ventana de DIVERGENCE_BARS barras con cierre de cada símbolo, como arreglos."""
+    close = panels["Close"].to_numpy(dtype=float)
+    low = panels["Low"].to_numpy(dtype=float)
+    high = panels["High"].to_numpy(dtype=float)
+    rsi_values = rsi.to_numpy(dtype=float)
+    index = panels["Close"].index
+
+    items, dates = [], {}
+    for j, symbol in enumerate(panels["Close"].columns):
+        rows = np.flatnonzero(~np.isnan(close[:, j]))[-DIVERGENCE_BARS:]
+        items.append((symbol, low[rows, j], high[rows, j], rsi_values[rows, j]))
+        dates[symbol] = index[rows]
+    return items, dates
+
+
+def _match_divergences(items: List) -> List[Tuple[str, int, int, int, int]]:
+    """Reparte los símbolos en bloques sobre el pool (o los calcula aquí si son pocos)."""
+    if len(items) < PARALLEL_MIN_SYMBOLS or SCANNER_WORKERS <= 1:
+        return _match_chunk(items)
+
+    chunks = [items[i:i + CHUNK_SYMBOLS] for i in range(0, len(items), CHUNK_SYMBOLS)]
+    try:
+        with perf.span("scanner:divergence_pool"):
+            results = []
+            for part in _get_pool().map(_match_chunk, chunks):
+                results.extend(part)
+            return results
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("Pool del escáner no disponible, calculando en el hilo actual: %s", e)
+        _reset_pool()
+        return _match_chunk(items)
+
+
+# === ESCANEO ===
+
+def _panel_indicators(close: pd.DataFrame) -> Tuple[Dict[int, pd.DataFrame], Dict[str, pd.DataFrame]]:
+    """
+    EMAs, MACD y RSI de todo el panel con operaciones por columna.
+
+    Mismas definiciones que indicator_engine. Los NaN iniciales de símbolos con
+    menos historia no cuentan para el calentamiento del RSI.
+    """
+    ema_data = {n: close.ewm(span=n, min_periods=n, adjust=False).mean() for n in SCAN_EMAS}
+    macd = close.ewm(span=MACD_FAST, adjust=False).mean() - close.ewm(span=MACD_SLOW, adjust=False).mean()
+    signal = macd.ewm(span=MACD_SIGNAL, adjust=False).mean()
+    history = close.notna().cumsum()
+    rsi = wilder_rsi(close, RSI_LENGTH).where(history >= RSI_LENGTH)
+    return ema_data, {"macd": macd, "macd_signal": signal, "macd_hist": macd - signal, "rsi": rsi}
+
+
+def _last_valid(panel: pd.DataFrame) -> np.ndarray:
+    """Último valor no NaN de cada columna."""
+    return panel.ffill().iloc[-1].to_numpy(dtype=float)
+
+
+def _normalize(symbols: List[str]) -> List[str]:
+    """Símbolos en mayúsculas, sin vacíos ni duplicados, en el orden dado."""
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def _run_scan(symbols: List[str], period: str) -> pd.DataFrame:
+    panels = price_store.get_panels(symbols, ["Close", "High", "Low"], period=period)
+    if not panels:
+        return pd.DataFrame()
+    close = panels["Close"].dropna(axis=1, how="all")
+    if close.empty:
+        return pd.DataFrame()
+    panels = {field: panel[close.columns] for field, panel in panels.items()}
+
+    with perf.span("scanner:indicators"):
+        ema_data, indicators = _panel_indicators(close)
+        codes = momentum_states(close, ema_data, indicators)
+
+    # Estado en la última barra con datos de cada símbolo
+    last_row = close.notna().to_numpy()[::-1].argmax(axis=0)
+    last_row = len(close) - 1 - last_row
+    columns = np.arange(close.shape[1])
+    states = [MOMENTUM_STATES[code] for code in codes[last_row, columns]]
+
+    with perf.span("scanner:divergences"):
+        items, dates = _divergence_inputs(panels, indicators["rsi"])
+        divergences = _match_divergences(items)
+
+    closes = close.to_numpy(dtype=float)
+    last_close = closes[last_row, columns]
+    prev_close = np.where(last_row > 0, closes[np.maximum(last_row - 1, 0), columns], np.nan)
+    now = pd.Timestamp.now()
+
+    result = pd.DataFrame({
+        "symbol": close.columns,
+        "date": close.index[last_row],
+        "close": last_close,
+        "change_pct": (last_close / prev_close - 1) * 100,
+        "state": [s[0] for s in states],
+        "color": [s[1] for s in states],
+        "rsi": _last_valid(indicators["rsi"]),
+        "macd_hist": _last_valid(indicators["macd_hist"]),
+    })
+
+    bull_dates, bear_dates, bull_counts, bear_counts = [], [], [], []
+    for symbol, n_bull, last_bull, n_bear, last_bear in divergences:
+        index = dates[symbol]
+        bull_counts.append(n_bull)
+        bear_counts.append(n_bear)
+        bull_dates.append(index[last_bull] if last_bull >= 0 else pd.NaT)
+        bear_dates.append(index[last_bear] if last_bear >= 0 else pd.NaT)
+    result["bull_divergences"] = bull_counts
+    result["last_bull_divergence"] = pd.to_datetime(bull_dates)
+    result["bear_divergences"] = bear_counts
+    result["last_bear_divergence"] = pd.to_datetime(bear_dates)
+    result["recent_bull"] = (now - result["last_bull_divergence"]).dt.days < RECENT_DAYS
+    result["recent_bear"] = (now - result["last_bear_divergence"]).dt.days < RECENT_DAYS
+
+    # Puntaje: estado de momentum ± 1 por divergencia reciente
+    result["score"] = (
+        result["state"].map(MOMENTUM_SCORES)
+        + result["recent_bull"].astype(int)
+        - result["recent_bear"].astype(int)
+    )
+    return result.sort_values(["score", "rsi"], ascending=False, na_position="last").reset_index(drop=True)
+
+
+@perf.timed()
+def scan_universe(symbols: List[str], period: str = SCAN_PERIOD, refresh: bool = False) -> pd.DataFrame:
+    """
+    Escanea momentum y divergencias de RSI de todo un universo.
+
+    Los indicadores se calculan sobre un panel (fechas × símbolos) en una sola
+    pasada; solo el emparejamiento de pivotes se reparte, por bloques, en un
+    pool de procesos. El resultado se cachea SCAN_CACHE_TTL segundos y los
+    escaneos simultáneos del mismo universo se coalescen.
+
+    Args:
+        symbols: Lista de símbolos
+        period: Historial a descargar (estilo yfinance)
+        refresh: Ignora el cache
+
+    Returns:
+        DataFrame ordenado de más alcista a más bajista con symbol, date,
+        close, change_pct, state, color, rsi, macd_hist, divergencias y score
+        (vacío si no hay datos)
+    """
+    symbols = _normalize(symbols)
+    if not symbols:
+        return pd.DataFrame()
+    return _cached(("momentum", tuple(sorted(symbols)), period), lambda: _run_scan(symbols, period), refresh)
+
+
+def _cached(key: tuple, compute, refresh: bool) -> pd.DataFrame:
+    """Resultado cacheado SCAN_CACHE_TTL segundos; los cálculos simultáneos de la misma llave se coalescen."""
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and not refresh and time.time() - cached[0] < SCAN_CACHE_TTL:
+            _cache.move_to_end(key)
+            perf.count_cache("scanner", True)
+            return cached[1].copy()
+    perf.count_cache("scanner", False)
+
+    try:
+        result = _flight.do(key, compute)
+    except Exception as e:
+        logger.warning("Error escaneando %s (%d símbolos): %s", key[0], len(key[1]), e)
+        return pd.DataFrame()
+
+    with _cache_lock:
+        _cache[key] = (time.time(), result)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_SCANS:
+            _cache.popitem(last=False)
+    return result.copy()
+
+
+def cached_scan_age(symbols: List[str], kind: str = "momentum", period=SCAN_PERIOD) -> Optional[float]:
+    """
+    Segundos desde el último escaneo cacheado del universo, o None.
+
+    Args:
+        symbols: Lista de símbolos
+        kind: "momentum" (scan_universe) o "levels" (scan_levels)
+        period: period de scan_universe o days de scan_levels
+    """
+    key = (kind, tuple(sorted(_normalize(symbols))), period)
+    with _cache_lock:
+        cached = _cache.get(key)
+    return time.time() - cached[0] if cached is not None else None
+
+
+# === NIVELES DE VOLUMEN (POC / VALUE AREA) ===
+
+def _run_levels(symbols: List[str], days: int) -> pd.DataFrame:
+    start = (pd.Timestamp.now() - pd.Timedelta(days=days)).normalize()
+    panels = price_store.get_panels(symbols, ["High", "Low", "Close", "Volume"], start=start)
+    if not panels:
+        return pd.DataFrame()
+    close = panels["Close"].dropna(axis=1, how="all")
+    if close.empty:
+        return pd.DataFrame()
+    panels = {field: panel[close.columns] for field, panel in panels.items()}
+
+    profiles = compute_volume_profiles(
+        panels["High"].to_numpy(dtype=float),
+        panels["Low"].to_numpy(dtype=float),
+        panels["Volume"].to_numpy(dtype=float),
+        num_bins=LEVELS_BINS,
+        min_bars=LEVELS_MIN_BARS,
+    )
+
+    price = _last_valid(close)
+    result = pd.DataFrame({
+        "symbol": close.columns,
+        "close": price,
+        "poc": profiles["poc"],
+        "value_area_high": profiles["value_area_high"],
+        "value_area_low": profiles["value_area_low"],
+    })
+    # Distancias como el delta de calculate_poc_and_levels: (nivel - precio) / precio
+    for level, column in (("poc", "poc"), ("vah", "value_area_high"), ("val", "value_area_low")):
+        result[f"dist_{level}_pct"] = (result[column] - price) / price * 100
+    result["dist_edge_pct"] = np.where(
+        result["dist_vah_pct"].abs() <= result["dist_val_pct"].abs(),
+        result["dist_vah_pct"],
+        result["dist_val_pct"],
+    )
+    result["position"] = np.select(
+        [price > result["value_area_high"], price < result["value_area_low"], result["poc"].notna()],
+        ["Sobre VA", "Bajo VA", "Dentro VA"],
+        default="Sin datos",
+    )
+    return rank_levels(result, "poc")
+
+
+@perf.timed()
+def scan_levels(symbols: List[str], days: int = LEVELS_DAYS, refresh: bool = False) -> pd.DataFrame:
+    """
+    POC, VAH y VAL de todo un universo en un solo lote.
+
+    Las barras salen del almacén de precios compartido (una lectura para todos
+    los símbolos) y los perfiles se arman con compute_volume_profiles, con los
+    mismos parámetros que el Perfil de cada ticker. El almacén guarda precios
+    ajustados por dividendos y splits (auto_adjust) y el Perfil usa barras sin
+    ajustar, así que en tickers que pagaron dividendos en la ventana los
+    niveles y las distancias pueden diferir un poco de los del Perfil.
+
+    Args:
+        symbols: Lista de símbolos
+        days: Días calendario del perfil (90 = los 3M del Perfil)
+        refresh: Ignora el cache
+
+    Returns:
+        DataFrame con symbol, close, poc, value_area_high, value_area_low,
+        dist_poc_pct, dist_vah_pct, dist_val_pct, dist_edge_pct y position,
+        ordenado por cercanía al POC (vacío si no hay datos)
+    """
+    symbols = _normalize(symbols)
+    if not symbols:
+        return pd.DataFrame()
+    return _cached(("levels", tuple(sorted(symbols)), days), lambda: _run_levels(symbols, days), refresh)
+
+
+def rank_levels(levels: pd.DataFrame, target: str = "poc") -> pd.DataFrame:
+    """
+    Ordena por distancia absoluta del precio a un nivel.
+
+    Args:
+        levels: Resultado de scan_levels
+        target: "poc", "vah", "val" o "edge" (el borde de la Value Area más cercano)
+
+    Returns:
+        DataFrame ordenado, más cercanos primero y símbolos sin perfil al final
+    """
+    if levels.empty:
+        return levels
+    distance = levels[f"dist_{target}_pct"].abs()
+    return levels.assign(_distance=distance).sort_values("_distance", na_position="last").drop(columns="_distance").reset_index(drop=True)
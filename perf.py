@@ -0,0 +1,381 @@
+"""
+Perf Module
+Instrumentación liviana de tiempos: histogramas por función, waterfall por rerun,
+aciertos de cache y export en formato de texto de Prometheus
+"""
+
+import contextvars
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# PERF_ENABLED=0 deja los decoradores como no-op (se decide al importar cada módulo)
+ENABLED = os.environ.get("PERF_ENABLED", "1") != "0"
+
+# Muestras por función que se conservan para percentiles e histograma del panel
+WINDOW = int(os.environ.get("PERF_WINDOW", "512"))
+
+# Archivo para el textfile collector de Prometheus y cada cuánto reescribirlo
+PROMETHEUS_FILE = os.environ.get("PERF_PROMETHEUS_FILE", "/tmp/changos/perf.prom")
+EXPORT_INTERVAL = float(os.environ.get("PERF_EXPORT_INTERVAL", "15"))
+
+# Límites (segundos) de los buckets, los mismos en el panel y en Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Spans máximos por rerun (un timed dentro de un loop no debe crecer sin límite)
+MAX_SPANS = 400
+
+
+class _Metric:
+    """Contadores acumulados (para Prometheus) y ventana móvil (para el panel) de una función."""
+
+    __slots__ = ("window", "bucket_counts", "count", "total", "errors")
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW)
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+
+_lock = threading.Lock()
+_metrics: Dict[str, _Metric] = {}
+_cache_counts: Dict[str, List[int]] = {}
+_collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+_last_export = 0.0
+
+# Trace del rerun en curso (por hilo de script) y profundidad de anidamiento
+_trace: contextvars.ContextVar = contextvars.ContextVar("perf_trace", default=None)
+_depth: contextvars.ContextVar = contextvars.ContextVar("perf_depth", default=0)
+# Se marca cuando el cuerpo de una función cacheada realmente se ejecuta (miss)
+_executed: contextvars.ContextVar = contextvars.ContextVar("perf_executed", default=False)
+
+
+def record(name: str, duration: float, error: bool = False) -> None:
+    """Registra una medición de `name` (en segundos)."""
+    bucket = int(np.searchsorted(BUCKETS, duration))
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = _Metric()
+        metric.window.append(duration)
+        metric.bucket_counts[bucket] += 1
+        metric.count += 1
+        metric.total += duration
+        if error:
+            metric.errors += 1
+
+
+@contextmanager
+def span(name: str):
+    """
+    Mide un bloque: alimenta el histograma de `name` y, si hay un rerun en
+    curso en este hilo, agrega el span a su waterfall.
+    """
+    if not ENABLED:
+        yield
+        return
+    _executed.set(True)
+    trace = _trace.get()
+    depth = _depth.get()
+    depth_token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _depth.reset(depth_token)
+        record(name, duration, error)
+        if trace is not None and len(trace["spans"]) < MAX_SPANS:
+            trace["spans"].append({
+                "name": name,
+                "start": started - trace["started"],
+                "duration": duration,
+                "depth": depth,
+                "error": error,
+            })
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    Decorador de tiempos para funciones de descarga o cálculo.
+
+    Args:
+        name: Nombre de la métrica; por defecto módulo.función
+
+    Example:
+        @perf.timed()
+        def calculate_correlations(...):
+    """
+    def decorator(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+        metric_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(metric_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_probe(name: str) -> Callable:
+    """
+    Cuenta aciertos y fallos de un cache (st.cache_data, lru_cache...).
+
+    Va por fuera del decorador de cache; la función cacheada debe tener
+    @perf.timed por dentro, que marca cuando su cuerpo realmente corre:
+
+        @perf.cache_probe("daily_bars")
+        @st.cache_data(ttl=3600)
+        @perf.timed()
+        def _fetch_daily_bars(...):
+    """
+    def decorator(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = _executed.set(False)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                missed = _executed.get()
+                _executed.reset(token)
+                count_cache(name, hit=not missed)
+        return wrapper
+    return decorator
+
+
+def count_cache(name: str, hit: bool) -> None:
+    """Suma un acierto o un fallo al cache `name`."""
+    with _lock:
+        counts = _cache_counts.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def register_collector(prefix: str, fn: Callable[[], Dict[str, float]]) -> None:
+    """
+    Agrega contadores externos al export (ej. market_data.get_flight_stats).
+
+    Cada llave del dict se exporta como changos_<prefix>_<llave>.
+    """
+    _collectors[prefix] = fn
+
+
+# === RERUNS ===
+
+def start_rerun() -> None:
+    """Abre el trace del rerun en el hilo actual (al inicio del script)."""
+    if ENABLED:
+        _trace.set({"started": time.perf_counter(), "spans": [], "phase": None})
+
+
+def phase(name: str) -> None:
+    """
+    Cierra la fase anterior del rerun y abre `name` (sidebar, header, tab:precios...).
+
+    Las fases dividen el rerun sin tener que re-indentar el script en un `with`.
+    """
+    trace = _trace.get() if ENABLED else None
+    if trace is None:
+        return
+    now = time.perf_counter()
+    _close_phase(trace, now)
+    trace["phase"] = (name, now)
+
+
+def _close_phase(trace: Dict, now: float) -> None:
+    if trace["phase"] is None:
+        return
+    name, started = trace["phase"]
+    duration = now - started
+    record(f"phase:{name}", duration)
+    trace["spans"].append({
+        "name": f"phase:{name}",
+        "start": started - trace["started"],
+        "duration": duration,
+        "depth": -1,
+        "error": False,
+    })
+    trace["phase"] = None
+
+
+def finish_rerun() -> Optional[Dict]:
+    """
+    Cierra el trace del rerun en curso.
+
+    Returns:
+        Dict con total (s) y spans ordenados por inicio; None si no había rerun abierto
+    """
+    trace = _trace.get() if ENABLED else None
+    if trace is None:
+        return None
+    now = time.perf_counter()
+    _close_phase(trace, now)
+    _trace.set(None)
+    total = now - trace["started"]
+    record("rerun", total)
+    maybe_export()
+    return {
+        "total": total,
+        "spans": sorted(trace["spans"], key=lambda s: (s["start"], s["depth"])),
+    }
+
+
+# === LECTURA ===
+
+def function_stats() -> List[Dict]:
+    """Estadísticas de la ventana móvil por función, de la más costosa a la menos."""
+    with _lock:
+        snapshot = {name: (np.fromiter(m.window, float), m.count, m.errors) for name, m in _metrics.items()}
+    rows = []
+    for name, (window, count, errors) in snapshot.items():
+        if window.size == 0:
+            continue
+        p50, p95 = np.percentile(window, [50, 95])
+        rows.append({
+            "name": name,
+            "calls": count,
+            "errors": errors,
+            "p50_ms": float(p50) * 1000,
+            "p95_ms": float(p95) * 1000,
+            "max_ms": float(window.max()) * 1000,
+            "window_total_ms": float(window.sum()) * 1000,
+        })
+    return sorted(rows, key=lambda r: r["window_total_ms"], reverse=True)
+
+
+def histogram(name: str) -> Optional[Dict]:
+    """Histograma de la ventana móvil de `name` con los BUCKETS fijos."""
+    with _lock:
+        metric = _metrics.get(name)
+        window = np.fromiter(metric.window, float) if metric else None
+    if window is None or window.size == 0:
+        return None
+    counts = np.bincount(np.searchsorted(BUCKETS, window), minlength=len(BUCKETS) + 1)
+    labels = [f"≤{b * 1000:g}ms" for b in BUCKETS] + [f">{BUCKETS[-1]:g}s"]
+    return {"labels": labels, "counts": counts.tolist()}
+
+
+def cache_stats() -> List[Dict]:
+    """Aciertos y fallos por cache."""
+    with _lock:
+        items = [(name, hits, misses) for name, (hits, misses) in _cache_counts.items()]
+    return [
+        {"cache": name, "hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else None}
+        for name, hits, misses in sorted(items)
+    ]
+
+
+# === PROMETHEUS ===
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text() -> str:
+    """Métricas acumuladas en el formato de texto de Prometheus."""
+    with _lock:
+        metrics = {name: (list(m.bucket_counts), m.count, m.total, m.errors) for name, m in _metrics.items()}
+        caches = {name: list(counts) for name, counts in _cache_counts.items()}
+
+    lines = [
+        "# HELP changos_function_duration_seconds Duración de funciones instrumentadas y fases del rerun",
+        "# TYPE changos_function_duration_seconds histogram",
+    ]
+    for name, (bucket_counts, count, total, _) in sorted(metrics.items()):
+        label = _label(name)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, bucket_counts):
+            cumulative += n
+            lines.append(f'changos_function_duration_seconds_bucket{{function="{label}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'changos_function_duration_seconds_bucket{{function="{label}",le="+Inf"}} {count}')
+        lines.append(f'changos_function_duration_seconds_sum{{function="{label}"}} {total:.6f}')
+        lines.append(f'changos_function_duration_seconds_count{{function="{label}"}} {count}')
+
+    lines += [
+        "# HELP changos_function_errors_total Llamadas que terminaron en excepción",
+        "# TYPE changos_function_errors_total counter",
+    ]
+    for name, (_, _, _, errors) in sorted(metrics.items()):
+        lines.append(f'changos_function_errors_total{{function="{_label(name)}"}} {errors}')
+
+    lines += [
+        "# HELP changos_cache_requests_total Consultas a caches por resultado",
+        "# TYPE changos_cache_requests_total counter",
+    ]
+    for name, (hits, misses) in sorted(caches.items()):
+        lines.append(f'changos_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+        lines.append(f'changos_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}')
+
+    for prefix, collect in sorted(_collectors.items()):
+        try:
+            values = collect()
+        except Exception as e:
+            logger.warning("Collector %s falló: %s", prefix, e)
+            continue
+        for key, value in sorted(values.items()):
+            lines.append(f"# TYPE changos_{prefix}_{key} gauge")
+            lines.append(f"changos_{prefix}_{key} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path: str = PROMETHEUS_FILE) -> Optional[str]:
+    """
+    Escribe las métricas en `path` de forma atómica (archivo temporal + rename),
+    para que el textfile collector nunca lea un archivo a medias.
+
+    Returns:
+        Ruta escrita, o None si falló
+    """
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".perf-", suffix=".prom")
+        with os.fdopen(fd, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, path)
+        return path
+    except OSError as e:
+        logger.warning("No se pudo exportar métricas a %s: %s", path, e)
+        return None
+
+
+def maybe_export() -> None:
+    """Exporta a PROMETHEUS_FILE como máximo cada EXPORT_INTERVAL segundos."""
+    global _last_export
+    if not PROMETHEUS_FILE:
+        return
+    now = time.monotonic()
+    with _lock:
+        if now - _last_export < EXPORT_INTERVAL:
+            return
+        _last_export = now
+    export_prometheus(PROMETHEUS_FILE)
+
+
+def reset() -> None:
+    """Borra todas las métricas (benchmarks, pruebas de carga)."""
+    with _lock:
+        _metrics.clear()
+        _cache_counts.clear()
+
@@ -3,11 +3,17 @@ Portfolio Generator Module
 Generador de portafolios con IA y templates predefinidos
 """
 
+import logging
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Optional, Tuple
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+from functools import lru_cache
+
+import perf
+import price_store
+
+logger = logging.getLogger(__name__)
 
 # === PERFILES DE RIESGO ===
 RISK_PROFILES = {
@@ -178,6 +184,7 @@ def get_portfolio_templates() -> Dict:
     return PORTFOLIO_TEMPLATES
 
 
+@perf.timed()
 def calculate_portfolio_metrics(
     allocations: List[Dict],
     period: str = "1y"
@@ -197,7 +204,7 @@ def calculate_portfolio_metrics(
         weights = np.array([a["weight"] / 100 for a in allocations])
 
         # Descargar datos
-        data = yf.download(symbols, period=period, progress=False)['Close']
+        data = price_store.get_prices(symbols, period=period)
 
         if data.empty:
             return {"error": "No se pudieron obtener datos"}
@@ -221,7 +228,7 @@ def calculate_portfolio_metrics(
 
         # Beta vs SPY
         try:
-            spy = yf.download("SPY", period=period, progress=False)['Close']
+            spy = price_store.get_prices(["SPY"], period=period)["SPY"]
             spy_returns = spy.pct_change().dropna()
             # Alinear fechas
             common_dates = portfolio_returns.index.intersection(spy_returns.index)
@@ -253,6 +260,7 @@ def calculate_portfolio_metrics(
         return {"error": str(e)}
 
 
+@perf.timed()
 def generate_custom_portfolio(
     risk_profile: str,
     horizon: str,
@@ -343,6 +351,7 @@ def generate_custom_portfolio(
     }
 
 
+@perf.timed()
 def get_ai_portfolio_recommendation(
     risk_profile: str,
     horizon: str,
@@ -441,7 +450,7 @@ Reglas:
     except ImportError:
         return get_fallback_recommendation(risk_profile, horizon, amount)
     except Exception as e:
-        print(f"Error en recomendación IA: {e}")
+        logger.exception("Error en recomendación IA: %s", e)
         return get_fallback_recommendation(risk_profile, horizon, amount)
 
 
@@ -474,6 +483,7 @@ Nota: Consulta con un asesor financiero certificado antes de invertir."""
     }
 
 
+@perf.timed()
 def backtest_portfolio(
     allocations: List[Dict],
     years: int = 5
@@ -496,7 +506,7 @@ def backtest_portfolio(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=years * 365)
 
-        data = yf.download(symbols, start=start_date, end=end_date, progress=False)['Close']
+        data = price_store.get_prices(symbols, start=start_date, end=end_date)
 
         if data.empty:
             return {"error": "No se pudieron obtener datos históricos"}
@@ -550,59 +560,364 @@ def backtest_portfolio(
         return {"error": str(e)}
 
 
+# === OPTIMIZACIÓN MEAN-VARIANCE ===
+
+# Portafolios aleatorios evaluados por el método Monte Carlo
+MONTE_CARLO_SAMPLES = 10000
+
+# A partir de este número de activos "auto" usa el solver determinístico
+SOLVER_MIN_ASSETS = 10
+
+# Malla de aversión al riesgo (relativa) para recorrer la frontera
+_TAU_GRID = np.concatenate([[0.0], np.logspace(-3, 3, 49)])
+
+
+def _evaluate_weights(
+    weights: np.ndarray,
+    expected_returns: np.ndarray,
+    cov_matrix: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Retorno y volatilidad de una matriz de pesos (una fila por portafolio)."""
+    weights = np.atleast_2d(weights)
+    port_returns = weights @ expected_returns
+    port_vols = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", weights, cov_matrix, weights), 0))
+    return port_returns, port_vols
+
+
+def _feasible(
+    port_returns: np.ndarray,
+    port_vols: np.ndarray,
+    target_return: Optional[float],
+    max_volatility: Optional[float]
+) -> np.ndarray:
+    """Máscara de portafolios que cumplen las restricciones (en %)."""
+    mask = np.ones(len(port_returns), dtype=bool)
+    if target_return:
+        mask &= port_returns * 100 >= target_return
+    if max_volatility:
+        mask &= port_vols * 100 <= max_volatility
+    return mask
+
+
+def _monte_carlo_weights(
+    expected_returns: np.ndarray,
+    cov_matrix: np.ndarray,
+    target_return: Optional[float],
+    max_volatility: Optional[float],
+    objective: str,
+    n_samples: int,
+    seed: Optional[int]
+) -> Optional[np.ndarray]:
+    """Muestrea todos los portafolios como una sola matriz y elige el mejor factible."""
+    rng = np.random.default_rng(seed)
+    weights = rng.random((n_samples, len(expected_returns)))
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    port_returns, port_vols = _evaluate_weights(weights, expected_returns, cov_matrix)
+    mask = _feasible(port_returns, port_vols, target_return, max_volatility)
+    if not mask.any():
+        return None
+
+    if objective == "min_variance":
+        score = -port_vols
+    else:
+        score = np.divide(port_returns, port_vols, out=np.zeros_like(port_returns), where=port_vols > 0)
+    score = np.where(mask, score, -np.inf)
+    return weights[np.argmax(score)]
+
+
+def _solve_mean_variance(
+    expected_returns: np.ndarray,
+    cov_matrix: np.ndarray,
+    risk_tolerance: float,
+    initial_weights: Optional[np.ndarray] = None,
+    max_iter: int = 500
+) -> np.ndarray:
+    """
+    Resuelve min ½ w'Σw − τ μ'w con w >= 0 y sum(w) = 1 (QP convexo).
+
+    Método de conjunto activo primal: en cada paso resuelve el sistema KKT
+    de los activos libres y agrega o libera la restricción w_i >= 0 que
+    corresponda. Partiendo de la solución de un τ cercano (warm start)
+    normalmente converge en una o dos iteraciones.
+    """
+    n = len(expected_returns)
+    if initial_weights is None:
+        weights = np.full(n, 1.0 / n)
+    else:
+        weights = np.array(initial_weights, dtype=float)
+    at_bound = weights <= 0
+    weights[at_bound] = 0.0
+
+    # Regularización mínima para ETFs casi idénticos (Σ casi singular)
+    ridge = 1e-12 * np.trace(cov_matrix) / n
+
+    for _ in range(max_iter):
+        free = np.nonzero(~at_bound)[0]
+        m = len(free)
+        kkt = np.zeros((m + 1, m + 1))
+        kkt[:m, :m] = cov_matrix[np.ix_(free, free)] + ridge * np.eye(m)
+        kkt[:m, m] = 1.0
+        kkt[m, :m] = 1.0
+        rhs = np.append(risk_tolerance * expected_returns[free], 1.0)
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        step = solution[:m] - weights[free]
+
+        if np.abs(step).max() < 1e-12:
+            # Óptimo en este conjunto: liberar la cota con multiplicador negativo
+            multipliers = cov_matrix @ weights - risk_tolerance * expected_returns + solution[m]
+            multipliers[~at_bound] = np.inf
+            j = np.argmin(multipliers)
+            if multipliers[j] >= -1e-12:
+                break
+            at_bound[j] = False
+        else:
+            # Avanzar hasta la primera cota que se cruce
+            ratios = np.full(m, np.inf)
+            shrinking = step < 0
+            ratios[shrinking] = -weights[free][shrinking] / step[shrinking]
+            k = np.argmin(ratios)
+            alpha = min(1.0, ratios[k])
+            weights[free] += alpha * step
+            if alpha < 1.0:
+                at_bound[free[k]] = True
+                weights[free[k]] = 0.0
+
+    weights = np.maximum(weights, 0.0)
+    return weights / weights.sum()
+
+
+def _tau_scale(expected_returns: np.ndarray, cov_matrix: np.ndarray) -> float:
+    """Escala que vuelve adimensional la aversión al riesgo τ."""
+    return float(np.mean(np.diag(cov_matrix)) / max(np.abs(expected_returns).max(), 1e-12))
+
+
+def _bisect_tau(solve, predicate, lo: float, hi: float, iterations: int = 40) -> float:
+    """Busca el τ frontera donde predicate cambia de valor (monótono en τ)."""
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        if predicate(*solve(mid)[1:]):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def _frontier_solver(expected_returns: np.ndarray, cov_matrix: np.ndarray):
+    """
+    Devuelve solve(τ) -> (pesos, retorno, volatilidad), memoizado por τ.
+
+    Cada llamada arranca desde la solución anterior (warm start), así que
+    recorrer τ de forma ordenada cuesta pocas iteraciones por punto.
+    """
+    scale = _tau_scale(expected_returns, cov_matrix)
+    cache = {}
+    last = [None]
+
+    def solve(tau):
+        if tau not in cache:
+            weights = _solve_mean_variance(expected_returns, cov_matrix, tau * scale, last[0])
+            last[0] = weights
+            port_return, port_vol = _evaluate_weights(weights, expected_returns, cov_matrix)
+            cache[tau] = (weights, port_return[0], port_vol[0])
+        return cache[tau]
+
+    return solve
+
+
+def _solver_weights(
+    expected_returns: np.ndarray,
+    cov_matrix: np.ndarray,
+    target_return: Optional[float],
+    max_volatility: Optional[float],
+    objective: str
+) -> Optional[np.ndarray]:
+    """
+    Optimización determinística recorriendo la frontera eficiente.
+
+    Retorno y volatilidad crecen con τ a lo largo de la frontera, así que las
+    restricciones definen un intervalo [τ_lo, τ_hi] que se localiza por
+    bisección; dentro de él se minimiza la varianza (τ_lo) o se maximiza
+    el Sharpe por búsqueda de sección dorada (el Sharpe es unimodal en τ).
+    """
+    solve = _frontier_solver(expected_returns, cov_matrix)
+    points = [solve(tau) for tau in _TAU_GRID]
+    returns_ok = [not target_return or r * 100 >= target_return for _, r, _ in points]
+    vol_ok = [not max_volatility or v * 100 <= max_volatility for _, _, v in points]
+
+    if not any(returns_ok) or not vol_ok[0]:
+        return None
+
+    # τ mínimo que alcanza el retorno objetivo
+    first = returns_ok.index(True)
+    tau_lo = _TAU_GRID[0] if first == 0 else _bisect_tau(
+        solve, lambda r, v: r * 100 >= target_return, _TAU_GRID[first - 1], _TAU_GRID[first])
+
+    # τ máximo que respeta la volatilidad máxima
+    last_ok = len(vol_ok) - 1 - vol_ok[::-1].index(True)
+    if last_ok == len(vol_ok) - 1:
+        tau_hi = _TAU_GRID[-1]
+    else:
+        lo, hi = _TAU_GRID[last_ok], _TAU_GRID[last_ok + 1]
+        for _ in range(40):
+            mid = 0.5 * (lo + hi)
+            if solve(mid)[2] * 100 <= max_volatility:
+                lo = mid
+            else:
+                hi = mid
+        tau_hi = lo
+
+    if tau_lo > tau_hi:
+        return None
+    if objective == "min_variance":
+        return solve(tau_lo)[0]
+
+    def sharpe(tau):
+        _, r, v = solve(tau)
+        return r / v if v > 0 else 0.0
+
+    # Mejor punto de la malla dentro del intervalo y refinamiento por sección dorada
+    candidates = [tau_lo, tau_hi] + [t for t in _TAU_GRID if tau_lo < t < tau_hi]
+    best = max(candidates, key=sharpe)
+    grid = sorted(candidates)
+    i = grid.index(best)
+    a, b = grid[max(i - 1, 0)], grid[min(i + 1, len(grid) - 1)]
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(40):
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        if sharpe(c) >= sharpe(d):
+            b = d
+        else:
+            a = c
+    refined = 0.5 * (a + b)
+    return solve(refined if sharpe(refined) >= sharpe(best) else best)[0]
+
+
+def _normalize_symbols(symbols: List[str]) -> List[str]:
+    """Símbolos en mayúsculas, sin vacíos ni duplicados, en el orden dado."""
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+@lru_cache(maxsize=32)
+@perf.timed()
+def _return_stats(symbols: Tuple[str, ...], period: str, as_of: date) -> Tuple[np.ndarray, np.ndarray]:
+    """μ y Σ anualizados, cacheados por (símbolos normalizados, período, día)."""
+    data = price_store.get_prices(list(symbols), period=period)
+    if data.empty:
+        # No se cachea: lru_cache no guarda excepciones
+        raise ValueError("No se pudieron obtener datos")
+
+    # Columnas explícitamente en el orden de symbols: μ[i] y Σ[i, i] son de symbols[i]
+    missing = [s for s in symbols if s not in data.columns or data[s].isna().all()]
+    if missing:
+        raise ValueError(f"Sin precios para: {', '.join(missing)}")
+    data = data.reindex(columns=list(symbols))
+
+    returns = data.pct_change().dropna()
+    expected_returns = (returns.mean() * 252).to_numpy()
+    cov_matrix = (returns.cov() * 252).to_numpy()
+    expected_returns.setflags(write=False)
+    cov_matrix.setflags(write=False)
+    return expected_returns, cov_matrix
+
+
+@perf.cache_probe("return_stats")
+def get_return_stats(symbols: List[str], period: str = "2y") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retornos esperados y matriz de covarianza anualizados de un conjunto de símbolos.
+
+    El resultado se reutiliza durante el día: cambiar restricciones u objetivo
+    no vuelve a descargar precios ni a recalcular la covarianza. Los símbolos
+    se normalizan antes (mayúsculas, sin duplicados); quien etiquete los pesos
+    debe usar la misma lista, _normalize_symbols(symbols).
+
+    Args:
+        symbols: Lista de símbolos
+        period: Período histórico (ej. "1y", "2y")
+
+    Returns:
+        Tupla (expected_returns, cov_matrix) de solo lectura, en el orden de
+        _normalize_symbols(symbols). ValueError si falta algún símbolo
+    """
+    return _return_stats(tuple(_normalize_symbols(symbols)), period, datetime.now().date())
+
+
+@perf.timed()
+def optimize_weights(
+    expected_returns: np.ndarray,
+    cov_matrix: np.ndarray,
+    target_return: Optional[float] = None,
+    max_volatility: Optional[float] = None,
+    method: str = "auto",
+    objective: str = "max_sharpe",
+    n_samples: int = MONTE_CARLO_SAMPLES,
+    seed: Optional[int] = None
+) -> Optional[np.ndarray]:
+    """
+    Calcula pesos óptimos (long-only, suman 1) a partir de μ y Σ anualizados.
+
+    Args:
+        expected_returns: Vector de retornos esperados anuales
+        cov_matrix: Matriz de covarianza anual
+        target_return: Retorno mínimo anual (%)
+        max_volatility: Volatilidad máxima anual (%)
+        method: "monte_carlo", "solver" o "auto" (solver desde SOLVER_MIN_ASSETS activos)
+        objective: "max_sharpe" o "min_variance"
+        n_samples: Portafolios aleatorios para Monte Carlo
+        seed: Semilla para Monte Carlo
+
+    Returns:
+        Vector de pesos, o None si ningún portafolio cumple las restricciones
+    """
+    expected_returns = np.asarray(expected_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+
+    if method == "auto":
+        method = "solver" if len(expected_returns) >= SOLVER_MIN_ASSETS else "monte_carlo"
+
+    if method == "solver":
+        return _solver_weights(expected_returns, cov_matrix, target_return, max_volatility, objective)
+    return _monte_carlo_weights(
+        expected_returns, cov_matrix, target_return, max_volatility, objective, n_samples, seed
+    )
+
+
+@perf.timed()
 def optimize_portfolio(
     symbols: List[str],
     target_return: Optional[float] = None,
-    max_volatility: Optional[float] = None
+    max_volatility: Optional[float] = None,
+    method: str = "auto",
+    objective: str = "max_sharpe",
+    n_samples: int = MONTE_CARLO_SAMPLES,
+    seed: Optional[int] = None
 ) -> Dict:
     """
-    Optimiza un portafolio usando Mean-Variance Optimization simplificada.
+    Optimiza un portafolio usando Mean-Variance Optimization.
 
     Args:
         symbols: Lista de símbolos
         target_return: Retorno objetivo anual (%)
         max_volatility: Volatilidad máxima (%)
+        method: "monte_carlo" (muestreo vectorizado), "solver" (QP determinístico) o "auto"
+        objective: "max_sharpe" o "min_variance"
+        n_samples: Portafolios aleatorios para Monte Carlo
+        seed: Semilla para Monte Carlo
 
     Returns:
         Dict con pesos optimizados
     """
     try:
-        # Descargar datos
-        data = yf.download(symbols, period="2y", progress=False)['Close']
-
-        if data.empty:
-            return {"error": "No se pudieron obtener datos"}
-
-        returns = data.pct_change().dropna()
-
-        # Calcular retornos esperados y matriz de covarianza
-        expected_returns = returns.mean() * 252
-        cov_matrix = returns.cov() * 252
+        # Retornos esperados y matriz de covarianza (cacheados por día), en el orden de symbols
+        symbols = _normalize_symbols(symbols)
+        expected_returns, cov_matrix = get_return_stats(symbols, period="2y")
 
         n_assets = len(symbols)
 
-        # Optimización simple: maximizar Sharpe
-        best_sharpe = -np.inf
-        best_weights = None
-
-        # Monte Carlo para encontrar mejor combinación
-        for _ in range(10000):
-            weights = np.random.random(n_assets)
-            weights /= weights.sum()
-
-            port_return = np.dot(weights, expected_returns)
-            port_vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-            sharpe = port_return / port_vol if port_vol > 0 else 0
-
-            # Aplicar restricciones si existen
-            if target_return and port_return * 100 < target_return:
-                continue
-            if max_volatility and port_vol * 100 > max_volatility:
-                continue
-
-            if sharpe > best_sharpe:
-                best_sharpe = sharpe
-                best_weights = weights
+        best_weights = optimize_weights(
+            expected_returns, cov_matrix, target_return, max_volatility,
+            method=method, objective=objective, n_samples=n_samples, seed=seed
+        )
 
         if best_weights is None:
             # Si no se encontró solución, usar equal weight
@@ -614,14 +929,93 @@ def optimize_portfolio(
             for i in range(n_assets)
         ]
 
-        port_return = np.dot(best_weights, expected_returns) * 100
-        port_vol = np.sqrt(np.dot(best_weights.T, np.dot(cov_matrix, best_weights))) * 100
+        port_return, port_vol = _evaluate_weights(best_weights, expected_returns, cov_matrix)
+        port_return, port_vol = port_return[0], port_vol[0]
 
         return {
             "allocations": allocations,
-            "expected_return": port_return,
-            "expected_volatility": port_vol,
-            "sharpe_ratio": best_sharpe,
+            "expected_return": port_return * 100,
+            "expected_volatility": port_vol * 100,
+            "sharpe_ratio": port_return / port_vol if port_vol > 0 else 0,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@perf.timed()
+def efficient_frontier(
+    symbols: List[str],
+    n_points: int = 20,
+    period: str = "2y"
+) -> Dict:
+    """
+    Calcula la frontera eficiente (long-only) en n_points retornos objetivo.
+
+    Los puntos van del portafolio de mínima varianza al de máximo retorno.
+    Cada uno se obtiene bisecando la aversión al riesgo τ hasta alcanzar su
+    retorno objetivo, arrancando desde el punto anterior, y todos comparten
+    el mismo μ y Σ cacheados.
+
+    Args:
+        symbols: Lista de símbolos
+        n_points: Número de puntos de la frontera
+        period: Período histórico para estimar μ y Σ
+
+    Returns:
+        Dict con points (target_return, expected_return, expected_volatility,
+        sharpe_ratio, weights), assets (retorno y volatilidad individuales)
+        y max_sharpe_index
+    """
+    try:
+        symbols = _normalize_symbols(symbols)
+        if len(symbols) < 2:
+            return {"error": "Se necesitan al menos 2 activos"}
+
+        expected_returns, cov_matrix = get_return_stats(symbols, period=period)
+        if not (np.isfinite(expected_returns).all() and np.isfinite(cov_matrix).all()):
+            return {"error": "Datos insuficientes para algunos símbolos"}
+
+        solve = _frontier_solver(expected_returns, cov_matrix)
+        tau_max = _TAU_GRID[-1]
+        min_return = solve(0.0)[1]
+        max_return = solve(tau_max)[1]
+
+        points = []
+        tau_lo = 0.0
+        for target in np.linspace(min_return, max_return, max(n_points, 2)):
+            if target <= min_return:
+                tau = 0.0
+            elif target >= max_return:
+                tau = tau_max
+            else:
+                tau = _bisect_tau(solve, lambda r, v: r >= target, tau_lo, tau_max, iterations=30)
+            weights, port_return, port_vol = solve(tau)
+            tau_lo = tau
+
+            points.append({
+                "target_return": target * 100,
+                "expected_return": port_return * 100,
+                "expected_volatility": port_vol * 100,
+                "sharpe_ratio": port_return / port_vol if port_vol > 0 else 0,
+                "weights": [
+                    {"symbol": symbols[i], "weight": round(weights[i] * 100, 1)}
+                    for i in range(len(symbols))
+                ],
+            })
+
+        assets = [
+            {
+                "symbol": symbols[i],
+                "expected_return": expected_returns[i] * 100,
+                "expected_volatility": np.sqrt(cov_matrix[i, i]) * 100,
+            }
+            for i in range(len(symbols))
+        ]
+
+        return {
+            "points": points,
+            "assets": assets,
+            "max_sharpe_index": int(np.argmax([p["sharpe_ratio"] for p in points])),
         }
     except Exception as e:
         return {"error": str(e)}
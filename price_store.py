@@ -0,0 +1,526 @@
+"""
+Price Store Module
+Almacén local persistente de precios OHLCV compartido por todos los módulos
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import market_data
+import perf
+
+logger = logging.getLogger(__name__)
+
+# Ruta del archivo SQLite (Render solo permite escribir en /tmp)
+# Los backends offline (replay, synthetic) usan su propio archivo para no mezclarse con datos reales
+_BACKEND = os.environ.get("MARKET_DATA_BACKEND", "live").lower()
+STORE_PATH = os.environ.get(
+    "PRICE_STORE_PATH",
+    "/tmp/changos/prices.sqlite" if _BACKEND in ("live", "record") else f"/tmp/changos/prices-{_BACKEND}.sqlite"
+)
+
+# Segundos antes de volver a sincronizar un símbolo con la red
+SYNC_MAX_AGE = int(os.environ.get("PRICE_STORE_MAX_AGE", "900"))
+
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    covered_from INTEGER NOT NULL,
+    last_ts INTEGER,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (symbol, interval)
+);
+CREATE TABLE IF NOT EXISTS failed_syncs (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    attempted_at REAL NOT NULL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+_EPOCH = pd.Timestamp("1970-01-01")
+_SQL_CHUNK = 500
+
+_locks_guard = threading.Lock()
+_symbol_locks = {}
+_init_lock = threading.Lock()
+_initialized_path = None
+
+_stats = {"local_reads": 0, "network_syncs": 0, "bars_written": 0}
+
+
+def set_store_path(path: str) -> None:
+    """Cambia la ubicación del almacén (útil para benchmarks y pruebas)."""
+    global STORE_PATH, _initialized_path
+    with _init_lock:
+        STORE_PATH = path
+        _initialized_path = None
+
+
+def get_store_stats() -> Dict:
+    """Retorna contadores de lecturas locales y sincronizaciones de red."""
+    return dict(_stats)
+
+
+perf.register_collector("price_store", get_store_stats)
+
+
+@contextmanager
+def _locked(symbols: List[str], interval: str):
+    """
+    Bloquea la sincronización de los símbolos dados.
+
+    Los candados se toman en orden alfabético para que dos sesiones que
+    sincronizan listas solapadas no se bloqueen mutuamente.
+    """
+    with _locks_guard:
+        locks = [_symbol_locks.setdefault((s, interval), threading.Lock()) for s in sorted(set(symbols))]
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def _connect() -> sqlite3.Connection:
+    """Abre una conexión al almacén, creando el esquema la primera vez."""
+    global _initialized_path
+    path = STORE_PATH
+    directory = os.path.dirname(path)
+    if directory and _initialized_path != path:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if _initialized_path != path:
+        with _init_lock:
+            if _initialized_path != path:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized_path = path
+    return conn
+
+
+# === CONVERSIÓN DE FECHAS ===
+
+def _to_epoch(index) -> np.ndarray:
+    """Convierte un índice de fechas a segundos epoch (UTC, sin zona horaria)."""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_convert("UTC").tz_localize(None)
+    return np.asarray((idx - _EPOCH) // pd.Timedelta(seconds=1), dtype=np.int64)
+
+
+def _from_epoch(values) -> pd.DatetimeIndex:
+    """Convierte segundos epoch a un DatetimeIndex sin zona horaria."""
+    return pd.DatetimeIndex(pd.to_datetime(np.asarray(values, dtype=np.int64), unit="s"))
+
+
+def period_to_start(period: str, now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """
+    Traduce un período estilo yfinance (5d, 1mo, 6mo, 1y, 2y, ytd, max) a fecha inicial.
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now()).normalize()
+    period = period.lower()
+    if period == "max":
+        return _EPOCH
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    units = [("mo", "months"), ("wk", "weeks"), ("y", "years"), ("d", "days")]
+    for suffix, unit in units:
+        if period.endswith(suffix):
+            amount = int(period[:-len(suffix)])
+            return now - pd.DateOffset(**{unit: amount})
+
+    raise ValueError(f"Período no soportado: {period}")
+
+
+# === DESCARGA ===
+
+def _download(symbols: List[str], start: pd.Timestamp, interval: str) -> Dict[str, pd.DataFrame]:
+    """Descarga barras OHLCV desde yfinance en una sola llamada por lote."""
+    end = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    data = market_data.download(
+        symbols,
+        start=start.strftime("%Y-%m-%d"),
+        end=end.strftime("%Y-%m-%d"),
+        interval=interval,
+        progress=False,
+        auto_adjust=True,
+        group_by="column",
+    )
+
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(1):
+                continue
+            frame = data.xs(symbol, axis=1, level=1)
+        elif len(symbols) == 1:
+            frame = data
+        else:
+            continue
+
+        frame = frame.reindex(columns=PRICE_FIELDS).dropna(subset=["Close"])
+        if not frame.empty:
+            frames[symbol] = frame
+
+    return frames
+
+
+def _write_bars(conn: sqlite3.Connection, symbol: str, interval: str, frame: pd.DataFrame) -> None:
+    """Inserta (o reemplaza) barras de un símbolo."""
+    ts = _to_epoch(frame.index)
+    columns = [frame[field].astype(float).to_numpy() for field in PRICE_FIELDS]
+    rows = [
+        (symbol, interval, int(t), *(None if np.isnan(v) else float(v) for v in values))
+        for t, *values in zip(ts, *columns)
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    _stats["bars_written"] += len(rows)
+
+
+def _load_sync_state(conn: sqlite3.Connection, symbols: List[str], interval: str) -> Dict[str, Tuple]:
+    """Retorna {symbol: (covered_from, last_ts, synced_at)} para los símbolos dados."""
+    state = {}
+    for i in range(0, len(symbols), _SQL_CHUNK):
+        chunk = symbols[i:i + _SQL_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT symbol, covered_from, last_ts, synced_at FROM sync_state "
+            f"WHERE interval = ? AND symbol IN ({placeholders})",
+            [interval, *chunk],
+        ).fetchall()
+        for symbol, covered_from, last_ts, synced_at in rows:
+            state[symbol] = (covered_from, last_ts, synced_at)
+    return state
+
+
+def _load_failed_syncs(conn: sqlite3.Connection, symbols: List[str], interval: str) -> Dict[str, float]:
+    """Retorna {symbol: attempted_at} de las descargas completas que no trajeron barras."""
+    failed = {}
+    for i in range(0, len(symbols), _SQL_CHUNK):
+        chunk = symbols[i:i + _SQL_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT symbol, attempted_at FROM failed_syncs WHERE interval = ? AND symbol IN ({placeholders})",
+            [interval, *chunk],
+        ).fetchall()
+        failed.update(rows)
+    return failed
+
+
+def _save_sync_state(conn: sqlite3.Connection, symbol: str, interval: str, covered_from: int) -> None:
+    """Actualiza la cobertura y la marca de sincronización de un símbolo."""
+    last_ts = conn.execute(
+        "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+    ).fetchone()[0]
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (symbol, interval, covered_from, last_ts, synced_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (symbol, interval, int(covered_from), last_ts, time.time()),
+    )
+
+
+def _anchor_bar(conn: sqlite3.Connection, symbol: str, interval: str) -> Optional[Tuple[int, float]]:
+    """
+    Retorna la penúltima barra guardada (ts, close).
+
+    La última barra puede estar incompleta (sesión en curso), así que la
+    sincronización incremental se ancla en la anterior para detectar ajustes
+    por dividendos o splits.
+    """
+    rows = conn.execute(
+        "SELECT ts, close FROM bars WHERE symbol = ? AND interval = ? ORDER BY ts DESC LIMIT 2",
+        (symbol, interval),
+    ).fetchall()
+    return rows[-1] if rows else None
+
+
+@perf.timed()
+def sync(symbols: List[str], start: pd.Timestamp, interval: str = "1d", force: bool = False) -> None:
+    """
+    Sincroniza el almacén con la red descargando solo las barras faltantes.
+
+    Args:
+        symbols: Lista de símbolos
+        start: Fecha inicial que debe quedar cubierta
+        interval: Intervalo de las barras (1d, 1h, 15m...)
+        force: Ignorar la antigüedad de la última sincronización (y de los intentos sin datos)
+    """
+    start = pd.Timestamp(start)
+    start_ts = int(_to_epoch([start])[0])
+    now = time.time()
+
+    with _locked(symbols, interval):
+        conn = _connect()
+        try:
+            state = _load_sync_state(conn, symbols, interval)
+            failed = _load_failed_syncs(conn, symbols, interval)
+
+            # Agrupar símbolos por fecha inicial de descarga para hacer una llamada por grupo
+            full_fetch = {}
+            forward_fetch = {}
+            anchors = {}
+            for symbol in symbols:
+                # Descarga completa vacía hace poco (ticker inválido, deslistado, error de red):
+                # no se reintenta hasta SYNC_MAX_AGE, así un símbolo malo no manda toda la lista a la red
+                recently_failed = not force and now - failed.get(symbol, -np.inf) <= SYNC_MAX_AGE
+                if symbol not in state:
+                    if not recently_failed:
+                        full_fetch.setdefault(start_ts, []).append(symbol)
+                    continue
+
+                covered_from, last_ts, synced_at = state[symbol]
+                if start_ts < covered_from:
+                    if recently_failed:
+                        continue
+                    # Falta historia hacia atrás: descargar de nuevo desde el inicio pedido
+                    full_fetch.setdefault(start_ts, []).append(symbol)
+                elif force or now - synced_at > SYNC_MAX_AGE:
+                    anchor = _anchor_bar(conn, symbol, interval) if last_ts is not None else None
+                    if anchor is None:
+                        full_fetch.setdefault(covered_from, []).append(symbol)
+                    else:
+                        anchors[symbol] = anchor
+                        forward_fetch.setdefault((anchor[0], covered_from), []).append(symbol)
+
+            for fetch_from, group in full_fetch.items():
+                frames = _download_safely(group, fetch_from, interval)
+                for symbol in group:
+                    # Sin datos no se marca cubierto (se reintenta), solo se registra el intento
+                    if symbol in frames:
+                        covered_from = min(fetch_from, state.get(symbol, (fetch_from,))[0])
+                        _write_bars(conn, symbol, interval, frames[symbol])
+                        _save_sync_state(conn, symbol, interval, covered_from)
+                        conn.execute("DELETE FROM failed_syncs WHERE symbol = ? AND interval = ?", (symbol, interval))
+                    else:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO failed_syncs (symbol, interval, attempted_at) VALUES (?, ?, ?)",
+                            (symbol, interval, now),
+                        )
+                conn.commit()
+
+            for (anchor_ts, covered_from), group in forward_fetch.items():
+                frames = _download_safely(group, anchor_ts, interval)
+                readjusted = []
+                for symbol in group:
+                    frame = frames.get(symbol)
+                    if frame is None:
+                        continue
+                    anchor_close = anchors[symbol][1]
+                    new_ts = _to_epoch(frame.index)
+                    match = frame["Close"].to_numpy()[new_ts == anchors[symbol][0]]
+                    if len(match) and anchor_close and abs(match[0] / anchor_close - 1) > 1e-6:
+                        readjusted.append(symbol)
+                        continue
+                    _write_bars(conn, symbol, interval, frame)
+                    _save_sync_state(conn, symbol, interval, covered_from)
+
+                # La historia ajustada cambió (dividendo o split): reemplazarla completa
+                # (solo si la nueva descarga llegó; si no, se conservan las barras y el estado)
+                if readjusted:
+                    frames = _download_safely(readjusted, covered_from, interval)
+                    for symbol in readjusted:
+                        if symbol not in frames:
+                            continue
+                        conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+                        _write_bars(conn, symbol, interval, frames[symbol])
+                        _save_sync_state(conn, symbol, interval, covered_from)
+                conn.commit()
+        finally:
+            conn.close()
+
+
+def _download_safely(symbols: List[str], start_ts: int, interval: str) -> Dict[str, pd.DataFrame]:
+    """Descarga un lote y registra el error sin interrumpir la lectura local."""
+    try:
+        _stats["network_syncs"] += 1
+        return _download(symbols, _from_epoch([start_ts])[0], interval)
+    except Exception as e:
+        logger.warning("Error sincronizando precios %s: %s", symbols[:5], e)
+        return {}
+
+
+# === LECTURA ===
+
+def _resolve_window(
+    period: Optional[str],
+    start=None,
+    end=None,
+) -> Tuple[pd.Timestamp, Optional[pd.Timestamp]]:
+    """Normaliza period/start/end a un rango [start, end)."""
+    if start is None:
+        start = period_to_start(period or "1y")
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end) if end is not None else None
+    return start, end
+
+
+def _read_bars(
+    symbols: List[str],
+    start: pd.Timestamp,
+    end: Optional[pd.Timestamp],
+    interval: str,
+    fields: List[str],
+) -> pd.DataFrame:
+    """Lee barras del almacén en formato largo (symbol, ts, campos...)."""
+    start_ts = int(_to_epoch([start])[0])
+    end_ts = int(_to_epoch([end])[0]) if end is not None else np.iinfo(np.int64).max
+    columns = ", ".join(field.lower() for field in fields)
+
+    conn = _connect()
+    try:
+        parts = []
+        for i in range(0, len(symbols), _SQL_CHUNK):
+            chunk = symbols[i:i + _SQL_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            parts.append(pd.read_sql_query(
+                f"SELECT symbol, ts, {columns} FROM bars "
+                f"WHERE interval = ? AND symbol IN ({placeholders}) AND ts >= ? AND ts < ? "
+                f"ORDER BY symbol, ts",
+                conn,
+                params=[interval, *chunk, start_ts, end_ts],
+            ))
+    finally:
+        conn.close()
+
+    _stats["local_reads"] += 1
+    long = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    long.columns = ["symbol", "ts"] + fields
+    return long
+
+
+def _unique(symbols: List[str]) -> List[str]:
+    """Elimina símbolos duplicados conservando el orden."""
+    return list(dict.fromkeys(s.upper() for s in symbols))
+
+
+@perf.timed()
+def get_prices(
+    symbols: List[str],
+    period: Optional[str] = "1y",
+    start=None,
+    end=None,
+    interval: str = "1d",
+    field: str = "Close",
+) -> pd.DataFrame:
+    """
+    Obtiene un panel ancho de precios (fechas × símbolos) desde el almacén local.
+
+    Equivalente a yf.download(symbols, ...)['Close'], pero solo descarga de la
+    red las barras que faltan desde la última sincronización.
+
+    Args:
+        symbols: Lista de símbolos
+        period: Período estilo yfinance (ignorado si se da start)
+        start: Fecha inicial
+        end: Fecha final (exclusiva)
+        interval: Intervalo de las barras
+        field: Campo OHLCV a retornar
+
+    Returns:
+        DataFrame con una columna por símbolo, en el orden solicitado
+    """
+    return get_panels(symbols, [field], period, start, end, interval).get(field, pd.DataFrame())
+
+
+@perf.timed()
+def get_panels(
+    symbols: List[str],
+    fields: List[str] = PRICE_FIELDS,
+    period: Optional[str] = "1y",
+    start=None,
+    end=None,
+    interval: str = "1d",
+) -> Dict[str, pd.DataFrame]:
+    """
+    Obtiene varios paneles anchos (fechas × símbolos) con una sola sincronización y lectura.
+
+    Args:
+        symbols: Lista de símbolos
+        fields: Campos OHLCV a retornar
+        period: Período estilo yfinance (ignorado si se da start)
+        start: Fecha inicial
+        end: Fecha final (exclusiva)
+        interval: Intervalo de las barras
+
+    Returns:
+        Dict campo → panel con una columna por símbolo en el orden solicitado
+        (vacío si no hay barras)
+    """
+    symbols = _unique(symbols)
+    fields = list(fields)
+    start, end = _resolve_window(period, start, end)
+    sync(symbols, start, interval)
+
+    long = _read_bars(symbols, start, end, interval, fields)
+    if long.empty:
+        return {}
+
+    wide = long.pivot(index="ts", columns="symbol", values=fields)
+    index = _from_epoch(wide.index)
+    index.name = "Date"
+    panels = {}
+    for field in fields:
+        panel = wide[field]
+        panel.index = index
+        panel.columns.name = None
+        panels[field] = panel.reindex(columns=symbols)
+    return panels
+
+
+@perf.timed()
+def get_history(
+    symbol: str,
+    period: Optional[str] = "1y",
+    start=None,
+    end=None,
+    interval: str = "1d",
+) -> pd.DataFrame:
+    """
+    Obtiene el historial OHLCV de un símbolo desde el almacén local.
+
+    Equivalente a yf.Ticker(symbol).history(...), con columnas Open, High, Low, Close, Volume.
+    """
+    symbol = symbol.upper()
+    start, end = _resolve_window(period, start, end)
+    sync([symbol], start, interval)
+
+    long = _read_bars([symbol], start, end, interval, PRICE_FIELDS)
+    if long.empty:
+        return pd.DataFrame(columns=PRICE_FIELDS)
+
+    frame = long[PRICE_FIELDS].copy()
+    frame.index = _from_epoch(long["ts"])
+    frame.index.name = "Date"
+    return frame
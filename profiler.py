@@ -0,0 +1,266 @@
+"""
+Profiler Module
+Perfilado bajo demanda de un rerun (?profile=1 con cProfile, ?profile=sample con muestreo)
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Carpeta donde se guardan las capturas y cuántas se conservan
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/changos/profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+
+# Intervalo del muestreador (segundos)
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+# Funciones que se muestran en el resumen
+TOP_N = 25
+
+# Capturas abiertas por hilo: si un rerun termina con st.rerun() o una
+# excepción, la siguiente captura del mismo hilo cierra la anterior
+_active: Dict[int, "Capture"] = {}
+_active_lock = threading.Lock()
+
+
+class Capture:
+    """Una captura en curso: cProfile o muestreo del hilo del script."""
+
+    def __init__(self, mode: str, label: str):
+        self.mode = mode
+        self.label = label
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional["_Sampler"] = None
+
+    def start(self) -> None:
+        if self.mode == "sample":
+            self._sampler = _Sampler(self.thread_id, SAMPLE_INTERVAL)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+
+class _Sampler(threading.Thread):
+    """
+    Muestrea la pila del hilo del script cada `interval` segundos.
+
+    Solo lee sys._current_frames(): el hilo perfilado no paga ningún costo
+    por llamada, a diferencia de cProfile.
+    """
+
+    def __init__(self, target_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target_id = target_id
+        self.interval = interval
+        self.frames: List[Dict] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._frame_ids: Dict[tuple, int] = {}
+        self._halt = threading.Event()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_ids.get(key)
+        if index is None:
+            index = self._frame_ids[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.target_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join(timeout=1)
+
+
+def requested_mode(value) -> Optional[str]:
+    """Modo pedido en ?profile= : 'cprofile' (1, true, cprofile), 'sample' o None."""
+    value = str(value or "").strip().lower()
+    if value in ("1", "true", "cprofile"):
+        return "cprofile"
+    if value == "sample":
+        return "sample"
+    return None
+
+
+def start(mode: str, label: str = "rerun") -> Optional[Capture]:
+    """
+    Empieza a perfilar el hilo actual.
+
+    Args:
+        mode: 'cprofile' o 'sample'
+        label: Nombre que llevará el archivo (ej. la pestaña activa)
+
+    Returns:
+        Capture en curso, o None si no se pudo iniciar
+    """
+    thread_id = threading.get_ident()
+    with _active_lock:
+        stale = _active.pop(thread_id, None)
+    if stale is not None:
+        stale.stop()
+
+    capture = Capture(mode, label)
+    try:
+        capture.start()
+    except ValueError as e:
+        # Python 3.12+: solo un perfilador de cProfile activo por proceso
+        logger.warning("No se pudo iniciar el perfilador: %s", e)
+        return None
+    with _active_lock:
+        _active[thread_id] = capture
+    return capture
+
+
+def _safe_label(label: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "-" for c in label)[:40] or "rerun"
+
+
+def _prune(directory: str) -> None:
+    """Conserva solo las PROFILE_KEEP capturas más recientes."""
+    files = sorted(
+        (os.path.join(directory, f) for f in os.listdir(directory) if f.endswith((".pstats", ".speedscope.json"))),
+        key=os.path.getmtime,
+    )
+    for path in files[:-PROFILE_KEEP]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _short_path(filename: str) -> str:
+    """Ruta relativa al repo o al site-packages, para que el resumen sea legible."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    if filename.startswith(root):
+        return os.path.relpath(filename, root)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def _cprofile_summary(profile: cProfile.Profile) -> List[Dict]:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        location = func if filename == "~" else f"{_short_path(filename)}:{line}({func})"
+        rows.append({"function": location, "calls": ncalls, "self_ms": tottime * 1000, "total_ms": cumtime * 1000})
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)[:TOP_N]
+
+
+def _sample_summary(sampler: _Sampler) -> List[Dict]:
+    """Tiempo propio (hoja de la pila) y total (aparece en la pila) por función."""
+    self_time: Dict[int, float] = {}
+    total_time: Dict[int, float] = {}
+    for stack, weight in zip(sampler.samples, sampler.weights):
+        if not stack:
+            continue
+        self_time[stack[-1]] = self_time.get(stack[-1], 0.0) + weight
+        for index in set(stack):
+            total_time[index] = total_time.get(index, 0.0) + weight
+    rows = []
+    for index, total in total_time.items():
+        frame = sampler.frames[index]
+        rows.append({
+            "function": f"{_short_path(frame['file'])}:{frame['line']}({frame['name']})",
+            "self_ms": self_time.get(index, 0.0) * 1000,
+            "total_ms": total * 1000,
+        })
+    return sorted(rows, key=lambda r: r["total_ms"], reverse=True)[:TOP_N]
+
+
+def _speedscope(sampler: _Sampler, name: str) -> Dict:
+    """Perfil muestreado en el formato de archivo de speedscope."""
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": sampler.frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(sampler.weights),
+            "samples": sampler.samples,
+            "weights": sampler.weights,
+        }],
+        "name": name,
+        "exporter": "changos-profiler",
+    }
+
+
+def stop(capture: Optional[Capture], label: Optional[str] = None) -> Optional[Dict]:
+    """
+    Detiene la captura, la guarda en PROFILE_DIR y resume las funciones más costosas.
+
+    Args:
+        capture: Resultado de start()
+        label: Reemplaza el nombre del archivo (ej. la pestaña, que se conoce al final)
+
+    Returns:
+        Dict con mode, path, duration_s y top (lista de funciones); None si no había captura
+    """
+    if capture is None:
+        return None
+    capture.stop()
+    if label:
+        capture.label = label
+    duration = time.perf_counter() - capture.started
+    with _active_lock:
+        if _active.get(capture.thread_id) is capture:
+            del _active[capture.thread_id]
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    stem = os.path.join(PROFILE_DIR, f"{stamp}-{_safe_label(capture.label)}")
+    result = {"mode": capture.mode, "duration_s": duration, "path": None}
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if capture.mode == "sample":
+            result["top"] = _sample_summary(capture._sampler)
+            result["samples"] = len(capture._sampler.samples)
+            result["path"] = f"{stem}.speedscope.json"
+            with open(result["path"], "w") as f:
+                json.dump(_speedscope(capture._sampler, capture.label), f)
+        else:
+            result["top"] = _cprofile_summary(capture._profile)
+            result["path"] = f"{stem}.pstats"
+            capture._profile.dump_stats(result["path"])
+        _prune(PROFILE_DIR)
+    except OSError as e:
+        logger.warning("No se pudo guardar el perfil: %s", e)
+        result["path"] = None
+        result.setdefault("top", [])
+    return result
@@ -369,6 +369,19 @@ def get_dynamic_streamlit_css(theme_name: str = None):
         border-bottom: 2px solid {t['accent_primary']} !important;
     }}
 
+    /* Navegación principal (radio horizontal que reemplaza a st.tabs).
+       Acotado por la clase st-key-<key> del widget para no afectar a los demás radios */
+    .st-key-active_tab div[data-testid="stRadio"] > div[role="radiogroup"] {{
+        border-bottom: 2px solid {t['border']} !important;
+        gap: 1.25rem !important;
+        padding-bottom: 0.4rem !important;
+    }}
+
+    .st-key-active_tab div[data-testid="stRadio"] label {{
+        color: {t['text_muted']} !important;
+        font-family: {t['font_body']} !important;
+    }}
+
     /* Expander */
     .streamlit-expanderHeader {{
         background-color: {t['bg_card']} !important;
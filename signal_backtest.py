@@ -0,0 +1,137 @@
+"""
+Signal Backtest Module
+Retornos futuros por estado de momentum sobre el historial completo de un universo
+"""
+
+import logging
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import perf
+import price_store
+from technical_signals import MOMENTUM_STATES, momentum_states
+
+logger = logging.getLogger(__name__)
+
+# Horizontes (en barras) de los retornos futuros
+DEFAULT_HORIZONS = (1, 5, 10, 20)
+
+# EMAs seleccionadas por defecto en el gráfico de precios: el banner compara el precio contra la primera
+DEFAULT_EMAS = (20, 50, 200)
+
+
+def forward_returns(prices: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Retorno de t a t + horizon para cada barra (NaN en las últimas `horizon`).
+
+    Args:
+        prices: Arreglo (barras,) o (barras × símbolos)
+        horizon: Barras hacia adelante
+
+    Returns:
+        Arreglo con la forma de prices
+    """
+    out = np.full(prices.shape, np.nan)
+    if horizon < len(prices):
+        out[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+    return out
+
+
+def panel_momentum_states(panel: pd.DataFrame, ema_spans: Tuple[int, ...] = DEFAULT_EMAS) -> np.ndarray:
+    """
+    Estado de momentum de cada (barra, símbolo) de un panel de cierres.
+
+    Las EMAs usan min_periods como el motor de indicadores, así que cada
+    celda coincide con el banner del gráfico con esas EMAs seleccionadas.
+
+    Args:
+        panel: DataFrame de cierres (fechas × símbolos)
+        ema_spans: EMAs del selector, en orden
+
+    Returns:
+        Arreglo int8 (barras × símbolos) con posiciones en MOMENTUM_STATES
+    """
+    ema_data = {n: panel.ewm(span=n, min_periods=n, adjust=False).mean() for n in ema_spans}
+    return momentum_states(panel, ema_data)
+
+
+@perf.timed()
+def backtest_momentum_states(
+    panel: pd.DataFrame,
+    horizons: Tuple[int, ...] = DEFAULT_HORIZONS,
+    ema_spans: Tuple[int, ...] = DEFAULT_EMAS
+) -> pd.DataFrame:
+    """
+    Mide los retornos futuros que siguieron a cada estado de momentum.
+
+    Todo el panel se clasifica de una vez y las estadísticas por estado se
+    agregan con np.bincount, sin ciclos por barra ni por símbolo. Los
+    retornos de horizontes largos se traslapan entre barras consecutivas,
+    así que las observaciones no son independientes.
+
+    Args:
+        panel: DataFrame de cierres (fechas × símbolos)
+        horizons: Horizontes en barras
+        ema_spans: EMAs del selector del gráfico
+
+    Returns:
+        DataFrame por estado con bars, share y, por horizonte h,
+        mean_<h>, hit_rate_<h> (retorno > 0) y excess_<h> (contra todas las barras)
+    """
+    if panel.empty:
+        return pd.DataFrame()
+
+    prices = panel.to_numpy(dtype=float)
+    codes = panel_momentum_states(panel, ema_spans).ravel()
+    n_states = len(MOMENTUM_STATES)
+    classified = codes != 0
+
+    bars = np.bincount(codes[classified], minlength=n_states)
+    result = pd.DataFrame(
+        {"bars": bars, "share": bars / max(bars.sum(), 1)},
+        index=pd.Index([state[0] for state in MOMENTUM_STATES], name="state"),
+    )
+
+    for h in horizons:
+        returns = forward_returns(prices, h).ravel()
+        valid = classified & ~np.isnan(returns)
+        state, ret = codes[valid], returns[valid]
+        count = np.bincount(state, minlength=n_states)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(state, weights=ret, minlength=n_states) / count
+            hit_rate = np.bincount(state, weights=(ret > 0).astype(float), minlength=n_states) / count
+        result[f"mean_{h}"] = mean
+        result[f"hit_rate_{h}"] = hit_rate
+        result[f"excess_{h}"] = mean - (ret.mean() if len(ret) else np.nan)
+
+    # Sin INSUFFICIENT DATA ni estados que nunca ocurrieron
+    result = result.drop(index=MOMENTUM_STATES[0][0])
+    return result[result["bars"] > 0]
+
+
+def backtest_symbols(
+    symbols: List[str],
+    period: str = "5y",
+    horizons: Tuple[int, ...] = DEFAULT_HORIZONS,
+    ema_spans: Tuple[int, ...] = DEFAULT_EMAS
+) -> pd.DataFrame:
+    """
+    Backtest de los estados de momentum sobre los cierres diarios de `symbols`.
+
+    Args:
+        symbols: Lista de símbolos
+        period: Historial a usar (estilo yfinance)
+        horizons: Horizontes en barras
+        ema_spans: EMAs del selector del gráfico
+
+    Returns:
+        DataFrame de backtest_momentum_states, vacío si no hay datos
+    """
+    try:
+        panel = price_store.get_prices(symbols, period=period)
+        return backtest_momentum_states(panel.dropna(axis=1, how="all"), horizons, ema_spans)
+    except Exception as e:
+        logger.warning("Error en backtest de momentum: %s", e)
+        return pd.DataFrame()
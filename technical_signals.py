@@ -0,0 +1,354 @@
+"""
+Technical Signals Module
+Detección vectorizada de pivotes y divergencias de RSI, y estado de momentum
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional, Tuple
+
+import perf
+
+# Estados de momentum (nombre, color, descripción). El código de cada estado en
+# momentum_states() es su posición; el orden es el de evaluación de las reglas.
+MOMENTUM_STATES: Tuple[Tuple[str, str, str], ...] = (
+    ("INSUFFICIENT DATA", "#888888", "Not enough data to calculate momentum"),
+    ("FULLY BULLISH", "#39FF14", "Strong upward momentum across all indicators"),
+    ("FULLY BEARISH", "#FF3366", "Strong downward momentum across all indicators"),
+    ("RECENTLY TURNED BULLISH", "#00FF88", "MACD just crossed bullish, momentum shifting up"),
+    ("RECENTLY TURNED BEARISH", "#FF6B35", "MACD just crossed bearish, momentum shifting down"),
+    ("STARTING TO FLIP BULLISH", "#FFE600", "Early signs of bullish reversal forming"),
+    ("STARTING TO FLIP BEARISH", "#FF9500", "Early signs of bearish reversal forming"),
+    ("BULLISH", "#00FFFF", "Positive momentum, trend favors upside"),
+    ("BEARISH", "#FF00FF", "Negative momentum, trend favors downside"),
+    ("NEUTRAL", "#888888", "Mixed signals, no clear momentum direction"),
+)
+_STATES = {state[0]: state for state in MOMENTUM_STATES}
+
+# Barras mínimas para clasificar el momentum
+MOMENTUM_MIN_BARS = 50
+
+
+def wilder_rsi(close: pd.Series, length: int = 14) -> pd.Series:
+    """
+    RSI de Wilder, idéntico a ta.momentum.RSIIndicator.
+
+    Es el único RSI de la app: el gráfico, las divergencias y el momentum
+    usan esta definición (o su versión incremental en indicator_engine).
+
+    Args:
+        close: Serie de cierres, o DataFrame (fechas × símbolos)
+        length: Periodo del RSI
+
+    Returns:
+        RSI alineado con close (NaN en las primeras `length` barras)
+    """
+    delta = close.diff()
+    up = delta.where(delta > 0, 0.0).ewm(alpha=1 / length, min_periods=length, adjust=False).mean()
+    down = (-delta.where(delta < 0, 0.0)).ewm(alpha=1 / length, min_periods=length, adjust=False).mean()
+    return (100 - 100 / (1 + up / down)).where(down != 0, 100.0)
+
+
+def find_pivots(values, window: int = 5, kind: str = "low") -> np.ndarray:
+    """
+    Encuentra pivotes: barras que son el mínimo (o máximo) de su ventana centrada.
+
+    Equivale a comparar values[i] contra values[i-window:i+window+1] para cada
+    i en [window, n - window), pero con una sola pasada de sliding_window_view.
+    Los NaN se ignoran dentro de la ventana y nunca son pivote.
+
+    Args:
+        values: Serie o arreglo de precios
+        window: Barras a cada lado de la barra central
+        kind: "low" para mínimos locales, "high" para máximos locales
+
+    Returns:
+        Arreglo de posiciones enteras de los pivotes, en orden ascendente
+    """
+    values = np.asarray(values, dtype=float)
+    size = 2 * window + 1
+    if len(values) < size:
+        return np.empty(0, dtype=np.int64)
+
+    if kind == "low":
+        extreme = sliding_window_view(np.where(np.isnan(values), np.inf, values), size).min(axis=1)
+    else:
+        extreme = sliding_window_view(np.where(np.isnan(values), -np.inf, values), size).max(axis=1)
+
+    center = values[window:len(values) - window]
+    return np.nonzero(center == extreme)[0] + window
+
+
+def match_divergences(
+    pivots: np.ndarray,
+    price: np.ndarray,
+    oscillator: np.ndarray,
+    min_distance: int = 3,
+    kind: str = "bullish",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compara pares de pivotes consecutivos contra un oscilador.
+
+    Bullish: el precio hace un mínimo más bajo y el oscilador uno más alto.
+    Bearish: el precio hace un máximo más alto y el oscilador uno más bajo.
+
+    Args:
+        pivots: Posiciones de pivotes (de find_pivots)
+        price: Arreglo de precios
+        oscillator: Arreglo del oscilador (RSI) alineado con price
+        min_distance: Barras mínimas entre los dos pivotes
+        kind: "bullish" o "bearish"
+
+    Returns:
+        Tupla (posiciones del pivote anterior, posiciones del pivote actual)
+    """
+    pivots = np.asarray(pivots, dtype=np.int64)
+    price = np.asarray(price, dtype=float)
+    oscillator = np.asarray(oscillator, dtype=float)
+
+    prev, curr = pivots[:-1], pivots[1:]
+    far_enough = (curr - prev) >= min_distance
+    if kind == "bullish":
+        mask = far_enough & (price[curr] < price[prev]) & (oscillator[curr] > oscillator[prev])
+    else:
+        mask = far_enough & (price[curr] > price[prev]) & (oscillator[curr] < oscillator[prev])
+    return prev[mask], curr[mask]
+
+
+def _find_divergences(df, rsi_series, column, kind, lookback, min_distance) -> List[Dict]:
+    """Alinea precio y RSI, detecta pivotes y arma la lista de divergencias."""
+    divergences = []
+
+    if rsi_series is None or len(rsi_series) < lookback * 2:
+        return divergences
+
+    # Alinear índices
+    common_idx = df.index.intersection(rsi_series.index)
+    if len(common_idx) < lookback * 2:
+        return divergences
+
+    price = df.loc[common_idx, column]
+    rsi = rsi_series.loc[common_idx]
+
+    price_values = price.to_numpy(dtype=float)
+    pivots = find_pivots(price_values, window=lookback, kind="low" if kind == "bullish" else "high")
+    prev, curr = match_divergences(pivots, price_values, rsi.to_numpy(dtype=float), min_distance, kind)
+
+    for idx1, idx2 in zip(prev, curr):
+        divergences.append({
+            'date': price.index[idx2],
+            'price': price.iloc[idx2],
+            'rsi': rsi.iloc[idx2],
+            'prev_date': price.index[idx1],
+            'prev_price': price.iloc[idx1],
+            'prev_rsi': rsi.iloc[idx1]
+        })
+
+    return divergences
+
+
+@perf.timed()
+def find_bullish_divergences(df, rsi_series, lookback=5, min_distance=3):
+    """
+    Detecta divergencias bullish: precio hace lower low, RSI hace higher low
+    """
+    return _find_divergences(df, rsi_series, 'low', "bullish", lookback, min_distance)
+
+
+@perf.timed()
+def find_bearish_divergences(df, rsi_series, lookback=5, min_distance=3):
+    """
+    Detecta divergencias bearish: precio hace higher high, RSI hace lower high
+    """
+    return _find_divergences(df, rsi_series, 'high', "bearish", lookback, min_distance)
+
+
+@perf.timed()
+def calculate_momentum_state(df, ema_data=None, indicators: Optional[pd.DataFrame] = None):
+    """
+    Calculate momentum state based on multiple indicators.
+
+    `indicators` can carry precomputed rsi/macd/macd_signal/macd_hist columns
+    aligned with df (e.g. from indicator_graph); otherwise they are computed here
+    with the same definitions (Wilder RSI, MACD 12/26/9).
+    Returns: state, color, description
+    """
+    if df is None or len(df) < MOMENTUM_MIN_BARS:
+        return _STATES["INSUFFICIENT DATA"]
+
+    close = df['close']
+
+    if indicators is not None:
+        macd = indicators['macd']
+        signal = indicators['macd_signal']
+        histogram = indicators['macd_hist']
+        rsi = indicators['rsi']
+    else:
+        # Calculate MACD
+        ema12 = close.ewm(span=12, adjust=False).mean()
+        ema26 = close.ewm(span=26, adjust=False).mean()
+        macd = ema12 - ema26
+        signal = macd.ewm(span=9, adjust=False).mean()
+        histogram = macd - signal
+
+        # Calculate RSI
+        rsi = wilder_rsi(close)
+
+    # Get current values
+    current_rsi = rsi.iloc[-1]
+    current_macd = macd.iloc[-1]
+    current_signal = signal.iloc[-1]
+    current_histogram = histogram.iloc[-1]
+    prev_histogram = histogram.iloc[-2] if len(histogram) > 1 else 0
+
+    # Check histogram trend (last 3 bars)
+    hist_trend = histogram.iloc[-3:].tolist() if len(histogram) >= 3 else [0, 0, 0]
+    hist_increasing = hist_trend[-1] > hist_trend[-2] > hist_trend[-3]
+    hist_decreasing = hist_trend[-1] < hist_trend[-2] < hist_trend[-3]
+
+    # Check for recent MACD crossovers (last 5 bars)
+    recent_bull_cross = False
+    recent_bear_cross = False
+    for i in range(-5, -1):
+        if len(macd) > abs(i) and len(signal) > abs(i):
+            if macd.iloc[i-1] < signal.iloc[i-1] and macd.iloc[i] > signal.iloc[i]:
+                recent_bull_cross = True
+            if macd.iloc[i-1] > signal.iloc[i-1] and macd.iloc[i] < signal.iloc[i]:
+                recent_bear_cross = True
+
+    # EMA alignment check
+    ema_bullish = False
+    ema_bearish = False
+    if ema_data and len(ema_data) >= 2:
+        emas = sorted(ema_data.items(), key=lambda x: x[0])
+        current_price = close.iloc[-1]
+        short_ema = list(ema_data.values())[0].iloc[-1] if len(list(ema_data.values())[0]) > 0 else current_price
+        if current_price > short_ema:
+            ema_bullish = True
+        else:
+            ema_bearish = True
+
+    # Determine momentum state
+    # FULLY BULLISH: RSI > 60, MACD > Signal, histogram positive & increasing, price > EMAs
+    if current_rsi > 60 and current_macd > current_signal and current_histogram > 0 and hist_increasing and ema_bullish:
+        return _STATES["FULLY BULLISH"]
+
+    # FULLY BEARISH: RSI < 40, MACD < Signal, histogram negative & decreasing, price < EMAs
+    if current_rsi < 40 and current_macd < current_signal and current_histogram < 0 and hist_decreasing and ema_bearish:
+        return _STATES["FULLY BEARISH"]
+
+    # RECENTLY TURNED BULLISH: Recent MACD bull cross, RSI > 50
+    if recent_bull_cross and current_rsi > 50:
+        return _STATES["RECENTLY TURNED BULLISH"]
+
+    # RECENTLY TURNED BEARISH: Recent MACD bear cross, RSI < 50
+    if recent_bear_cross and current_rsi < 50:
+        return _STATES["RECENTLY TURNED BEARISH"]
+
+    # STARTING TO FLIP BULLISH: MACD approaching signal from below, histogram improving
+    if current_macd < current_signal and current_histogram > prev_histogram and current_rsi > 45:
+        return _STATES["STARTING TO FLIP BULLISH"]
+
+    # STARTING TO FLIP BEARISH: MACD approaching signal from above, histogram weakening
+    if current_macd > current_signal and current_histogram < prev_histogram and current_rsi < 55:
+        return _STATES["STARTING TO FLIP BEARISH"]
+
+    # BULLISH: RSI > 50, MACD > Signal
+    if current_rsi > 50 and current_macd > current_signal:
+        return _STATES["BULLISH"]
+
+    # BEARISH: RSI < 50, MACD < Signal
+    if current_rsi < 50 and current_macd < current_signal:
+        return _STATES["BEARISH"]
+
+    # NEUTRAL
+    return _STATES["NEUTRAL"]
+
+
+def _lag(values: np.ndarray, periods: int) -> np.ndarray:
+    """Desplaza sobre el eje de barras (eje 0), rellenando con NaN."""
+    out = np.full_like(values, np.nan)
+    out[periods:] = values[:-periods]
+    return out
+
+
+@perf.timed()
+def momentum_states(close, ema_data=None, indicators=None) -> np.ndarray:
+    """
+    Estado de momentum de cada barra, vectorizado.
+
+    Para cada barra t da el mismo estado que calculate_momentum_state sobre las
+    barras 0..t: todas las reglas se evalúan como máscaras booleanas y se
+    resuelven en orden con np.select. Acepta una serie o un panel
+    (fechas × símbolos), así que miles de símbolos se clasifican sin un ciclo
+    de Python por barra ni por símbolo.
+
+    Args:
+        close: Serie de cierres, o DataFrame/arreglo 2-D (barras × símbolos)
+        ema_data: Dict {longitud: EMA} como en calculate_momentum_state; solo
+            cuenta la primera EMA y solo si hay al menos dos
+        indicators: Dict/DataFrame con rsi, macd, macd_signal y macd_hist
+            precalculados con la forma de close (si no, se calculan aquí)
+
+    Returns:
+        Arreglo int8 con la forma de close; cada valor es la posición del
+        estado en MOMENTUM_STATES
+    """
+    frame = close if isinstance(close, (pd.Series, pd.DataFrame)) else pd.DataFrame(close)
+    if indicators is None:
+        macd = frame.ewm(span=12, adjust=False).mean() - frame.ewm(span=26, adjust=False).mean()
+        signal = macd.ewm(span=9, adjust=False).mean()
+        indicators = {"macd": macd, "macd_signal": signal, "macd_hist": macd - signal, "rsi": wilder_rsi(frame)}
+
+    price = np.asarray(close, dtype=float)
+    macd = np.asarray(indicators["macd"], dtype=float)
+    signal = np.asarray(indicators["macd_signal"], dtype=float)
+    hist = np.asarray(indicators["macd_hist"], dtype=float)
+    rsi = np.asarray(indicators["rsi"], dtype=float)
+    if len(price) < 3:
+        return np.zeros(price.shape, dtype=np.int8)
+
+    above = macd > signal
+    below = macd < signal
+    prev_hist = _lag(hist, 1)
+    hist_increasing = (hist > prev_hist) & (prev_hist > _lag(hist, 2))
+    hist_decreasing = (hist < prev_hist) & (prev_hist < _lag(hist, 2))
+
+    # Cruces de MACD en los pares de barras (t-5, t-4) ... (t-2, t-1), como el
+    # ciclo de calculate_momentum_state (la barra actual no cuenta)
+    bull_cross = np.zeros(price.shape, dtype=bool)
+    bear_cross = np.zeros(price.shape, dtype=bool)
+    bull_cross[1:] = (macd[:-1] < signal[:-1]) & (macd[1:] > signal[1:])
+    bear_cross[1:] = (macd[:-1] > signal[:-1]) & (macd[1:] < signal[1:])
+    recent_bull_cross = np.zeros(price.shape, dtype=bool)
+    recent_bear_cross = np.zeros(price.shape, dtype=bool)
+    for lag in range(1, 5):
+        recent_bull_cross[lag:] |= bull_cross[:-lag]
+        recent_bear_cross[lag:] |= bear_cross[:-lag]
+
+    # Alineación de EMAs: precio contra la primera EMA (un NaN cuenta como bajista)
+    if ema_data and len(ema_data) >= 2:
+        ema_bullish = price > np.asarray(next(iter(ema_data.values())), dtype=float)
+        ema_bearish = ~ema_bullish
+    else:
+        ema_bullish = ema_bearish = np.zeros(price.shape, dtype=bool)
+
+    conditions = [
+        (rsi > 60) & above & (hist > 0) & hist_increasing & ema_bullish,
+        (rsi < 40) & below & (hist < 0) & hist_decreasing & ema_bearish,
+        recent_bull_cross & (rsi > 50),
+        recent_bear_cross & (rsi < 50),
+        below & (hist > prev_hist) & (rsi > 45),
+        above & (hist < prev_hist) & (rsi < 55),
+        (rsi > 50) & above,
+        (rsi < 50) & below,
+    ]
+    codes = np.select(conditions, np.arange(1, len(conditions) + 1, dtype=np.int8), default=len(MOMENTUM_STATES) - 1)
+    codes = codes.astype(np.int8)
+
+    # Menos de MOMENTUM_MIN_BARS barras propias: en un panel, cada símbolo
+    # cuenta desde su primer cierre (los NaN iniciales no son historia)
+    history = np.cumsum(~np.isnan(price), axis=0)
+    codes[(history < MOMENTUM_MIN_BARS) | np.isnan(price)] = 0
+    return codes
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import indicator_engine
+
+
+def _bars(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame(
+        {"open": close, "high": close + 1, "low": close - 1, "close": close, "volume": rng.integers(1e5, 1e6, n).astype(float)},
+        index=pd.date_range("2024-01-02 09:30", periods=n, freq="15min"),
+    )
+
+
+def test_incremental_matches_full_recompute():
+    df = _bars(600)
+    stream = indicator_engine.IndicatorStream()
+    for end in range(400, 601, 25):
+        result = stream.update(df.iloc[:end])
+    pd.testing.assert_frame_equal(result, indicator_engine.compute_indicators(df), check_exact=False, rtol=1e-9)
+    assert stream.rebuilds == 1
+
+
+def test_shorter_window_does_not_inherit_vwap():
+    df = _bars(1000)
+    indicator_engine.update_indicators("TEST", "15m", df)
+    window = df.iloc[-430:]
+    result = indicator_engine.update_indicators("TEST", "15m", window)
+    pd.testing.assert_frame_equal(result, indicator_engine.compute_indicators(window), check_exact=False, rtol=1e-9)
+
+
+def test_history_beyond_retention_limit_matches_full_recompute(monkeypatch):
+    monkeypatch.setattr(indicator_engine, "MAX_HISTORY_BARS", 200)
+    df = _bars(500)
+    stream = indicator_engine.IndicatorStream()
+    for end in range(150, 501, 50):
+        result = stream.update(df.iloc[:end])
+    assert stream._ts[0] > df.index[0]
+    pd.testing.assert_frame_equal(result, indicator_engine.compute_indicators(df), check_exact=False, rtol=1e-9)
+    assert not result.iloc[:50].isna().all().all()
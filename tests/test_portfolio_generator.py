@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio_generator
+import price_store
+
+
+@pytest.fixture
+def prices(monkeypatch):
+    rng = np.random.default_rng(3)
+    index = pd.bdate_range("2023-01-02", periods=300)
+    # Volatilidades muy distintas para que un desorden de columnas se note en Σ
+    panel = pd.DataFrame(
+        {s: 100 * np.exp(np.cumsum(rng.normal(0, vol, len(index)))) for s, vol in [("AAA", 0.005), ("BBB", 0.02), ("CCC", 0.04)]},
+        index=index,
+    )
+
+    def get_prices(symbols, period="1y", **kwargs):
+        # Como el almacén: columnas en mayúsculas y sin duplicados, en orden de llegada
+        return panel.reindex(columns=list(dict.fromkeys(s.upper() for s in symbols)))
+
+    monkeypatch.setattr(price_store, "get_prices", get_prices)
+    portfolio_generator._return_stats.cache_clear()
+    return panel
+
+
+def test_return_stats_follow_normalized_symbol_order(prices):
+    mu, sigma = portfolio_generator.get_return_stats(["ccc", "AAA", "ccc", "bbb"])
+    returns = prices[["CCC", "AAA", "BBB"]].pct_change().dropna()
+    np.testing.assert_allclose(mu, returns.mean() * 252)
+    np.testing.assert_allclose(sigma, returns.cov() * 252)
+
+
+def test_return_stats_raise_for_missing_symbol(prices):
+    with pytest.raises(ValueError, match="ZZZ"):
+        portfolio_generator.get_return_stats(["AAA", "ZZZ"])
+
+
+def test_frontier_labels_match_normalized_symbols(prices):
+    frontier = portfolio_generator.efficient_frontier(["ccc", "aaa", "CCC"], n_points=5, period="1y")
+    assert [a["symbol"] for a in frontier["assets"]] == ["CCC", "AAA"]
+    assert frontier["assets"][0]["expected_volatility"] > frontier["assets"][1]["expected_volatility"]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import price_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    price_store.set_store_path(str(tmp_path / "prices.sqlite"))
+    calls = []
+    index = pd.bdate_range("2024-01-01", periods=60)
+    bars = pd.DataFrame({field: np.linspace(10, 20, len(index)) for field in price_store.PRICE_FIELDS}, index=index)
+
+    def download(symbols, start, interval):
+        calls.append(list(symbols))
+        return {s: bars[bars.index >= start] for s in symbols if s != "BAD"}
+
+    monkeypatch.setattr(price_store, "_download", download)
+    return calls
+
+
+def test_empty_symbol_is_not_downloaded_again_until_max_age(store):
+    start = pd.Timestamp("2024-01-01")
+    price_store.sync(["BAD"], start)
+    price_store.sync(["BAD"], start)
+    assert store == [["BAD"]]
+
+    price_store.sync(["BAD"], start, force=True)
+    assert len(store) == 2
+
+
+def test_bad_symbol_does_not_send_good_ones_back_to_network(store):
+    start = pd.Timestamp("2024-01-01")
+    price_store.sync(["AAA", "BAD"], start)
+    price_store.sync(["AAA", "BAD"], start)
+    assert store == [["AAA", "BAD"]]
@@ -0,0 +1,36 @@
+import threading
+from concurrent.futures import Future
+
+import ticker_prefetch
+
+
+def _failed(error: Exception) -> Future:
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def test_failed_prefetch_falls_back_and_is_replaced():
+    futures = {"profile": (_failed(ConnectionError("rate limited")), ticker_prefetch.time.monotonic())}
+    calls = []
+
+    def fallback():
+        calls.append(1)
+        return "fresh"
+
+    assert ticker_prefetch.get_prefetched(futures, "profile", fallback) == "fresh"
+    # El resultado directo queda en la entrada: el siguiente rerun no vuelve a llamar
+    assert ticker_prefetch.get_prefetched(futures, "profile", fallback) == "fresh"
+    assert len(calls) == 1
+
+
+def test_pending_prefetch_falls_back_after_wait(monkeypatch):
+    monkeypatch.setattr(ticker_prefetch, "PREFETCH_WAIT", 0.05)
+    release = threading.Event()
+    queued = ticker_prefetch._executor.submit(release.wait, 10)
+    futures = {"options": (queued, ticker_prefetch.time.monotonic())}
+    try:
+        assert ticker_prefetch.get_prefetched(futures, "options", lambda: "direct") == "direct"
+        assert futures["options"][0].result() == "direct"
+    finally:
+        release.set()
@@ -0,0 +1,130 @@
+"""
+Ticker Prefetch Module
+Descarga concurrente de todos los endpoints de un ticker al seleccionarlo
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+import market_data
+
+# Pool compartido por todas las sesiones; cada endpoint es I/O de red
+PREFETCH_WORKERS = 12
+
+# Segundos que un resultado prefetcheado sigue vigente; después se vuelve a
+# descargar (una sesión puede quedarse horas en el mismo ticker)
+PREFETCH_MAX_AGE = {
+    "options": 60,
+    "info": 300,
+    "analyst_price_targets": 3600,
+    "recommendations": 3600,
+    "upgrades_downgrades": 3600,
+    "insider_trading": 3600,
+    "institutional_holders": 6 * 3600,
+    "income": 6 * 3600,
+    "balance": 6 * 3600,
+    "cash": 6 * 3600,
+    "metrics": 6 * 3600,
+    "profile": 24 * 3600,
+}
+DEFAULT_MAX_AGE = 300
+
+# Segundos que una pestaña espera un Future en curso antes de llamar directo:
+# el pool es compartido y el trabajo puede estar en cola detrás de otras sesiones
+PREFETCH_WAIT = 5.0
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+def _endpoints() -> Dict[str, Callable[[str], Any]]:
+    """Endpoints que consumen las pestañas, con los mismos argumentos que usan."""
+    return {
+        # Perfil
+        "profile": lambda t: market_data.obb_call("equity.profile", t),
+        "institutional_holders": lambda t: market_data.ticker_attr(t, "institutional_holders"),
+        "info": lambda t: market_data.ticker_attr(t, "info"),
+        # Opciones
+        "options": lambda t: market_data.obb_call("derivatives.options.chains", t),
+        # Financieros (período anual, el default del selector)
+        "income": lambda t: market_data.obb_call("equity.fundamental.income", t, period="annual", limit=5),
+        "balance": lambda t: market_data.obb_call("equity.fundamental.balance", t, period="annual", limit=5),
+        "cash": lambda t: market_data.obb_call("equity.fundamental.cash", t, period="annual", limit=5),
+        # Análisis
+        "analyst_price_targets": lambda t: market_data.ticker_attr(t, "analyst_price_targets"),
+        "recommendations": lambda t: market_data.ticker_attr(t, "recommendations"),
+        "upgrades_downgrades": lambda t: market_data.ticker_attr(t, "upgrades_downgrades"),
+        "metrics": lambda t: market_data.obb_call("equity.fundamental.metrics", t),
+        "insider_trading": lambda t: market_data.obb_call("equity.ownership.insider_trading", t),
+    }
+
+
+def start_prefetch(symbol: str) -> Dict[str, Tuple[Future, float]]:
+    """
+    Lanza en paralelo todos los endpoints del ticker.
+
+    El tiempo hasta tener todas las pestañas listas queda acotado por el
+    endpoint más lento y no por la suma de todos.
+
+    Args:
+        symbol: Ticker seleccionado
+
+    Returns:
+        Dict endpoint → (Future con el resultado crudo (OBBject, DataFrame o dict), inicio en time.monotonic())
+    """
+    started = time.monotonic()
+    return {
+        name: (_executor.submit(fetch, symbol), started)
+        for name, fetch in _endpoints().items()
+    }
+
+
+def cancel_prefetch(futures: Dict[str, Tuple[Future, float]]) -> None:
+    """Cancela lo que aún no empezó (el usuario cambió de ticker)."""
+    for future, _ in futures.values():
+        future.cancel()
+
+
+def _resolved(value: Any) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def get_prefetched(futures: Dict[str, Tuple[Future, float]], name: str, fallback: Callable[[], Any]) -> Any:
+    """
+    Resultado de un endpoint prefetcheado.
+
+    Espera el Future hasta PREFETCH_WAIT segundos. Se usa fallback() (la llamada
+    directa, que propaga su excepción igual que antes) cuando el endpoint no se
+    prefetcheó o se canceló, cuando su Future falló (un error transitorio no
+    queda fijo toda la sesión), cuando sigue en cola o en curso pasado ese
+    tiempo, o cuando el resultado tiene más de PREFETCH_MAX_AGE segundos. Lo
+    que devuelva fallback() reemplaza la entrada en `futures`, así que los
+    siguientes reruns lo reutilizan. Como fallback() pasa por market_data
+    (single-flight), si el prefetch ya está descargando se une a esa descarga.
+
+    Args:
+        futures: Dict de start_prefetch (se actualiza en sitio)
+        name: Nombre del endpoint
+        fallback: Llamada directa equivalente
+
+    Returns:
+        Resultado del endpoint
+    """
+    entry = futures.get(name) if futures else None
+    if entry is not None:
+        future, started = entry
+        fresh = time.monotonic() - started <= PREFETCH_MAX_AGE.get(name, DEFAULT_MAX_AGE)
+        if fresh and not future.cancelled():
+            try:
+                return future.result(timeout=PREFETCH_WAIT)
+            except Exception:
+                # Falló (TimeoutError si sigue en cola o en curso): se descarta y se llama directo
+                pass
+        futures.pop(name, None)
+
+    value = fallback()
+    if entry is not None:
+        futures[name] = (_resolved(value), time.monotonic())
+    return value
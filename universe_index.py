@@ -0,0 +1,55 @@
+"""
+Universe Index Module
+Índices inmutables símbolo → metadatos para los universos de fondos y hedge
+"""
+
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+class UniverseIndex:
+    """
+    Índice precalculado de un universo {categoría: [activos]}.
+
+    - by_symbol: símbolo → metadatos del activo (incluye "category")
+    - by_category: categoría → tupla de activos, en el orden original
+    - by_issuer: emisor → tupla de activos (solo si los activos tienen "issuer")
+
+    Todo se arma una sola vez y se expone en modo solo lectura. Si un
+    símbolo aparece en varias categorías gana la primera aparición, igual
+    que la búsqueda lineal que reemplaza.
+    """
+
+    def __init__(self, universe: Mapping[str, List[Dict]]):
+        by_symbol = {}
+        by_category = {}
+        by_issuer = {}
+
+        for category, assets in universe.items():
+            entries = []
+            for asset in assets:
+                entry = MappingProxyType({**asset, "category": category})
+                entries.append(entry)
+                symbol = asset["symbol"].upper()
+                if symbol not in by_symbol:
+                    by_symbol[symbol] = entry
+                if "issuer" in asset:
+                    by_issuer.setdefault(asset["issuer"], []).append(entry)
+            by_category[category] = tuple(entries)
+
+        self.by_symbol: Mapping[str, Mapping] = MappingProxyType(by_symbol)
+        self.by_category: Mapping[str, Tuple[Mapping, ...]] = MappingProxyType(by_category)
+        self.by_issuer: Mapping[str, Tuple[Mapping, ...]] = MappingProxyType(
+            {issuer: tuple(entries) for issuer, entries in by_issuer.items()}
+        )
+        self.symbols: Tuple[str, ...] = tuple(by_symbol)
+
+    def get(self, symbol: str) -> Optional[Mapping]:
+        """Metadatos de un símbolo, o None si no pertenece al universo."""
+        return self.by_symbol.get(symbol.upper())
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self.by_symbol
+
+    def __len__(self) -> int:
+        return len(self.by_symbol)
@@ -0,0 +1,250 @@
+"""
+Volume Profile Module
+Motor vectorizado de perfil de volumen: POC, Value Area y niveles de liquidación
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+import perf
+
+
+def compute_volume_profile(
+    high,
+    low,
+    volume,
+    num_bins: int = 50,
+    value_area_pct: float = 0.7,
+) -> Optional[Dict]:
+    """
+    Distribuye el volumen de cada barra entre los niveles de precio que cubre.
+
+    El volumen de una barra se reparte en partes iguales entre
+    int((high - low) / bin_size) + 1 niveles, empezando en el low y
+    redondeando cada nivel al múltiplo de bin_size más cercano. Todo se
+    resuelve con aritmética de arreglos y np.bincount, sin ciclos por barra.
+
+    Args:
+        high: Arreglo de máximos
+        low: Arreglo de mínimos
+        volume: Arreglo de volúmenes
+        num_bins: Número de bins en que se divide el rango de precios
+        value_area_pct: Fracción del volumen total que define la Value Area
+
+    Returns:
+        Dict con prices (ascendente), volumes, poc, value_area_high,
+        value_area_low y bin_size; None si no hay rango de precios
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(high) == 0 or np.isnan(high).any() or np.isnan(low).any():
+        return None
+
+    price_range = high.max() - low.min()
+    bin_size = price_range / num_bins
+    if not np.isfinite(bin_size) or bin_size <= 0:
+        return None
+
+    # Niveles por barra y volumen asignado a cada nivel
+    levels = np.trunc((high - low) / bin_size).astype(np.int64) + 1
+    vol_per_level = volume / np.maximum(levels, 1)
+    counts = np.maximum(levels, 0)
+    total_levels = int(counts.sum())
+    if total_levels == 0:
+        return None
+
+    # Expandir (barra, nivel) a un arreglo plano: offset i dentro de cada barra
+    rows = np.repeat(np.arange(len(high)), counts)
+    offsets = np.arange(total_levels) - np.repeat(np.cumsum(counts) - counts, counts)
+    bin_ids = np.round((low[rows] + offsets * bin_size) / bin_size)
+
+    # bincount acumula en el orden de entrada: mismas sumas que un acumulador por bin
+    keys, first_seen, inverse = np.unique(bin_ids, return_index=True, return_inverse=True)
+    volumes = np.bincount(inverse.ravel(), weights=vol_per_level[rows], minlength=len(keys))
+    prices = keys * bin_size
+
+    # Orden de aparición (desempata POC y Value Area igual que un dict insertado en orden)
+    appearance = np.argsort(first_seen)
+    seen_prices = prices[appearance]
+    seen_volumes = volumes[appearance]
+
+    poc = float(seen_prices[np.argmax(seen_volumes)])
+
+    total_volume = sum(seen_volumes.tolist())
+    by_volume = np.argsort(-seen_volumes, kind="stable")
+    cumulative = np.cumsum(seen_volumes[by_volume])
+    reached = np.nonzero(cumulative >= total_volume * value_area_pct)[0]
+    n_value_area = reached[0] + 1 if len(reached) else len(by_volume)
+    value_area_prices = seen_prices[by_volume[:n_value_area]]
+
+    return {
+        "prices": prices,
+        "volumes": volumes,
+        "poc": poc,
+        "value_area_high": float(value_area_prices.max()),
+        "value_area_low": float(value_area_prices.min()),
+        "bin_size": bin_size,
+    }
+
+
+@perf.timed()
+def calculate_poc_and_levels(
+    df: pd.DataFrame,
+    current_price: float,
+    num_bins: int = 50,
+    value_area_pct: float = 0.7,
+) -> Optional[Dict]:
+    """
+    Calcula el Point of Control (POC), la Value Area y niveles clave de liquidez.
+
+    Args:
+        df: DataFrame con columnas high, low y volume
+        current_price: Precio actual para calcular distancias
+        num_bins: Número de bins del perfil de volumen
+        value_area_pct: Fracción del volumen que define la Value Area
+
+    Returns:
+        Dict con poc, value_area_high, value_area_low, levels (8 más cercanos)
+        y volume_profile (arreglos prices/volumes); None si no hay datos suficientes
+    """
+    if df is None or len(df) < 20:
+        return None
+    try:
+        profile = compute_volume_profile(
+            df['high'].to_numpy(), df['low'].to_numpy(), df['volume'].to_numpy(),
+            num_bins=num_bins, value_area_pct=value_area_pct,
+        )
+        if profile is None:
+            return None
+
+        poc = profile['poc']
+        value_area_high = profile['value_area_high']
+        value_area_low = profile['value_area_low']
+
+        liquidation_levels = []
+        base = 10 ** (len(str(int(current_price))) - 2)
+        for i in range(-5, 6):
+            level = round(current_price / base) * base + i * base
+            if level > 0:
+                liquidation_levels.append({'price': level, 'type': 'ROUND', 'delta': ((level - current_price) / current_price) * 100})
+        liquidation_levels.append({'price': poc, 'type': 'POC', 'delta': ((poc - current_price) / current_price) * 100})
+        liquidation_levels.append({'price': value_area_high, 'type': 'VAH', 'delta': ((value_area_high - current_price) / current_price) * 100})
+        liquidation_levels.append({'price': value_area_low, 'type': 'VAL', 'delta': ((value_area_low - current_price) / current_price) * 100})
+        liquidation_levels.sort(key=lambda x: abs(x['delta']))
+
+        return {
+            'poc': poc,
+            'value_area_high': value_area_high,
+            'value_area_low': value_area_low,
+            'levels': liquidation_levels[:8],
+            'volume_profile': {'prices': profile['prices'], 'volumes': profile['volumes']},
+        }
+    except Exception:
+        return None
+
+
+@perf.timed()
+def compute_volume_profiles(
+    high,
+    low,
+    volume,
+    num_bins: int = 50,
+    value_area_pct: float = 0.7,
+    min_bars: int = 1,
+) -> Dict[str, np.ndarray]:
+    """
+    POC y Value Area de muchos símbolos a la vez.
+
+    Mismo reparto que compute_volume_profile, pero todas las barras de todos
+    los símbolos se expanden en un solo arreglo plano y cada bin se desplaza
+    por símbolo (símbolo × ancho + bin local), así que un único np.bincount
+    arma todos los perfiles. Los desempates por orden de aparición se
+    conservan, de modo que cada símbolo da exactamente lo mismo que
+    compute_volume_profile sobre sus barras.
+
+    Args:
+        high: Arreglo 2-D (barras × símbolos) de máximos; NaN donde no hay barra
+        low: Arreglo 2-D de mínimos
+        volume: Arreglo 2-D de volúmenes
+        num_bins: Número de bins en que se divide el rango de cada símbolo
+        value_area_pct: Fracción del volumen total que define la Value Area
+        min_bars: Barras mínimas para calcular el perfil de un símbolo
+
+    Returns:
+        Dict con poc, value_area_high, value_area_low y bin_size, un valor
+        por símbolo (NaN si el símbolo no tiene datos o rango suficiente)
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    n_symbols = high.shape[1]
+    out = {key: np.full(n_symbols, np.nan) for key in ("poc", "value_area_high", "value_area_low", "bin_size")}
+
+    present = ~(np.isnan(high) | np.isnan(low) | np.isnan(volume))
+    n_bars = present.sum(axis=0)
+    top = np.where(present, high, -np.inf).max(axis=0)
+    bottom = np.where(present, low, np.inf).min(axis=0)
+    with np.errstate(invalid="ignore"):
+        bin_size = (top - bottom) / num_bins
+    valid = (n_bars >= max(min_bars, 1)) & np.isfinite(bin_size) & (bin_size > 0)
+
+    # Barras en orden (símbolo, fecha): dentro de cada símbolo, el orden de aparición original
+    keep = (present & valid[None, :]).T
+    sym = np.nonzero(keep)[0]
+    h, l, v = high.T[keep], low.T[keep], volume.T[keep]
+    if len(sym) == 0:
+        return out
+    size = bin_size[sym]
+
+    levels = np.trunc((h - l) / size).astype(np.int64) + 1
+    vol_per_level = v / np.maximum(levels, 1)
+    counts = np.maximum(levels, 0)
+    total_levels = int(counts.sum())
+    if total_levels == 0:
+        return out
+
+    rows = np.repeat(np.arange(len(h)), counts)
+    offsets = np.arange(total_levels) - np.repeat(np.cumsum(counts) - counts, counts)
+    bin_ids = np.round((l[rows] + offsets * size[rows]) / size[rows])
+    entry_sym = sym[rows]
+
+    # Bin local de cada símbolo y llave global con el desplazamiento por símbolo
+    starts = np.flatnonzero(np.r_[True, entry_sym[1:] != entry_sym[:-1]])
+    first_bin = np.zeros(n_symbols)
+    first_bin[entry_sym[starts]] = np.minimum.reduceat(bin_ids, starts)
+    local = (bin_ids - first_bin[entry_sym]).astype(np.int64)
+    width = int(local.max()) + 1
+    keys = entry_sym * width + local
+
+    volumes = np.bincount(keys, weights=vol_per_level[rows], minlength=n_symbols * width).reshape(n_symbols, width)
+    unique_keys, first_index = np.unique(keys, return_index=True)
+    first_seen = np.full(n_symbols * width, np.iinfo(np.int64).max)
+    first_seen[unique_keys] = first_index
+    first_seen = first_seen.reshape(n_symbols, width)
+    seen = first_seen < np.iinfo(np.int64).max
+    n_seen = seen.sum(axis=1)
+    prices = (first_bin[:, None] + np.arange(width)) * np.where(valid, bin_size, 0.0)[:, None]
+
+    # Volumen descendente con desempate por aparición (= argsort estable en orden de aparición)
+    order = np.lexsort((first_seen, -np.where(seen, volumes, -np.inf)), axis=-1)
+    seen_volumes = np.where(seen, volumes, 0.0)
+    by_volume = np.take_along_axis(seen_volumes, order, axis=1)
+    ranked_prices = np.take_along_axis(prices, order, axis=1)
+
+    # Total sumado en orden de aparición, como la suma secuencial del perfil individual
+    appearance = np.argsort(first_seen, axis=1, kind="stable")
+    total_volume = np.cumsum(np.take_along_axis(seen_volumes, appearance, axis=1), axis=1)[:, -1]
+    cumulative = np.cumsum(by_volume, axis=1)
+    rank = np.arange(width)[None, :]
+    reached = (cumulative >= (total_volume * value_area_pct)[:, None]) & (rank < n_seen[:, None])
+    n_value_area = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, n_seen)
+    in_value_area = rank < n_value_area[:, None]
+
+    done = valid & (n_seen > 0)
+    out["poc"] = np.where(done, ranked_prices[:, 0], np.nan)
+    out["value_area_high"] = np.where(done, np.where(in_value_area, ranked_prices, -np.inf).max(axis=1), np.nan)
+    out["value_area_low"] = np.where(done, np.where(in_value_area, ranked_prices, np.inf).min(axis=1), np.nan)
+    out["bin_size"] = np.where(done, bin_size, np.nan)
+    return out